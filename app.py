@@ -5,7 +5,7 @@ from services.planner_service import get_day_plan, PlannerError
 from services.templates_service import get_template, update_set, reorder_exercises, ValidationError
 from services import runner_service
 from repos.runner_repo import get_active_session 
-from core.timeutil import today_str_et
+from core.timeutil import today_str_et, format_duration
 
 st.set_page_config(
     page_title="Workout Manager",
@@ -204,6 +204,20 @@ if active_session:
     # --- ACTIVE RUNNER MODE ---
     st.markdown(f"**Active Session:** {active_session['name']}")
     
+    # --- "New PR" flag for the set just saved (single indexed read) ---
+    pr_set_id = st.session_state.pop("pr_check_set_id", None)
+    if pr_set_id:
+        new_records = runner_service.get_set_records(pr_set_id)
+        if new_records:
+            record_labels = {
+                "MAX_WEIGHT": "heaviest weight",
+                "REPS_AT_WEIGHT": "most reps at {weight} lbs",
+                "E1RM": "best estimated 1RM",
+                "SESSION_VOLUME": "best session volume"
+            }
+            labels = [record_labels[r['record_type']].format(weight=r['weight_key']) for r in new_records]
+            st.markdown(f"<span class='overload-badge'>🏆 New PR: {', '.join(labels)}</span>", unsafe_allow_html=True)
+
     if active_session['status'] == 'COMPLETED':
         st.markdown("### ✓ Workout Completed")
     else:
@@ -213,26 +227,9 @@ if active_session:
         if progression['is_completed']:
             st.markdown("### All sets completed")
             
-            # Calculate Total Duration
-            if active_session.get('started_at'):
-                try:
-                    start_dt = datetime.datetime.fromisoformat(active_session['started_at'].replace(" ", "T"))
-                    end_dt = datetime.datetime.now()
-                    duration = end_dt - start_dt
-                    
-                    # Format as H:M:S
-                    total_seconds = int(duration.total_seconds())
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    seconds = total_seconds % 60
-                    
-                    time_str = f"{minutes}m {seconds}s"
-                    if hours > 0:
-                        time_str = f"{hours}h {time_str}"
-                    
-                    st.metric("Total Workout Time", time_str)
-                except Exception as e:
-                    st.warning(f"Could not calculate duration: {e}")
+            # Total duration is stored with the session summary when it is finished
+            if active_session['started_at']:
+                render_timer("Total Workout Time", active_session['started_at'], key_prefix="workout_total")
 
             if st.button("Finish Workout & Save", type="primary"):
                 runner_service.complete_session(active_session['id'])
@@ -272,7 +269,8 @@ if active_session:
                          render_timer("Rest", progression['timer_base'], key_prefix="rest_timer")
                     
                     if overload:
-                        st.markdown(f"**Target: {overload['suggested_reps']} reps ⬆ (was {overload['last_reps']}) @ {current_set['planned_weight']} lbs**")
+                        was = f" ⬆ (was {overload['last_reps']})" if overload['last_reps'] is not None else ""
+                        st.markdown(f"**Target: {overload['suggested_reps']} reps{was} @ {overload['suggested_weight']} lbs**")
                     else:
                         st.markdown(f"**Target: {current_set['planned_reps']} reps @ {current_set['planned_weight']} lbs**")
                     
@@ -291,13 +289,17 @@ if active_session:
                 
                     c1, c2, c3 = st.columns([2, 2, 2])
                     
-                    # Defaults — always default to planned_reps/last time, not the target bump
+                    # Defaults — always default to planned_reps/last time, not the target bump.
+                    # Weight follows the policy's target (percentage / back-off policies set it).
                     default_reps = current_set['planned_reps'] or 0
                     default_weight = current_set['planned_weight'] or 0.0
+                    if overload and overload['suggested_weight'] is not None:
+                        default_weight = float(overload['suggested_weight'])
                     
                     with c1:
                         if overload:
-                            st.markdown(f"**Target**: {overload['suggested_reps']} ⬆ (was {overload['last_reps']}) × {default_weight} lbs")
+                            was = f" ⬆ (was {overload['last_reps']})" if overload['last_reps'] is not None else ""
+                            st.markdown(f"**Target**: {overload['suggested_reps']}{was} × {default_weight} lbs")
                         else:
                             st.markdown(f"**Target**: {default_reps} × {default_weight} lbs")
                         # Ghost text for "last time" in IN_SET state too
@@ -318,6 +320,7 @@ if active_session:
                             actual_reps, 
                             actual_weight
                         )
+                        st.session_state["pr_check_set_id"] = current_set['id']
                         st.rerun()
 
             st.divider()
@@ -361,6 +364,15 @@ else:
             st.markdown(f"### ✓ {plan['name']}")
             st.caption("Completed. See you tomorrow.")
             
+            # Single-row read of the summary written when the session finished
+            summary = runner_service.get_session_summary(plan['id'])
+            if summary:
+                sm1, sm2, sm3, sm4 = st.columns(4)
+                sm1.metric("Duration", format_duration(summary['duration_seconds']))
+                sm2.metric("Sets", f"{summary['sets_completed']}/{summary['sets_planned']}")
+                sm3.metric("Volume", f"{summary['tonnage']:,.0f} lbs")
+                sm4.metric("PRs", summary['prs_hit'])
+            
             with st.expander("View Details", expanded=False):
                 template_id = plan['template_id']
                 template = get_template(template_id)
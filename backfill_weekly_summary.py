@@ -0,0 +1,19 @@
+from services.consistency_service import rebuild_weekly_summary
+import streamlit as st
+
+# Verify we can access secrets
+try:
+    _ = st.secrets["TURSO_DATABASE_URL"]
+except:
+    print("Secrets not loaded automatically. Attempting manual load for script context.")
+    import os, toml
+    secrets_path = os.path.join(".streamlit", "secrets.toml")
+    if os.path.exists(secrets_path):
+        with open(secrets_path, "r") as f:
+             st.secrets = toml.load(f)
+
+print("Rebuilding weekly_summary from workout history...")
+weeks = rebuild_weekly_summary()
+print(f"Success! {weeks} weeks written.")
+import os
+os._exit(0)
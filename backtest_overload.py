@@ -0,0 +1,37 @@
+import sys
+from services import backtest_service
+import streamlit as st
+
+# Verify we can access secrets
+try:
+    _ = st.secrets["TURSO_DATABASE_URL"]
+except:
+    print("Secrets not loaded automatically. Attempting manual load for script context.")
+    import os, toml
+    secrets_path = os.path.join(".streamlit", "secrets.toml")
+    if os.path.exists(secrets_path):
+        with open(secrets_path, "r") as f:
+             st.secrets = toml.load(f)
+
+# Usage: python backtest_overload.py [--synthetic [SESSIONS]]
+if "--synthetic" in sys.argv:
+    idx = sys.argv.index("--synthetic")
+    n = int(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 else 156
+    print(f"Generating {n} synthetic sessions...")
+    sessions = backtest_service.synthetic_history(sessions=n)
+else:
+    print("Loading session history...")
+    sessions = backtest_service.load_history()
+
+print(f"Replaying {len(sessions)} sessions...\n")
+reports = backtest_service.backtest(sessions)
+
+print(f"{'Policy':<20}{'Targets':>9}{'Met':>7}{'Rate':>8}{'Advances':>10}{'Wraps':>7}{'Reps +/-':>10}{'Weight +/-':>12}")
+for r in reports.values():
+    rate = "-" if r['met_rate'] is None else f"{r['met_rate']:.0%}"
+    print(
+        f"{r['policy']:<20}{r['targets']:>9}{r['met']:>7}{rate:>8}{r['advances']:>10}{r['wraps']:>7}"
+        f"{r['avg_rep_progression']:>10.1f}{r['avg_weight_progression']:>12.1f}"
+    )
+import os
+os._exit(0)
@@ -0,0 +1,61 @@
+import sys
+from services import backup_store
+from services.backup_service import BackupError
+import streamlit as st
+
+# Verify we can access secrets
+try:
+    _ = st.secrets["TURSO_DATABASE_URL"]
+except:
+    print("Secrets not loaded automatically. Attempting manual load for script context.")
+    import os, toml
+    secrets_path = os.path.join(".streamlit", "secrets.toml")
+    if os.path.exists(secrets_path):
+        with open(secrets_path, "r") as f:
+             st.secrets = toml.load(f)
+
+USAGE = """Usage: python backup_snapshots.py COMMAND
+  snapshot [--full]       store a deduplicated snapshot (--full re-reads every table)
+  list                    list snapshots
+  diff OLD [NEW]          compare two snapshots, or OLD with the live database
+  restore [ID]            replace all workout data with a snapshot (default: latest)
+  prune KEEP              keep the newest KEEP snapshots and delete unreferenced chunks"""
+
+args = sys.argv[1:]
+command = args[0] if args else None
+print(f"Store: {backup_store.STORE_DIR}")
+try:
+    if command == "snapshot":
+        m = backup_store.create_snapshot(full="--full" in args)
+        s = m['stats']
+        print(
+            f"Snapshot {m['id']}: {s['read_chunks']} chunks read, {s['reused_chunks']} reused, "
+            f"{s['new_chunks']} new ({s['bytes_written'] / 1024:.1f} KB written)"
+        )
+    elif command == "list":
+        for m in backup_store.list_snapshots():
+            rows = sum(t['rows'] for t in m['tables'].values())
+            chunks = sum(len(t['chunks']) for t in m['tables'].values())
+            print(f"{m['id']}  {m['created_at'][:19]}  {rows:>8} rows  {chunks:>5} chunks  {m['stats']['new_chunks']:>5} new")
+    elif command == "diff" and len(args) >= 2:
+        diff = backup_store.diff_snapshots(args[1], args[2] if len(args) > 2 else None)
+        if not diff:
+            print("No differences.")
+        for table, d in diff.items():
+            print(f"{table:<20} +{len(d['added'])} -{len(d['removed'])} ~{len(d['changed'])}")
+    elif command == "restore":
+        report = backup_store.restore_snapshot(args[1] if len(args) > 1 else None)
+        for entry in report:
+            rows = sum(r['rows'] for r in entry['tables'].values())
+            print(f"Restored {entry['file']}: {rows} rows verified; derived tables rebuilt.")
+    elif command == "prune" and len(args) == 2:
+        removed, chunks, freed = backup_store.prune(int(args[1]))
+        print(f"Removed {removed} snapshots and {chunks} chunks ({freed / 1024:.1f} KB).")
+    else:
+        print(USAGE)
+except BackupError as e:
+    print(f"Error: {e}")
+    import os
+    os._exit(1)
+import os
+os._exit(0)
@@ -35,6 +35,9 @@ def clear_data():
         "DELETE FROM sets",
         "DELETE FROM workout_exercises",
         "DELETE FROM workouts",
+        "DELETE FROM template_version_sets",
+        "DELETE FROM template_version_exercises",
+        "DELETE FROM template_versions",
         "DELETE FROM template_sets",
         "DELETE FROM template_exercises",
         "DELETE FROM templates"
@@ -0,0 +1,74 @@
+"""
+Sparse ordering keys.
+
+Rows ordered by an integer key (template_exercises.order_index, template_sets.set_number)
+are spaced ORDER_GAP apart, so moving a row only rewrites that row's key to a value
+between its new neighbours. Display numbers (1, 2, 3...) are derived at read time.
+When a gap runs out, the whole list is respaced.
+"""
+from bisect import bisect_left
+
+ORDER_GAP = 1024
+
+def _longest_increasing(keys):
+    """Returns the indices of a longest strictly increasing run of the non-None keys."""
+    tails, tail_idx, parent = [], [], {}
+    for i, key in enumerate(keys):
+        if key is None:
+            continue
+        pos = bisect_left(tails, key)
+        parent[i] = tail_idx[pos - 1] if pos else None
+        if pos == len(tails):
+            tails.append(key)
+            tail_idx.append(i)
+        else:
+            tails[pos] = key
+            tail_idx[pos] = i
+    keep = set()
+    i = tail_idx[-1] if tail_idx else None
+    while i is not None:
+        keep.add(i)
+        i = parent[i]
+    return keep
+
+def plan_keys(keys):
+    """
+    Takes the current key of each row in the desired order (None for new rows) and
+    returns (new_keys, respaced). Rows on a longest increasing run keep their keys;
+    the others get keys spread evenly between their kept neighbours. If a gap is too
+    narrow, every row gets (position * ORDER_GAP) and respaced is True.
+    """
+    keep = _longest_increasing(keys)
+    result = list(keys)
+    i, n = 0, len(keys)
+    while i < n:
+        if i in keep:
+            i += 1
+            continue
+        j = i
+        while j < n and j not in keep:
+            j += 1
+        low = keys[i - 1] if i > 0 else 0
+        count = j - i
+        if j == n:
+            result[i:j] = [low + ORDER_GAP * (k + 1) for k in range(count)]
+        else:
+            step = (keys[j] - low) // (count + 1)
+            if step < 1:
+                return [ORDER_GAP * (k + 1) for k in range(n)], True
+            result[i:j] = [low + step * (k + 1) for k in range(count)]
+        i = j
+    return result, False
+
+def key_writes(ids, keys):
+    """
+    Given row ids (None for new rows) and their current keys in the desired order,
+    returns (parks, updates, new_keys):
+    - parks: ids to move out of the way first (only when several existing rows move)
+    - updates: [(id, key)] for existing rows whose key changes
+    - new_keys: the final key for every position
+    """
+    new_keys, _ = plan_keys(keys)
+    updates = [(id, key) for id, old, key in zip(ids, keys, new_keys) if id is not None and old != key]
+    parks = [id for id, _ in updates] if len(updates) > 1 else []
+    return parks, updates, new_keys
@@ -33,3 +33,16 @@ def get_week_end(date_str):
     start_date = datetime.datetime.strptime(start_date_str, '%Y-%m-%d').date()
     end_date = start_date + datetime.timedelta(days=6)
     return end_date.strftime('%Y-%m-%d')
+
+def format_duration(seconds):
+    """Formats a number of seconds as '1h 5m 3s' / '5m 3s'. Returns '—' for None."""
+    if seconds is None:
+        return "—"
+    total_seconds = int(seconds)
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    secs = total_seconds % 60
+    time_str = f"{minutes}m {secs}s"
+    if hours > 0:
+        time_str = f"{hours}h {time_str}"
+    return time_str
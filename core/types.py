@@ -4,3 +4,14 @@ class WorkoutStatus(str, Enum):
     PLANNED = "PLANNED"
     ACTIVE = "ACTIVE"
     COMPLETED = "COMPLETED"
+
+class SyncPolicy(str, Enum):
+    ALWAYS = "ALWAYS"
+    SESSION_END = "SESSION_END"
+    NEVER = "NEVER"
+
+class ProgressionType(str, Enum):
+    CURSOR = "CURSOR"
+    DOUBLE_PROGRESSION = "DOUBLE_PROGRESSION"
+    PERCENTAGE = "PERCENTAGE"
+    TOP_SET_BACKOFF = "TOP_SET_BACKOFF"
@@ -41,6 +41,11 @@ def execute(query, params=()):
     client = get_db_client()
     client.batch([Statement(query, params)])
 
+def execute_batch(statements):
+    """Executes a list of Statements in a single round-trip. The batch is atomic."""
+    client = get_db_client()
+    return client.batch(statements)
+
 def query_all(query, params=()):
     """Executes a query and returns all rows."""
     client = get_db_client()
@@ -1,5 +1,5 @@
 import os
-from db.conn import execute, query_one
+from db.conn import execute, execute_batch, query_all, query_one
 
 SCHEMA_FILE = os.path.join(os.path.dirname(__file__), 'schema.sql')
 
@@ -101,3 +101,385 @@ def migrate():
         """)
         execute("INSERT INTO schema_version (version) VALUES (5)")
         print("Migration v5 applied successfully.")
+
+    if current_version < 6:
+        print("Applying migration v6 (Template Sync Policy)...")
+        try:
+            execute("ALTER TABLE templates ADD COLUMN sync_policy TEXT CHECK(sync_policy IN ('ALWAYS', 'SESSION_END', 'NEVER')) DEFAULT 'SESSION_END'")
+        except Exception:
+            pass
+        execute("INSERT INTO schema_version (version) VALUES (6)")
+        print("Migration v6 applied successfully.")
+
+    if current_version < 7:
+        print("Applying migration v7 (Weekly Summary)...")
+        execute("""
+            CREATE TABLE IF NOT EXISTS weekly_summary (
+                week_start DATE PRIMARY KEY,
+                planned_days INTEGER NOT NULL DEFAULT 0,
+                planned_workouts INTEGER NOT NULL DEFAULT 0,
+                completed_workouts INTEGER NOT NULL DEFAULT 0,
+                rest_days INTEGER NOT NULL DEFAULT 0,
+                is_consistent BOOLEAN DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Backfilled by v20: the planner query reads the schedule rule tables
+        execute("INSERT INTO schema_version (version) VALUES (7)")
+        print("Migration v7 applied successfully.")
+
+    if current_version < 8:
+        print("Applying migration v8 (Data Version)...")
+        execute("""
+            CREATE TABLE IF NOT EXISTS data_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+        # Any change to set history bumps the version so derived caches can key on it
+        for event in ["INSERT", "UPDATE", "DELETE"]:
+            execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_sets_data_version_{event.lower()}
+                AFTER {event} ON sets
+                BEGIN
+                    UPDATE data_version SET version = version + 1 WHERE id = 1;
+                END
+            """)
+        execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_workouts_data_version_update
+            AFTER UPDATE OF date, status ON workouts
+            BEGIN
+                UPDATE data_version SET version = version + 1 WHERE id = 1;
+            END
+        """)
+        execute("INSERT INTO schema_version (version) VALUES (8)")
+        print("Migration v8 applied successfully.")
+
+    if current_version < 9:
+        print("Applying migration v9 (Daily Load)...")
+        execute("""
+            CREATE TABLE IF NOT EXISTS daily_load (
+                date DATE NOT NULL,
+                exercise_id INTEGER NOT NULL,
+                tonnage REAL NOT NULL DEFAULT 0,
+                reps INTEGER NOT NULL DEFAULT 0,
+                sets INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (date, exercise_id)
+            )
+        """)
+        from repos.load_repo import rebuild_daily_load
+        rebuild_daily_load()
+        execute("INSERT INTO schema_version (version) VALUES (9)")
+        print("Migration v9 applied successfully.")
+
+    if current_version < 10:
+        print("Applying migration v10 (Personal Records)...")
+        execute("""
+            CREATE TABLE IF NOT EXISTS personal_records (
+                exercise_id INTEGER NOT NULL,
+                record_type TEXT NOT NULL CHECK(record_type IN ('MAX_WEIGHT', 'REPS_AT_WEIGHT', 'E1RM', 'SESSION_VOLUME')),
+                weight_key REAL NOT NULL DEFAULT 0,
+                value REAL NOT NULL,
+                set_id INTEGER,
+                workout_id INTEGER,
+                achieved_date DATE,
+                PRIMARY KEY (exercise_id, record_type, weight_key),
+                FOREIGN KEY (exercise_id) REFERENCES exercises(id)
+            )
+        """)
+        execute("CREATE INDEX IF NOT EXISTS idx_personal_records_set ON personal_records(set_id)")
+        from repos.records_repo import rebuild_all
+        rebuild_all()
+        execute("INSERT INTO schema_version (version) VALUES (10)")
+        print("Migration v10 applied successfully.")
+
+    if current_version < 11:
+        print("Applying migration v11 (Exercise History Indexes)...")
+        # Per-exercise history scans walk workout_exercises -> sets -> workouts
+        execute("CREATE INDEX IF NOT EXISTS idx_workout_exercises_exercise ON workout_exercises(exercise_id, workout_id)")
+        execute("CREATE INDEX IF NOT EXISTS idx_sets_workout_exercise ON sets(workout_exercise_id)")
+        execute("INSERT INTO schema_version (version) VALUES (11)")
+        print("Migration v11 applied successfully.")
+
+    if current_version < 12:
+        print("Applying migration v12 (Progression Policies)...")
+        # Template-wide policy; template_exercises may override it (NULL inherits)
+        try:
+            execute("ALTER TABLE templates ADD COLUMN progression_policy TEXT CHECK(progression_policy IN ('CURSOR', 'DOUBLE_PROGRESSION', 'PERCENTAGE', 'TOP_SET_BACKOFF')) DEFAULT 'CURSOR'")
+        except Exception:
+            pass
+        try:
+            execute("ALTER TABLE template_exercises ADD COLUMN progression_policy TEXT CHECK(progression_policy IN ('CURSOR', 'DOUBLE_PROGRESSION', 'PERCENTAGE', 'TOP_SET_BACKOFF'))")
+        except Exception:
+            pass
+        execute("INSERT INTO schema_version (version) VALUES (12)")
+        print("Migration v12 applied successfully.")
+
+    if current_version < 13:
+        print("Applying migration v13 (Set Timing)...")
+        execute("""
+            CREATE TABLE IF NOT EXISTS set_timing (
+                set_id INTEGER PRIMARY KEY,
+                workout_id INTEGER NOT NULL,
+                exercise_id INTEGER NOT NULL,
+                duration_seconds REAL,
+                rest_seconds REAL,
+                FOREIGN KEY (set_id) REFERENCES sets(id) ON DELETE CASCADE
+            )
+        """)
+        execute("CREATE INDEX IF NOT EXISTS idx_set_timing_workout ON set_timing(workout_id)")
+        execute("""
+            CREATE TABLE IF NOT EXISTS session_timing (
+                workout_id INTEGER PRIMARY KEY,
+                timed_sets INTEGER NOT NULL DEFAULT 0,
+                work_seconds REAL NOT NULL DEFAULT 0,
+                rest_seconds REAL NOT NULL DEFAULT 0,
+                active_seconds REAL NOT NULL DEFAULT 0,
+                density REAL,
+                avg_rest_seconds REAL,
+                FOREIGN KEY (workout_id) REFERENCES workouts(id) ON DELETE CASCADE
+            )
+        """)
+        from services.timing_service import rebuild_timing
+        rebuild_timing()
+        execute("INSERT INTO schema_version (version) VALUES (13)")
+        print("Migration v13 applied successfully.")
+
+    if current_version < 14:
+        print("Applying migration v14 (Workout Summaries)...")
+        execute("""
+            CREATE TABLE IF NOT EXISTS workout_summaries (
+                workout_id INTEGER PRIMARY KEY,
+                date DATE NOT NULL,
+                name TEXT,
+                template_id INTEGER,
+                started_at DATETIME,
+                completed_at DATETIME,
+                duration_seconds INTEGER,
+                exercises INTEGER NOT NULL DEFAULT 0,
+                sets_planned INTEGER NOT NULL DEFAULT 0,
+                sets_completed INTEGER NOT NULL DEFAULT 0,
+                total_reps INTEGER NOT NULL DEFAULT 0,
+                tonnage REAL NOT NULL DEFAULT 0,
+                prs_hit INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (workout_id) REFERENCES workouts(id) ON DELETE CASCADE
+            )
+        """)
+        execute("CREATE INDEX IF NOT EXISTS idx_workout_summaries_date ON workout_summaries(date)")
+        # Rows are filled by v19: the summary query reads the template version tables
+        execute("INSERT INTO schema_version (version) VALUES (14)")
+        print("Migration v14 applied successfully.")
+
+    if current_version < 15:
+        print("Applying migration v15 (History Keyset Index)...")
+        # Keyset pagination walks (date, workout_id) newest first; this supersedes the date-only index
+        execute("CREATE INDEX IF NOT EXISTS idx_workout_summaries_date_id ON workout_summaries(date, workout_id)")
+        execute("DROP INDEX IF EXISTS idx_workout_summaries_date")
+        execute("INSERT INTO schema_version (version) VALUES (15)")
+        print("Migration v15 applied successfully.")
+
+    if current_version < 16:
+        print("Applying migration v16 (Change Tracking)...")
+        # Trigger-fed log of row changes to the backed-up tables; incremental backups export
+        # the rows touched between two sequence numbers.
+        execute("""
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                op TEXT NOT NULL CHECK(op IN ('I', 'U', 'D')),
+                changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        execute("CREATE INDEX IF NOT EXISTS idx_change_log_table_seq ON change_log(table_name, seq)")
+        from repos.backup_repo import BACKUP_TABLES, change_tracking_sql
+        existing = {r[0] for r in query_all("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        # Tables added by later migrations get their triggers there
+        for table in BACKUP_TABLES:
+            if table in existing:
+                for sql in change_tracking_sql(table):
+                    execute(sql)
+        # One row per backup taken; each points at the backup it builds on
+        execute("""
+            CREATE TABLE IF NOT EXISTS backup_markers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL CHECK(kind IN ('FULL', 'INCREMENTAL')),
+                from_seq INTEGER NOT NULL,
+                to_seq INTEGER NOT NULL,
+                parent_id INTEGER,
+                sha256 TEXT NOT NULL,
+                file_name TEXT,
+                counts TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (parent_id) REFERENCES backup_markers(id)
+            )
+        """)
+        execute("INSERT INTO schema_version (version) VALUES (16)")
+        print("Migration v16 applied successfully.")
+
+    if current_version < 17:
+        print("Applying migration v17 (Import Checkpoints)...")
+        # One row per imported file, written in the same batch as each chunk of sessions
+        # so an interrupted import resumes exactly after the last committed chunk.
+        execute("""
+            CREATE TABLE IF NOT EXISTS import_checkpoints (
+                source_sha256 TEXT PRIMARY KEY,
+                file_name TEXT,
+                rows_done INTEGER NOT NULL DEFAULT 0,
+                sessions INTEGER NOT NULL DEFAULT 0,
+                sets INTEGER NOT NULL DEFAULT 0,
+                exercises INTEGER NOT NULL DEFAULT 0,
+                skipped_sessions INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL CHECK(status IN ('RUNNING', 'DONE')) DEFAULT 'RUNNING',
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        execute("INSERT INTO schema_version (version) VALUES (17)")
+        print("Migration v17 applied successfully.")
+
+    if current_version < 18:
+        print("Applying migration v18 (Sparse Template Ordering)...")
+        # order_index / set_number on template rows become sparse sort keys; moving or
+        # deleting a row touches only that row. Display positions come from these views.
+        from repos.templates_repo import respace_statements
+        execute_batch(respace_statements())
+        execute("""
+            CREATE VIEW IF NOT EXISTS template_exercise_positions AS
+            SELECT id, template_id, exercise_id, order_index, progression_policy,
+                   ROW_NUMBER() OVER (PARTITION BY template_id ORDER BY order_index) AS position
+            FROM template_exercises
+        """)
+        execute("""
+            CREATE VIEW IF NOT EXISTS template_set_positions AS
+            SELECT id, template_exercise_id, set_number, reps, weight,
+                   ROW_NUMBER() OVER (PARTITION BY template_exercise_id ORDER BY set_number) AS position
+            FROM template_sets
+        """)
+        execute("INSERT INTO schema_version (version) VALUES (18)")
+        print("Migration v18 applied successfully.")
+
+    if current_version < 19:
+        print("Applying migration v19 (Template Versions)...")
+        # Immutable, content-addressed template snapshots. A session references the version
+        # it was started from; its planned sets are read from there, and set rows are only
+        # written once a set is performed.
+        execute("""
+            CREATE TABLE IF NOT EXISTS template_versions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content_hash TEXT NOT NULL UNIQUE,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        execute("""
+            CREATE TABLE IF NOT EXISTS template_version_exercises (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                version_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                exercise_id INTEGER NOT NULL,
+                progression_policy TEXT,
+                FOREIGN KEY (version_id) REFERENCES template_versions(id) ON DELETE CASCADE,
+                FOREIGN KEY (exercise_id) REFERENCES exercises(id),
+                UNIQUE (version_id, position)
+            )
+        """)
+        execute("""
+            CREATE TABLE IF NOT EXISTS template_version_sets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                version_exercise_id INTEGER NOT NULL,
+                set_number INTEGER NOT NULL,
+                reps INTEGER,
+                weight REAL,
+                FOREIGN KEY (version_exercise_id) REFERENCES template_version_exercises(id) ON DELETE CASCADE,
+                UNIQUE (version_exercise_id, set_number)
+            )
+        """)
+        execute("ALTER TABLE workouts ADD COLUMN template_version_id INTEGER REFERENCES template_versions(id)")
+        from repos.backup_repo import change_tracking_sql
+        for table in ("template_versions", "template_version_exercises", "template_version_sets"):
+            for sql in change_tracking_sql(table):
+                execute(sql)
+        # Every planned set of every session with its actuals, if performed. Sessions
+        # started before v19 carry their own planned rows in sets.
+        execute("""
+            CREATE VIEW IF NOT EXISTS session_sets AS
+            SELECT we.workout_id, we.id AS workout_exercise_id, we.order_index, we.exercise_id,
+                   NULL AS progression_policy, s.id AS set_id, s.set_number,
+                   s.planned_reps, s.planned_weight, s.actual_reps, s.actual_weight,
+                   s.completed, s.started_at, s.completed_at
+            FROM workouts w
+            JOIN workout_exercises we ON we.workout_id = w.id
+            JOIN sets s ON s.workout_exercise_id = we.id
+            WHERE w.template_version_id IS NULL
+            UNION ALL
+            SELECT w.id, we.id, ve.position, ve.exercise_id,
+                   ve.progression_policy, s.id, vs.set_number,
+                   vs.reps, vs.weight, s.actual_reps, s.actual_weight,
+                   COALESCE(s.completed, 0), s.started_at, s.completed_at
+            FROM workouts w
+            JOIN template_version_exercises ve ON ve.version_id = w.template_version_id
+            JOIN template_version_sets vs ON vs.version_exercise_id = ve.id
+            LEFT JOIN workout_exercises we ON we.workout_id = w.id AND we.order_index = ve.position
+            LEFT JOIN sets s ON s.workout_exercise_id = we.id AND s.set_number = vs.set_number
+        """)
+        from repos.workout_summary_repo import rebuild_all
+        rebuild_all()
+        execute("INSERT INTO schema_version (version) VALUES (19)")
+        print("Migration v19 applied successfully.")
+
+    if current_version < 20:
+        print("Applying migration v20 (Schedule Rules)...")
+        # Recurring plans: a rule fires every period_days days from start_date (7 for a
+        # weekday, N for each slot of an N-day cycle). planner_repo.get_range overlays them
+        # on workouts rows; a date gets a row only when it is assigned or a session starts.
+        execute("""
+            CREATE TABLE IF NOT EXISTS schedule_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                plan_type TEXT NOT NULL CHECK(plan_type IN ('WORKOUT', 'REST')),
+                template_id INTEGER,
+                start_date DATE NOT NULL,
+                end_date DATE,
+                period_days INTEGER NOT NULL CHECK(period_days > 0),
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (template_id) REFERENCES templates(id) ON DELETE CASCADE
+            )
+        """)
+        # Dates a rule would fill that were cleared by hand
+        execute("""
+            CREATE TABLE IF NOT EXISTS schedule_skips (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date DATE NOT NULL UNIQUE
+            )
+        """)
+        from repos.backup_repo import change_tracking_sql
+        for table in ("schedule_rules", "schedule_skips"):
+            for sql in change_tracking_sql(table):
+                execute(sql)
+        # Backfill from history so streaks are available immediately
+        from services.consistency_service import rebuild_weekly_summary
+        rebuild_weekly_summary()
+        execute("INSERT INTO schema_version (version) VALUES (20)")
+        print("Migration v20 applied successfully.")
+
+    if current_version < 21:
+        print("Applying migration v21 (Import Session Tracking)...")
+        # The first workout id an import wrote, so a resumed import can tell its own
+        # sessions (which later rows merge into) from workouts that were already there
+        execute("ALTER TABLE import_checkpoints ADD COLUMN first_workout_id INTEGER")
+        execute("INSERT INTO schema_version (version) VALUES (21)")
+        print("Migration v21 applied successfully.")
+
+    if current_version < 22:
+        print("Applying migration v22 (Database Identity)...")
+        # A random id per database. Caches and snapshot stores on disk outlive the
+        # database they were built from, so they check it before reusing anything.
+        import uuid
+        execute("""
+            CREATE TABLE IF NOT EXISTS database_identity (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                database_id TEXT NOT NULL
+            )
+        """)
+        execute("INSERT OR IGNORE INTO database_identity (id, database_id) VALUES (1, ?)", (uuid.uuid4().hex,))
+        execute("INSERT INTO schema_version (version) VALUES (22)")
+        print("Migration v22 applied successfully.")
@@ -0,0 +1,45 @@
+import sys
+import time
+from services.import_service import import_csv, ImporterError
+import streamlit as st
+
+# Verify we can access secrets
+try:
+    _ = st.secrets["TURSO_DATABASE_URL"]
+except:
+    print("Secrets not loaded automatically. Attempting manual load for script context.")
+    import os, toml
+    secrets_path = os.path.join(".streamlit", "secrets.toml")
+    if os.path.exists(secrets_path):
+        with open(secrets_path, "r") as f:
+             st.secrets = toml.load(f)
+
+# Usage: python import_csv.py FILE.csv [--weight-factor F]
+# Re-running after an interruption resumes from the last committed batch.
+args = sys.argv[1:]
+if not args:
+    print("Usage: python import_csv.py FILE.csv [--weight-factor F]   (e.g. 2.20462 for kg -> lb)")
+    import os
+    os._exit(1)
+factor = 1.0
+if "--weight-factor" in args:
+    factor = float(args[args.index("--weight-factor") + 1])
+
+print(f"Importing {args[0]}...")
+start = time.time()
+try:
+    result = import_csv(args[0], weight_factor=factor)
+except ImporterError as e:
+    print(f"Import failed: {e}")
+    import os
+    os._exit(1)
+
+if result['resumed_from']:
+    print(f"Resumed after row {result['resumed_from']}.")
+print(
+    f"Success! {result['sessions']} sessions, {result['sets']} sets, {result['exercises']} new exercises "
+    f"in {time.time() - start:.1f}s."
+)
+print(f"Skipped {result['skipped_sessions']} dates that already had a session and {result['skipped_rows']} rows without reps.")
+import os
+os._exit(0)
@@ -2,9 +2,14 @@ import streamlit as st
 from services.templates_service import (
     get_all_templates, create_template, get_template, update_template, delete_template,
     add_exercise, remove_exercise, reorder_exercises, add_set, update_set, delete_set,
-    ValidationError
+    update_sync_policy, update_progression_policy, update_exercise_progression_policy,
+    clone_template, clone_template_scaled, ValidationError
+)
+from services.runner_service import PROGRESSION_POLICIES
+from services.planner_service import (
+    assign_workout, assign_rest, assign_off, get_week_schedule, add_weekly_rule, get_rules, delete_rule,
+    shift_range, swap_days, copy_week, clear_range, PlannerError
 )
-from services.planner_service import assign_workout, assign_rest, assign_off, get_week_schedule, PlannerError
 from repos.exercises_repo import get_all_exercises, create_exercise
 from core.timeutil import today_str_et
 import datetime
@@ -105,19 +110,99 @@ with tab_templates:
 
         # --- Backup & Data ---
         with st.expander("Backup & Data"):
-            st.write("Export your data to JSON.")
-            from repos.backup_repo import export_data
+            st.write("Export your data as compressed NDJSON. Incremental backups only contain changes since the last backup.")
+            from services.backup_service import create_full_backup, create_incremental_backup, record_backup, get_manifest, BackupError
+            import os
             import json
 
-            if st.button("Prepare Backup", key="backup_btn"):
-                data = export_data()
-                json_str = json.dumps(data, indent=2, default=str)
-                st.download_button(
-                    label="⬇️ Download JSON",
-                    data=json_str,
-                    file_name="workout_manager_backup.json",
-                    mime="application/json"
-                )
+            def prepare_backup(create):
+                # Streamed table by table to a temp file; only one page of rows is in memory
+                old_path = st.session_state.pop("backup_path", None)
+                st.session_state.pop("backup_pending", None)
+                if old_path and os.path.exists(old_path):
+                    os.remove(old_path)
+                try:
+                    path, pending = create()
+                    st.session_state["backup_path"] = path
+                    st.session_state["backup_pending"] = pending
+                except BackupError as e:
+                    st.info(str(e))
+
+            def record_download():
+                # The backup only joins the chain once its file has been downloaded
+                pending = st.session_state.get("backup_pending")
+                if pending:
+                    try:
+                        record_backup(pending)
+                    except BackupError as e:
+                        st.session_state["backup_record_error"] = str(e)
+
+            b1, b2 = st.columns(2)
+            with b1:
+                if st.button("Full Backup", key="backup_btn", use_container_width=True):
+                    prepare_backup(create_full_backup)
+            with b2:
+                if st.button("Incremental Backup", key="backup_inc_btn", use_container_width=True):
+                    prepare_backup(create_incremental_backup)
+
+            record_error = st.session_state.pop("backup_record_error", None)
+            if record_error:
+                st.error(record_error)
+
+            backup_path = st.session_state.get("backup_path")
+            if backup_path and os.path.exists(backup_path):
+                d1, d2 = st.columns(2)
+                with d1:
+                    with open(backup_path, "rb") as f:
+                        st.download_button(
+                            label="⬇️ Download Backup",
+                            data=f,
+                            file_name=st.session_state["backup_pending"]['file_name'],
+                            mime="application/gzip",
+                            on_click=record_download
+                        )
+                with d2:
+                    st.download_button(
+                        label="⬇️ Download Manifest",
+                        data=json.dumps(get_manifest(), indent=2),
+                        file_name="workout_manager_manifest.json",
+                        mime="application/json"
+                    )
+
+            st.divider()
+            st.write("Restore from a full backup (or JSON export) plus any incremental backups after it. This replaces all workout data.")
+            from services.backup_service import restore_backup
+            uploads = st.file_uploader(
+                "Backup files",
+                type=["gz", "ndjson", "json"],
+                accept_multiple_files=True,
+                key="restore_files"
+            )
+            if uploads and st.button("Restore", key="restore_btn", type="primary"):
+                try:
+                    with st.spinner("Restoring..."):
+                        report = restore_backup(uploads)
+                    for entry in report:
+                        rows = sum(r['rows'] for r in entry['tables'].values())
+                        st.success(f"{entry['file']}: {rows} rows restored and verified.")
+                except BackupError as e:
+                    st.error(str(e))
+
+            st.divider()
+            st.write("Import history from another tracker's CSV export (Strong, Hevy, FitNotes or date/workout/exercise/weight/reps columns). Dates that already have a started or completed session are skipped; planned days are filled in.")
+            from services.import_service import import_csv, ImporterError
+            csv_upload = st.file_uploader("CSV export", type=["csv"], key="import_csv_file")
+            kg_to_lb = st.checkbox("Convert kg to lb", key="import_kg_to_lb")
+            if csv_upload and st.button("Import", key="import_csv_btn"):
+                try:
+                    with st.spinner("Importing..."):
+                        result = import_csv(csv_upload, weight_factor=2.20462 if kg_to_lb else 1.0)
+                    st.success(
+                        f"Imported {result['sessions']} sessions and {result['sets']} sets "
+                        f"({result['exercises']} new exercises, {result['skipped_sessions']} dates skipped)."
+                    )
+                except ImporterError as e:
+                    st.error(str(e))
 
     # ========================================
     # EDIT VIEW (Single template editor)
@@ -140,7 +225,8 @@ with tab_templates:
                 st.session_state["template_view_mode"] = "list"
             else:
                 # Header / Rename / Delete
-                col1, col2, col3 = st.columns([3, 1, 1])
+                col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
+                progression_labels = {name: p.label for name, p in PROGRESSION_POLICIES.items()}
                 with col1:
                     # Use a unique key per template to avoid state bleeding
                     new_name = st.text_input("Template Name", value=template['name'], key=f"template_name_{template['id']}")
@@ -150,12 +236,69 @@ with tab_templates:
                             st.rerun()
                         except ValidationError as e:
                             st.error(str(e))
+                with col2:
+                    sync_labels = {
+                        "ALWAYS": "After every set",
+                        "SESSION_END": "When workout finishes",
+                        "NEVER": "Never"
+                    }
+                    current_policy = template.get('sync_policy') or "SESSION_END"
+                    new_policy = st.selectbox(
+                        "Sync actuals to template",
+                        options=list(sync_labels.keys()),
+                        index=list(sync_labels.keys()).index(current_policy),
+                        format_func=lambda x: sync_labels[x],
+                        key=f"sync_policy_{template['id']}"
+                    )
+                    if new_policy != current_policy:
+                        try:
+                            update_sync_policy(template['id'], new_policy)
+                            st.rerun()
+                        except ValidationError as e:
+                            st.error(str(e))
                 with col3:
+                    current_progression = template.get('progression_policy') or "CURSOR"
+                    new_progression = st.selectbox(
+                        "Progression",
+                        options=list(progression_labels.keys()),
+                        index=list(progression_labels.keys()).index(current_progression),
+                        format_func=lambda x: progression_labels[x],
+                        key=f"progression_policy_{template['id']}"
+                    )
+                    if new_progression != current_progression:
+                        try:
+                            update_progression_policy(template['id'], new_progression)
+                            st.rerun()
+                        except ValidationError as e:
+                            st.error(str(e))
+                with col4:
                     if st.button("Delete Template", type="primary"):
                         delete_template(template['id'])
                         st.session_state["template_view_mode"] = "list"
                         st.rerun()
 
+                with st.expander("Clone"):
+                    cc1, cc2 = st.columns(2)
+                    with cc1:
+                        clone_name = st.text_input("New name", value=f"{template['name']} (copy)", key=f"clone_name_{template['id']}")
+                        if st.button("Clone Template", key=f"clone_{template['id']}"):
+                            try:
+                                st.session_state["selected_template_id"] = clone_template(template['id'], clone_name)
+                                st.rerun()
+                            except ValidationError as e:
+                                st.error(str(e))
+                    with cc2:
+                        percents_text = st.text_input("Scaled copies (% of weights)", value="60, 70, 80", key=f"clone_pcts_{template['id']}")
+                        if st.button("Create Scaled Copies", key=f"clone_scaled_{template['id']}"):
+                            try:
+                                percents = [float(p) for p in percents_text.replace(";", ",").split(",") if p.strip()]
+                                new_ids = clone_template_scaled(template['id'], percents)
+                                st.success(f"Created {len(new_ids)} templates.")
+                            except ValueError:
+                                st.error("Enter percentages as numbers, e.g. 60, 70, 80.")
+                            except ValidationError as e:
+                                st.error(str(e))
+
                 st.divider()
 
                 # --- Exercises List ---
@@ -184,6 +327,24 @@ with tab_templates:
                                     current_order[i], current_order[i+1] = current_order[i+1], current_order[i]
                                     reorder_exercises(template['id'], current_order)
                                     st.rerun()
+                        with c3:
+                            # None inherits the template's policy
+                            ex_options = [None] + list(progression_labels.keys())
+                            current_ex_policy = ex.get('progression_policy')
+                            new_ex_policy = st.selectbox(
+                                "Progression",
+                                options=ex_options,
+                                index=ex_options.index(current_ex_policy),
+                                format_func=lambda x: "Template default" if x is None else progression_labels[x],
+                                key=f"ex_progression_{ex['id']}",
+                                label_visibility="collapsed"
+                            )
+                            if new_ex_policy != current_ex_policy:
+                                try:
+                                    update_exercise_progression_policy(ex['id'], new_ex_policy)
+                                    st.rerun()
+                                except ValidationError as e:
+                                    st.error(str(e))
                         with c4:
                             if st.button("Remove", key=f"remove_{ex['id']}", type="primary"):
                                 remove_exercise(ex['id'])
@@ -312,6 +473,75 @@ with tab_schedule:
             except PlannerError as e:
                 st.error(str(e))
 
+    # --- Recurring Schedule ---
+    # Rules fill matching days on the fly; assigning or clearing a day overrides them
+    with st.expander("Recurring Schedule"):
+        weekday_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+        rule_templates = {t['id']: t['name'] for t in get_all_templates()}
+        for rule in get_rules():
+            rc1, rc2 = st.columns([5, 1])
+            with rc1:
+                what = rule['template_name'] if rule['plan_type'] == 'WORKOUT' else "Rest"
+                first = datetime.datetime.strptime(rule['start_date'], '%Y-%m-%d')
+                when = (f"every {weekday_names[first.weekday()]}" if rule['period_days'] == 7
+                        else f"every {rule['period_days']} days")
+                st.caption(f"{what} · {when} · from {rule['start_date']} to {rule['end_date'] or 'open'}")
+            with rc2:
+                if st.button("Remove", key=f"del_rule_{rule['id']}"):
+                    delete_rule(rule['id'])
+                    st.rerun()
+
+        rr1, rr2, rr3, rr4 = st.columns(4)
+        with rr1:
+            rule_weekday = st.selectbox("Weekday", options=range(7), format_func=lambda x: weekday_names[x], key="rule_weekday")
+        with rr2:
+            rule_template = st.selectbox(
+                "Plan", options=[None] + list(rule_templates),
+                format_func=lambda x: "Rest" if x is None else rule_templates[x], key="rule_template"
+            )
+        with rr3:
+            rule_start = st.date_input("From", value=assign_date, key="rule_start")
+        with rr4:
+            rule_end = st.date_input("Until", value=None, key="rule_end")
+        if st.button("Add Weekly Rule"):
+            try:
+                add_weekly_rule(
+                    rule_weekday, rule_template, rule_start.strftime('%Y-%m-%d'),
+                    rule_end.strftime('%Y-%m-%d') if rule_end else None
+                )
+                st.rerun()
+            except PlannerError as e:
+                st.error(str(e))
+
+    # --- Reschedule ---
+    # Started and completed sessions are never moved or cleared
+    with st.expander("Reschedule"):
+        rs1, rs2, rs3 = st.columns(3)
+        with rs1:
+            range_start = st.date_input("From", value=assign_date, key="range_start")
+        with rs2:
+            range_end = st.date_input("To", value=assign_date + datetime.timedelta(days=6), key="range_end")
+        with rs3:
+            other_date = st.date_input("Other date / target week", value=assign_date + datetime.timedelta(days=7), key="range_other")
+        shift_days = st.number_input("Shift by days", value=1, step=1, key="range_shift_days")
+        start_str, end_str, other_str = (d.strftime('%Y-%m-%d') for d in (range_start, range_end, other_date))
+        ra1, ra2, ra3, ra4 = st.columns(4)
+        try:
+            if ra1.button("Shift range"):
+                moved = shift_range(start_str, end_str, int(shift_days))
+                st.success(f"Moved {moved} days.")
+            if ra2.button("Swap From ↔ Other"):
+                swap_days(start_str, other_str)
+                st.success(f"Swapped {start_str} and {other_str}.")
+            if ra3.button("Copy week From → Other"):
+                written = copy_week(start_str, other_str)
+                st.success(f"Copied {written} days.")
+            if ra4.button("Clear range"):
+                clear_range(start_str, end_str)
+                st.success(f"Cleared {start_str} to {end_str}.")
+        except PlannerError as e:
+            st.error(str(e))
+
     st.divider()
 
     # --- Week Overview ---
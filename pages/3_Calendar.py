@@ -1,8 +1,9 @@
 import streamlit as st
 import calendar
 import datetime
-from core.timeutil import today_str_et
+from core.timeutil import today_str_et, get_week_start, get_week_end, format_duration
 from repos.planner_repo import get_range
+from repos import workout_summary_repo
 
 st.set_page_config(page_title="Calendar", page_icon="📅", layout="wide")
 
@@ -43,29 +44,31 @@ st.markdown("""
 
 st.title("Calendar")
 
-from services.consistency_service import calculate_current_streak
+from services.consistency_service import calculate_current_streak, get_week_summary
 
 # --- Weekly KPI Panel ---
-today_dt = datetime.datetime.strptime(today_str_et(), '%Y-%m-%d')
-week_start = today_dt - datetime.timedelta(days=today_dt.weekday())
-week_end = week_start + datetime.timedelta(days=6)
+# Read from the weekly_summary rollup (kept current by the planner/runner write paths)
+week_summary = get_week_summary(today_str_et())
 
-week_plans = get_range(week_start.strftime('%Y-%m-%d'), week_end.strftime('%Y-%m-%d'))
-
-planned_days = len(week_plans)
-planned_workouts = sum(1 for p in week_plans if p['plan_type'] == 'WORKOUT')
-completed_workouts = sum(1 for p in week_plans if p['plan_type'] == 'WORKOUT' and p.get('status') == 'COMPLETED')
+planned_days = week_summary['planned_days']
+planned_workouts = week_summary['planned_workouts']
+completed_workouts = week_summary['completed_workouts']
 remaining_workouts = max(0, planned_workouts - completed_workouts)
 
 # Streak
-current_streak = calculate_current_streak(today_str_et())
+streak = calculate_current_streak(today_str_et())
+
+# Session totals for the week, from the per-session summary rows
+week_totals = workout_summary_repo.get_totals(get_week_start(today_str_et()), get_week_end(today_str_et()))
 
-kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
+kpi1, kpi2, kpi3, kpi4, kpi5, kpi6, kpi7 = st.columns(7)
 kpi1.metric("Planned", planned_days)
 kpi2.metric("Workouts", planned_workouts)
 kpi3.metric("Done", completed_workouts)
 kpi4.metric("Remaining", remaining_workouts)
-kpi5.metric("Streak", f"{current_streak}w")
+kpi5.metric("Streak", f"{streak['current']}w", help=f"Longest: {streak['longest']}w")
+kpi6.metric("Time", format_duration(week_totals['duration_seconds']))
+kpi7.metric("Volume", f"{week_totals['tonnage']:,.0f}", help=f"{week_totals['sets_completed']} sets · {week_totals['prs_hit']} PRs")
 
 st.divider()
 
@@ -118,6 +121,20 @@ end_date = f"{current_year}-{current_month:02d}-{last_day:02d}"
 
 plans = get_range(start_date, end_date)
 plans_map = {p['date']: p for p in plans}
+summaries_map = {s['workout_id']: s for s in workout_summary_repo.get_range(start_date, end_date)}
+
+def summary_tooltip(workout_id):
+    summary = summaries_map.get(workout_id)
+    if not summary:
+        return ""
+    tip = (
+        f"{format_duration(summary['duration_seconds'])} · "
+        f"{summary['sets_completed']}/{summary['sets_planned']} sets · "
+        f"{summary['tonnage']:,.0f} lbs"
+    )
+    if summary['prs_hit']:
+        tip += f" · {summary['prs_hit']} PRs"
+    return tip
 
 # --- Render Grid ---
 # Days Header
@@ -145,7 +162,8 @@ for week in cal_matrix:
                     if plan['plan_type'] == 'WORKOUT':
                         status = plan.get('status', 'PLANNED')
                         if status == 'COMPLETED':
-                            st.markdown(f"<div class='cal-workout-done'>{label}<br><small>✓ {plan['name']}</small></div>", unsafe_allow_html=True)
+                            tip = summary_tooltip(plan['id'])
+                            st.markdown(f"<div class='cal-workout-done' title='{tip}'>{label}<br><small>✓ {plan['name']}</small></div>", unsafe_allow_html=True)
                         elif status == 'ACTIVE':
                             st.markdown(f"<div class='cal-workout-active'>{label}<br><small>● {plan['name']}</small></div>", unsafe_allow_html=True)
                         else:
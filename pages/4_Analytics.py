@@ -0,0 +1,177 @@
+import streamlit as st
+import numpy as np
+from services import analytics_service, load_service, trend_service, timing_service
+from repos.exercises_repo import get_all_exercises
+from core.timeutil import today_str_et
+
+st.set_page_config(page_title="Analytics", page_icon="📈", layout="wide")
+
+from core.security import require_login
+require_login()
+
+# --- Monochrome CSS ---
+st.markdown("""
+<style>
+    .stAlert > div[data-testid="stNotification"] {
+        background-color: #1a1a1a !important;
+        border-color: #333 !important;
+        color: #e0e0e0 !important;
+    }
+    hr { border-color: #222 !important; }
+    div[data-testid="stMetric"] label { color: #888 !important; }
+</style>
+""", unsafe_allow_html=True)
+
+st.title("Analytics")
+
+formula = st.radio("1RM Formula", ["epley", "brzycki"], horizontal=True, format_func=str.capitalize)
+
+totals = analytics_service.get_exercise_totals(formula)
+
+if totals is None:
+    st.caption("No completed sets yet. Finish a workout to see analytics.")
+    st.stop()
+
+exercise_names = {e['id']: e['name'] for e in get_all_exercises()}
+
+# --- All-time Overview ---
+st.subheader("All Time")
+st.dataframe(
+    {
+        "Exercise": [exercise_names.get(int(e), f"#{e}") for e in totals["exercise_id"]],
+        "Sets": totals["sets"],
+        "Reps": totals["reps"].astype(np.int64),
+        "Tonnage (lbs)": np.round(totals["tonnage"], 1),
+        "Best e1RM": np.round(totals["best_e1rm"], 1),
+    },
+    hide_index=True,
+    use_container_width=True
+)
+
+st.divider()
+
+# --- Plateaus ---
+st.subheader("Trends")
+trend_window = st.slider("Sessions", min_value=4, max_value=20, value=trend_service.DEFAULT_WINDOW)
+trends = trend_service.get_trends(trend_window, formula)
+flagged = trend_service.get_flagged(trend_window, formula)
+
+t1, t2, t3 = st.columns(3)
+t1.metric("Improving", int((trends["status"] == trend_service.IMPROVING).sum()))
+t2.metric("Stalled", int((trends["status"] == trend_service.STALLED).sum()))
+t3.metric("Regressed", int((trends["status"] == trend_service.REGRESSED).sum()))
+
+if len(flagged["exercise_id"]) == 0:
+    st.caption("Nothing stalled or regressing.")
+else:
+    st.dataframe(
+        {
+            "Exercise": [exercise_names.get(int(e), f"#{e}") for e in flagged["exercise_id"]],
+            "Status": [s.capitalize() for s in flagged["status"]],
+            "Sessions": flagged["sessions"],
+            "e1RM / session": np.round(flagged["e1rm_slope"], 2),
+            "e1RM % / session": np.round(flagged["e1rm_rel_slope"] * 100, 2),
+            "Top-set reps / session": np.round(flagged["reps_slope"], 2),
+            "Last e1RM": np.round(flagged["last_e1rm"], 1),
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+st.divider()
+
+# --- Per Exercise, Per Week ---
+st.subheader("Weekly")
+exercise_ids = [int(e) for e in totals["exercise_id"]]
+selected_ex = st.selectbox(
+    "Exercise",
+    options=exercise_ids,
+    format_func=lambda x: exercise_names.get(x, f"#{x}")
+)
+
+weekly = analytics_service.get_exercise_weekly_stats(selected_ex, formula)
+weeks = [str(w) for w in weekly["week_start"]]
+
+latest = len(weeks) - 1
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Best e1RM", f"{weekly['best_e1rm'].max():.1f}")
+m2.metric("Last Week Tonnage", f"{weekly['tonnage'][latest]:,.0f}")
+m3.metric("Last Week Sets", int(weekly['sets'][latest]))
+intensity = weekly['intensity'][latest]
+m4.metric("Last Week Intensity", "—" if np.isnan(intensity) else f"{intensity:.0%}")
+
+c1, c2 = st.columns(2)
+with c1:
+    st.caption("Estimated 1RM")
+    st.line_chart({"week": weeks, "e1RM": weekly["best_e1rm"]}, x="week", y="e1RM")
+with c2:
+    st.caption("Tonnage")
+    st.bar_chart({"week": weeks, "tonnage": weekly["tonnage"]}, x="week", y="tonnage")
+
+st.dataframe(
+    {
+        "Week of": weeks,
+        "Sets": weekly["sets"],
+        "Reps": weekly["reps"].astype(np.int64),
+        "Tonnage": np.round(weekly["tonnage"], 1),
+        "Avg Weight": np.round(weekly["avg_weight"], 1),
+        "Best e1RM": np.round(weekly["best_e1rm"], 1),
+        "Intensity": np.round(weekly["intensity"], 3),
+    },
+    hide_index=True,
+    use_container_width=True
+)
+
+st.divider()
+
+# --- Training Load ---
+st.subheader("Training Load")
+lc1, lc2 = st.columns(2)
+with lc1:
+    load_measure = st.radio("Load", ["tonnage", "reps"], horizontal=True, format_func=str.capitalize)
+with lc2:
+    load_scope = st.radio("Scope", ["All exercises", "Selected exercise"], horizontal=True)
+
+if load_scope == "All exercises":
+    load_dates, load = load_service.get_total_load(today_str_et(), load_measure)
+else:
+    load_dates, load = load_service.get_exercise_load(today_str_et(), selected_ex, load_measure)
+
+if load is None:
+    st.caption("No load history yet.")
+else:
+    window = slice(-90, None)
+    load_days = [str(d) for d in load_dates[window]]
+    acwr = load["acwr"][-1]
+    ewma_acwr = load["ewma_acwr"][-1]
+    l1, l2, l3 = st.columns(3)
+    l1.metric("Acute (7d)", f"{load['acute_7'][-1]:,.0f}")
+    l2.metric("ACWR", "—" if np.isnan(acwr) else f"{acwr:.2f}")
+    l3.metric("EWMA ACWR", "—" if np.isnan(ewma_acwr) else f"{ewma_acwr:.2f}")
+    st.line_chart(
+        {
+            "day": load_days,
+            "acute (7d avg)": load["acute_7"][window] / load_service.ACUTE_DAYS,
+            "chronic (28d avg)": load["chronic_28"][window] / load_service.CHRONIC_DAYS,
+        },
+        x="day"
+    )
+    st.line_chart({"day": load_days, "ACWR": load["acwr"][window], "EWMA ACWR": load["ewma_acwr"][window]}, x="day")
+
+st.divider()
+
+# --- Timing ---
+st.subheader("Rest")
+rest = timing_service.get_exercise_rest_medians()
+if rest is None:
+    st.caption("No timed sets yet. Start each set's timer to track rest.")
+else:
+    st.dataframe(
+        {
+            "Exercise": [exercise_names.get(int(e), f"#{e}") for e in rest["exercise_id"]],
+            "Median Rest (s)": np.round(rest["median_rest"]).astype(np.int64),
+            "Samples": rest["samples"],
+        },
+        hide_index=True,
+        use_container_width=True
+    )
@@ -0,0 +1,95 @@
+import streamlit as st
+import datetime
+from services import progress_service
+from repos.exercises_repo import get_all_exercises
+
+st.set_page_config(page_title="Progress", page_icon="📉", layout="wide")
+
+from core.security import require_login
+require_login()
+
+# --- Monochrome CSS ---
+st.markdown("""
+<style>
+    .stAlert > div[data-testid="stNotification"] {
+        background-color: #1a1a1a !important;
+        border-color: #333 !important;
+        color: #e0e0e0 !important;
+    }
+    hr { border-color: #222 !important; }
+    div[data-testid="stMetric"] label { color: #888 !important; }
+</style>
+""", unsafe_allow_html=True)
+
+st.title("Progress")
+
+exercises = get_all_exercises()
+if not exercises:
+    st.caption("No exercises yet.")
+    st.stop()
+
+exercise_names = {e['id']: e['name'] for e in exercises}
+
+c1, c2, c3 = st.columns([2, 1, 1])
+with c1:
+    selected_ex = st.selectbox(
+        "Exercise",
+        options=list(exercise_names.keys()),
+        format_func=lambda x: exercise_names[x]
+    )
+with c2:
+    formula = st.radio("1RM Formula", ["epley", "brzycki"], horizontal=True, format_func=str.capitalize)
+with c3:
+    method = st.radio(
+        "Downsampling", list(progress_service.METHODS), horizontal=True,
+        format_func=lambda m: "LTTB" if m == "lttb" else "Min/Max"
+    )
+
+first_date, last_date = progress_service.get_date_bounds(selected_ex)
+if not first_date:
+    st.caption("No completed sets for this exercise yet.")
+    st.stop()
+
+first = datetime.datetime.strptime(first_date, '%Y-%m-%d').date()
+last = datetime.datetime.strptime(last_date, '%Y-%m-%d').date()
+
+# --- Zoom ---
+# The window is keyed per exercise so switching exercises starts fully zoomed out.
+zoom_key = f"progress_zoom_{selected_ex}"
+
+def reset_zoom():
+    st.session_state[zoom_key] = (first, last)
+
+z1, z2 = st.columns([4, 1])
+with z1:
+    window = st.date_input("Window", value=(first, last), min_value=first, max_value=last, key=zoom_key)
+with z2:
+    st.button("Reset zoom", on_click=reset_zoom)
+
+if not isinstance(window, (tuple, list)) or len(window) != 2:
+    st.caption("Pick a start and end date.")
+    st.stop()
+
+start_str = window[0].strftime('%Y-%m-%d')
+end_str = window[1].strftime('%Y-%m-%d')
+
+# Only the selected window is queried; each series comes back at most POINT_BUDGET points.
+series = progress_service.get_progress_series(selected_ex, start_str, end_str, method=method, formula=formula)
+if series is None:
+    st.caption("No completed sets in this window.")
+    st.stop()
+
+e1rm = series["e1rm"]
+weight = series["weight"]
+m1, m2, m3 = st.columns(3)
+m1.metric("Best e1RM", f"{e1rm['value'].max():.1f}")
+m2.metric("Top Weight", f"{weight['value'].max():.1f}")
+m3.metric("Sessions", series["total_points"])
+
+for name, label in (("e1rm", "Estimated 1RM"), ("weight", "Top Set Weight"), ("reps", "Max Reps")):
+    points = series[name]
+    st.caption(f"{label} · {len(points['date'])} of {series['total_points']} points")
+    st.line_chart(
+        {"date": [str(d) for d in points["date"]], label: points["value"]},
+        x="date", y=label
+    )
@@ -0,0 +1,81 @@
+import streamlit as st
+import datetime
+from services import history_service
+from core.timeutil import format_duration
+
+st.set_page_config(page_title="History", page_icon="🗂️", layout="wide")
+
+from core.security import require_login
+require_login()
+
+# --- Monochrome CSS ---
+st.markdown("""
+<style>
+    .stAlert > div[data-testid="stNotification"] {
+        background-color: #1a1a1a !important;
+        border-color: #333 !important;
+        color: #e0e0e0 !important;
+    }
+    hr { border-color: #222 !important; }
+    div[data-testid="stMetric"] label { color: #888 !important; }
+</style>
+""", unsafe_allow_html=True)
+
+st.title("History")
+
+# --- Pagination State ---
+# Stack of keyset cursors: entry i is the (date, workout_id) the i-th page starts after.
+if "history_cursors" not in st.session_state:
+    st.session_state["history_cursors"] = [None]
+
+cursors = st.session_state["history_cursors"]
+page, next_before = history_service.get_history_page(cursors[-1])
+
+if not page and len(cursors) == 1:
+    st.caption("No completed workouts yet.")
+    st.stop()
+
+def newer_page():
+    st.session_state["history_cursors"].pop()
+
+def older_page():
+    st.session_state["history_cursors"].append(next_before)
+
+def first_page():
+    st.session_state["history_cursors"] = [None]
+
+n1, n2, n3, n4 = st.columns([1, 1, 1, 3])
+with n1:
+    st.button("Newest", on_click=first_page, disabled=len(cursors) == 1)
+with n2:
+    st.button("‹ Newer", on_click=newer_page, disabled=len(cursors) == 1)
+with n3:
+    st.button("Older ›", on_click=older_page, disabled=next_before is None)
+with n4:
+    st.caption(f"Page {len(cursors)}")
+
+st.divider()
+
+for summary in page:
+    display_date = datetime.datetime.strptime(summary['date'], '%Y-%m-%d').strftime('%a, %b %d %Y')
+    
+    c1, c2, c3, c4, c5 = st.columns([3, 1, 1, 1, 1])
+    with c1:
+        st.markdown(f"**{summary['name'] or 'Workout'}**")
+        st.caption(display_date)
+    c2.metric("Duration", format_duration(summary['duration_seconds']))
+    c3.metric("Sets", f"{summary['sets_completed']}/{summary['sets_planned']}")
+    c4.metric("Volume", f"{summary['tonnage']:,.0f}")
+    c5.metric("PRs", summary['prs_hit'])
+    
+    # Sets are only fetched for rows the user opens
+    if st.toggle("Show sets", key=f"history_open_{summary['workout_id']}"):
+        for ex in history_service.get_session_sets(summary['workout_id']):
+            st.markdown(f"**{ex['order_index']}. {ex['name']}**")
+            for s in ex['sets']:
+                if s['completed']:
+                    st.caption(f"S{s['set_number']}: {s['actual_reps']} × {s['actual_weight']}  (planned {s['planned_reps']} × {s['planned_weight']})")
+                else:
+                    st.caption(f"S{s['set_number']}: skipped  (planned {s['planned_reps']} × {s['planned_weight']})")
+    
+    st.divider()
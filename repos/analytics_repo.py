@@ -0,0 +1,93 @@
+from db.conn import query_one, query_all
+
+def get_data_version():
+    """Returns the set-history version number, bumped by triggers on every write."""
+    row = query_one("SELECT version FROM data_version WHERE id = 1")
+    return row[0] if row else 0
+
+def get_cache_key():
+    """
+    Returns a key for caches that outlive the process (e.g. on disk): the database's
+    identity, the data version, and the set count and highest set id. The version
+    alone starts at 0 in every database and can repeat after a point-in-time restore.
+    """
+    row = query_one("""
+        SELECT (SELECT database_id FROM database_identity WHERE id = 1),
+               (SELECT version FROM data_version WHERE id = 1),
+               (SELECT COUNT(*) FROM sets),
+               (SELECT COALESCE(MAX(id), 0) FROM sets)
+    """)
+    return f"{row[0] or 'local'}-{row[1] or 0}-{row[2]}-{row[3]}"
+
+def get_exercise_sets(exercise_id, start_date, end_date):
+    """
+    Returns completed sets for one exercise in a date window as column lists:
+    (dates, reps, weights), ordered by date.
+    """
+    rows = query_all("""
+        SELECT w.date, s.actual_reps, s.actual_weight
+        FROM sets s
+        JOIN workout_exercises we ON s.workout_exercise_id = we.id
+        JOIN workouts w ON we.workout_id = w.id
+        WHERE we.exercise_id = ?
+          AND w.date >= ? AND w.date <= ?
+          AND s.completed = 1 AND s.actual_reps IS NOT NULL
+        ORDER BY w.date
+    """, (exercise_id, start_date, end_date))
+    
+    if not rows:
+        return [], [], []
+    dates, reps, weights = zip(*rows)
+    return list(dates), list(reps), list(weights)
+
+def get_exercise_date_bounds(exercise_id):
+    """Returns (first_date, last_date) of completed sets for an exercise, or (None, None)."""
+    row = query_one("""
+        SELECT MIN(w.date), MAX(w.date)
+        FROM sets s
+        JOIN workout_exercises we ON s.workout_exercise_id = we.id
+        JOIN workouts w ON we.workout_id = w.id
+        WHERE we.exercise_id = ? AND s.completed = 1
+    """, (exercise_id,))
+    if not row:
+        return None, None
+    return row[0], row[1]
+
+def get_template_session_history():
+    """
+    Returns every set of every COMPLETED template session as rows of
+    (workout_id, template_id, date, order_index, exercise_id, set_number,
+     planned_reps, planned_weight, completed, actual_reps, actual_weight),
+    ordered by template, date, workout, exercise order and set number.
+    """
+    return query_all("""
+        SELECT w.id, w.template_id, w.date, ss.order_index, ss.exercise_id,
+               ss.set_number, ss.planned_reps, ss.planned_weight, ss.completed, ss.actual_reps, ss.actual_weight
+        FROM workouts w
+        JOIN session_sets ss ON ss.workout_id = w.id
+        WHERE w.status = 'COMPLETED' AND w.template_id IS NOT NULL
+        ORDER BY w.template_id, w.date, w.id, ss.order_index, ss.set_number
+    """)
+
+def count_sets():
+    """Returns the number of set rows."""
+    row = query_one("SELECT COUNT(*) FROM sets")
+    return row[0] if row else 0
+
+def get_set_history_page(after_set_id, limit):
+    """
+    Returns one keyset page of set history ordered by set id:
+    (set_id, date, workout_id, exercise_id, set_number, planned_reps, planned_weight,
+     actual_reps, actual_weight, completed, started_at, completed_at).
+    """
+    return query_all("""
+        SELECT s.id, w.date, w.id, we.exercise_id, s.set_number,
+               s.planned_reps, s.planned_weight, s.actual_reps, s.actual_weight,
+               s.completed, s.started_at, s.completed_at
+        FROM sets s
+        JOIN workout_exercises we ON s.workout_exercise_id = we.id
+        JOIN workouts w ON we.workout_id = w.id
+        WHERE s.id > ?
+        ORDER BY s.id
+        LIMIT ?
+    """, (after_set_id, limit))
@@ -1,16 +1,63 @@
-from db.conn import query_all
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from contextlib import contextmanager
+from libsql_client import Statement
+from db.conn import execute, execute_batch, query_all, query_one
+
+# Tables that hold user data, in FK order (parents first). Everything else is
+# derived and can be rebuilt from these.
+BACKUP_TABLES = [
+    "exercises",
+    "templates",
+    "template_exercises",
+    "template_sets",
+    "template_versions",
+    "template_version_exercises",
+    "template_version_sets",
+    "workouts",
+    "workout_exercises",
+    "sets",
+    "schedule_rules",
+    "schedule_skips"
+]
+
+def change_tracking_sql(table):
+    """CREATE TRIGGER statements that feed change_log from a backed-up table."""
+    return [f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_change_{event.lower()}
+        AFTER {event} ON {table}
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {ref}.rowid, '{op}');
+        END
+    """ for op, event, ref in (("I", "INSERT", "NEW"), ("U", "UPDATE", "NEW"), ("D", "DELETE", "OLD"))]
+
+NDJSON_FORMAT = "workout-manager-ndjson"
+NDJSON_VERSION = 1
+LEGACY_FORMAT = "legacy-json"
+PAGE_SIZE = 500
+
+# Restores send this many rows per client.batch, split into multi-row INSERTs that
+# stay under SQLite's historical 999 bound-parameter limit.
+RESTORE_BATCH_ROWS = 300
+MAX_VARIABLES = 900
+
+# Columns under a UNIQUE (parent, position) constraint. Incremental restores park
+# them at -id before upserting so reordered rows don't collide mid-batch.
+_SLOT_COLUMNS = {
+    "template_exercises": "order_index",
+    "template_sets": "set_number",
+    "workout_exercises": "order_index",
+    "sets": "set_number"
+}
 
 def export_data():
     """Fetches all data from critical tables."""
-    tables = [
-        "exercises", 
-        "templates", 
-        "template_exercises", 
-        "template_sets", 
-        "workouts", 
-        "workout_exercises", 
-        "sets"
-    ]
+    tables = BACKUP_TABLES
     
     data = {}
     
@@ -34,3 +81,403 @@ def export_data():
         data[table] = rows
         
     return data
+
+def get_columns(table):
+    """Returns the table's column names in schema order (the order SELECT * uses)."""
+    return [r[1] for r in query_all(f"PRAGMA table_info({table})")]
+
+def iter_table_pages(table, columns, page_size=PAGE_SIZE):
+    """Yields pages of rows (without rowid) walking the table by rowid, one keyset query per page."""
+    select = ", ".join(columns)
+    last_rowid = 0
+    while True:
+        rows = query_all(
+            f"SELECT rowid, {select} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (last_rowid, page_size)
+        )
+        if not rows:
+            return
+        last_rowid = rows[-1][0]
+        yield [r[1:] for r in rows]
+
+def _file_header(tables, header):
+    record = {
+        "format": NDJSON_FORMAT,
+        "version": NDJSON_VERSION,
+        "created_at": datetime.datetime.now().isoformat(),
+        "tables": tables
+    }
+    record.update(header or {})
+    return json.dumps(record) + "\n"
+
+def iter_ndjson(tables=None, page_size=PAGE_SIZE, header=None, stats=None):
+    """
+    Yields the export as NDJSON text, one page of lines at a time:
+    - a file header {"format", "version", "created_at", "tables", **header}
+    - per table, a header {"table", "columns"} followed by one JSON array per row
+    - a footer {"end": true, "counts": {table: rows}}
+    Only one page of rows is held in memory. If given, stats is filled with the counts.
+    """
+    tables = tables or BACKUP_TABLES
+    yield _file_header(tables, header)
+    
+    counts = {} if stats is None else stats
+    for table in tables:
+        columns = get_columns(table)
+        yield json.dumps({"table": table, "columns": columns}) + "\n"
+        counts[table] = 0
+        for rows in iter_table_pages(table, columns, page_size):
+            counts[table] += len(rows)
+            yield "".join(json.dumps(list(r), default=str) + "\n" for r in rows)
+    
+    yield json.dumps({"end": True, "counts": counts}) + "\n"
+
+def iter_changes_ndjson(from_seq, to_seq, tables=None, page_size=PAGE_SIZE, header=None, stats=None):
+    """
+    Yields an incremental export of rows changed in change_log (from_seq, to_seq]:
+    same layout as iter_ndjson, where each table's rows are the current values of
+    inserted/updated rows, followed by {"table", "deleted": [rowids]} when rows were removed.
+    If given, stats is filled with the row counts and a "deleted" sub-dict.
+    """
+    tables = tables or BACKUP_TABLES
+    yield _file_header(tables, header)
+    
+    counts = {} if stats is None else stats
+    deleted_counts = {}
+    for table in tables:
+        columns = get_columns(table)
+        yield json.dumps({"table": table, "columns": columns}) + "\n"
+        counts[table] = 0
+        select = ", ".join(columns)
+        last_rowid = 0
+        while True:
+            rows = query_all(f"""
+                SELECT rowid, {select} FROM {table}
+                WHERE rowid > ? AND rowid IN (
+                    SELECT row_id FROM change_log WHERE table_name = ? AND seq > ? AND seq <= ?
+                )
+                ORDER BY rowid LIMIT ?
+            """, (last_rowid, table, from_seq, to_seq, page_size))
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            counts[table] += len(rows)
+            yield "".join(json.dumps(list(r[1:]), default=str) + "\n" for r in rows)
+        
+        deleted = [r[0] for r in query_all(f"""
+            SELECT DISTINCT row_id FROM change_log
+            WHERE table_name = ? AND seq > ? AND seq <= ?
+              AND row_id NOT IN (SELECT rowid FROM {table})
+            ORDER BY row_id
+        """, (table, from_seq, to_seq))]
+        if deleted:
+            deleted_counts[table] = len(deleted)
+            yield json.dumps({"table": table, "deleted": deleted}) + "\n"
+    
+    footer = {"end": True, "counts": dict(counts), "deleted": deleted_counts}
+    counts["deleted"] = deleted_counts
+    yield json.dumps(footer) + "\n"
+
+def gzip_chunks(texts):
+    """Compresses an iterable of text into gzip byte chunks."""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for text in texts:
+        chunk = compressor.compress(text.encode("utf-8"))
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+def iter_export_gzip(tables=None, page_size=PAGE_SIZE):
+    """Yields the NDJSON export as gzip-compressed byte chunks."""
+    return gzip_chunks(iter_ndjson(tables, page_size))
+
+def write_tempfile(chunks):
+    """Writes byte chunks to a temp file. Returns (path, sha256 hex). The caller deletes the file."""
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(prefix="workout_backup_", suffix=".ndjson.gz", delete=False) as f:
+        for chunk in chunks:
+            digest.update(chunk)
+            f.write(chunk)
+        return f.name, digest.hexdigest()
+
+def export_to_tempfile(tables=None, page_size=PAGE_SIZE):
+    """Streams the gzip NDJSON export to a temp file and returns its path. The caller deletes it."""
+    return write_tempfile(iter_export_gzip(tables, page_size))[0]
+
+def file_sha256(raw):
+    """Returns the sha256 hex of a binary file object, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: raw.read(1 << 16), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+# --- Restore ---
+
+@contextmanager
+def open_source(source):
+    """Yields a binary file object positioned at the start: opens paths, rewinds uploads."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield f
+    else:
+        source.seek(0)
+        yield source
+
+def _lines(raw):
+    magic = raw.read(2)
+    raw.seek(0)
+    if magic == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    return raw
+
+def iter_backup(raw, batch_rows=RESTORE_BATCH_ROWS):
+    """
+    Parses a backup (the legacy JSON export, or NDJSON, plain or gzip) into records:
+    - ("header", dict)
+    - ("table", table, columns) when a table starts
+    - ("rows", table, columns, rows) in chunks of at most batch_rows
+    - ("deleted", table, rowids) for incremental files
+    - ("end", footer), where footer is None for legacy files or a truncated NDJSON file
+    NDJSON is read line by line; only one chunk of rows is held in memory.
+    Raises ValueError (or gzip/EOF errors) on unreadable input.
+    """
+    lines = _lines(raw)
+    first = lines.readline()
+    try:
+        header = json.loads(first)
+    except ValueError:
+        header = None
+    if not (isinstance(header, dict) and header.get("format") == NDJSON_FORMAT):
+        yield from _iter_legacy(first + lines.read(), batch_rows)
+        return
+    
+    yield ("header", header)
+    table = columns = None
+    rows = []
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if isinstance(record, list):
+            rows.append(record)
+            if len(rows) >= batch_rows:
+                yield ("rows", table, columns, rows)
+                rows = []
+            continue
+        if rows:
+            yield ("rows", table, columns, rows)
+            rows = []
+        if record.get("end"):
+            yield ("end", record)
+            return
+        if "deleted" in record:
+            yield ("deleted", record["table"], record["deleted"])
+        else:
+            table, columns = record["table"], record["columns"]
+            yield ("table", table, columns)
+    if rows:
+        yield ("rows", table, columns, rows)
+    yield ("end", None)
+
+def _iter_legacy(text, batch_rows):
+    # export_data(): {table: [row, ...]} with rows in SELECT * order. Columns added
+    # by later migrations are appended, so an older file maps onto a schema prefix.
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object of tables")
+    tables = [t for t in BACKUP_TABLES if t in data]
+    yield ("header", {"format": LEGACY_FORMAT, "kind": "FULL", "tables": tables})
+    for table in tables:
+        rows = data[table] or []
+        schema = get_columns(table)
+        columns = schema[:max(len(r) for r in rows)] if rows else schema
+        yield ("table", table, columns)
+        for i in range(0, len(rows), batch_rows):
+            yield ("rows", table, columns, rows[i:i + batch_rows])
+    yield ("end", None)
+
+def canonical_row(row):
+    """Returns the row's values with integral floats as ints, so rows compare equal after a JSON round trip."""
+    return [int(v) if isinstance(v, float) and v.is_integer() else v for v in row]
+
+def row_digest(row):
+    """Returns a 64-bit digest of one row's values."""
+    text = json.dumps(canonical_row(row), default=str)
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+def combine_digests(total, digest):
+    """Adds a row digest to a running table checksum. Order-independent."""
+    return (total + digest) % (1 << 64)
+
+def table_checksum(table, columns, ids=None):
+    """
+    Returns (row_count, checksum) over the given columns of a table, or of the rows
+    with the given ids. Matches the sum of row_digest over the backup's rows.
+    """
+    count, checksum = 0, 0
+    if ids is None:
+        pages = iter_table_pages(table, columns)
+    else:
+        select = ", ".join(columns)
+        pages = (
+            query_all(f"SELECT {select} FROM {table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            for chunk in _chunks(list(ids), MAX_VARIABLES)
+        )
+    for rows in pages:
+        for r in rows:
+            count += 1
+            checksum = combine_digests(checksum, row_digest(r))
+    return count, checksum
+
+def count_ids(table, ids):
+    """Returns how many of the given ids exist in a table."""
+    total = 0
+    for chunk in _chunks(list(ids), MAX_VARIABLES):
+        row = query_one(f"SELECT COUNT(*) FROM {table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+        total += row[0] if row else 0
+    return total
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def insert_statements(table, columns, rows, upsert=False):
+    """
+    Returns multi-row INSERT statements for the rows, each under MAX_VARIABLES parameters.
+    With upsert, existing ids are updated in place (no delete, so no FK cascade).
+    """
+    names = ", ".join(columns)
+    placeholder = "(" + ", ".join("?" * len(columns)) + ")"
+    suffix = ""
+    if upsert:
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "id")
+        suffix = f" ON CONFLICT(id) DO UPDATE SET {updates}"
+    statements = []
+    for chunk in _chunks(rows, max(1, MAX_VARIABLES // len(columns))):
+        values = ", ".join([placeholder] * len(chunk))
+        params = [v for r in chunk for v in r]
+        statements.append(Statement(f"INSERT INTO {table} ({names}) VALUES {values}{suffix}", params))
+    return statements
+
+def delete_statements(table, ids):
+    return [
+        Statement(f"DELETE FROM {table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+        for chunk in _chunks(list(ids), MAX_VARIABLES)
+    ]
+
+def park_statements(table, ids):
+    """Moves the rows' position column to -id so upserts can't hit the UNIQUE constraint."""
+    slot = _SLOT_COLUMNS.get(table)
+    if not slot:
+        return []
+    return [
+        Statement(f"UPDATE {table} SET {slot} = -id WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+        for chunk in _chunks(list(ids), MAX_VARIABLES)
+    ]
+
+def clear_statements():
+    """Deletes every backed-up table children first, plus the records that reference exercises."""
+    return [Statement("DELETE FROM personal_records")] + [
+        Statement(f"DELETE FROM {table}") for table in reversed(BACKUP_TABLES)
+    ]
+
+def run_batches(statement_groups):
+    """Runs each group of statements as one atomic client.batch."""
+    for statements in statement_groups:
+        if statements:
+            execute_batch(statements)
+
+def get_overload_cursors():
+    """Returns overload_tracking rows; a full restore cascades them away with the templates."""
+    return query_all("SELECT template_id, exercise_id, current_target_set FROM overload_tracking")
+
+def restore_cursor_statements(cursors):
+    """Re-inserts cursors whose template and exercise still exist."""
+    return [
+        Statement("""
+            INSERT OR IGNORE INTO overload_tracking (template_id, exercise_id, current_target_set)
+            SELECT ?, ?, ?
+            WHERE EXISTS (SELECT 1 FROM templates WHERE id = ?)
+              AND EXISTS (SELECT 1 FROM exercises WHERE id = ?)
+        """, (c[0], c[1], c[2], c[0], c[1]))
+        for c in cursors
+    ]
+
+# --- Change tracking / backup markers ---
+
+def get_database_id():
+    """Returns this database's random identity (see migration v22), or None before it exists."""
+    row = query_one("SELECT database_id FROM database_identity WHERE id = 1")
+    return row[0] if row else None
+
+def get_change_seq():
+    """Returns the latest change_log sequence number (0 when nothing was logged)."""
+    row = query_one("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+    return row[0] if row else 0
+
+def count_changes(from_seq, to_seq):
+    row = query_one("SELECT COUNT(*) FROM change_log WHERE seq > ? AND seq <= ?", (from_seq, to_seq))
+    return row[0] if row else 0
+
+def prune_change_log(up_to_seq):
+    """Drops change_log rows already covered by a full backup."""
+    execute("DELETE FROM change_log WHERE seq <= ?", (up_to_seq,))
+
+def get_pruned_seq():
+    """Returns the highest change_log seq that may have been pruned (the last full backup's to_seq)."""
+    row = query_one("SELECT COALESCE(MAX(to_seq), 0) FROM backup_markers WHERE kind = 'FULL'")
+    return row[0] if row else 0
+
+def get_changed_ranges(from_seq, width):
+    """Returns {table: {range_index}} for rows logged after from_seq, where range_index = rowid // width."""
+    changed = {}
+    for table, index in query_all(
+        "SELECT table_name, row_id / ? FROM change_log WHERE seq > ? GROUP BY 1, 2",
+        (width, from_seq)
+    ):
+        changed.setdefault(table, set()).add(index)
+    return changed
+
+def get_range_rows(table, columns, start_id, end_id):
+    """Returns the rows with start_id <= id < end_id, ordered by id."""
+    select = ", ".join(columns)
+    return query_all(
+        f"SELECT {select} FROM {table} WHERE id >= ? AND id < ? ORDER BY id",
+        (start_id, end_id)
+    )
+
+_MARKER_COLUMNS = "id, kind, from_seq, to_seq, parent_id, sha256, file_name, counts, created_at"
+
+def _marker(row):
+    return {
+        "id": row[0],
+        "kind": row[1],
+        "from_seq": row[2],
+        "to_seq": row[3],
+        "parent_id": row[4],
+        "sha256": row[5],
+        "file_name": row[6],
+        "counts": json.loads(row[7]) if row[7] else {},
+        "created_at": row[8]
+    }
+
+def add_marker(kind, from_seq, to_seq, parent_id, sha256, file_name, counts):
+    """Records a backup and returns its marker."""
+    execute("""
+        INSERT INTO backup_markers (kind, from_seq, to_seq, parent_id, sha256, file_name, counts)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (kind, from_seq, to_seq, parent_id, sha256, file_name, json.dumps(counts)))
+    return get_last_marker()
+
+def get_last_marker():
+    row = query_one(f"SELECT {_MARKER_COLUMNS} FROM backup_markers ORDER BY id DESC LIMIT 1")
+    return _marker(row) if row else None
+
+def get_chain():
+    """Returns the markers from the latest FULL backup onwards, oldest first."""
+    rows = query_all(f"""
+        SELECT {_MARKER_COLUMNS} FROM backup_markers
+        WHERE id >= COALESCE((SELECT MAX(id) FROM backup_markers WHERE kind = 'FULL'), 0)
+        ORDER BY id
+    """)
+    return [_marker(r) for r in rows]
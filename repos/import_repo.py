@@ -0,0 +1,116 @@
+from libsql_client import Statement
+from db.conn import execute_batch, query_all, query_one
+from repos.backup_repo import insert_statements
+
+_CHECKPOINT_COLUMNS = "source_sha256, file_name, rows_done, sessions, sets, exercises, skipped_sessions, status, first_workout_id"
+
+def get_exercise_ids():
+    """Returns {casefolded name: id} for every exercise."""
+    return {name.strip().casefold(): id for id, name in query_all("SELECT id, name FROM exercises")}
+
+def get_workout_dates():
+    """Returns the set of dates that already have an ACTIVE or COMPLETED session."""
+    return {r[0] for r in query_all("SELECT DISTINCT date FROM workouts WHERE status IN ('ACTIVE', 'COMPLETED')")}
+
+def get_imported_sessions(first_workout_id):
+    """
+    Returns the sessions an import already wrote (workouts from first_workout_id on), as
+    rows of (workout_id, date, name, workout_exercise_id, exercise_id, order_index,
+    last set_number), so later rows for those dates can be appended.
+    """
+    return query_all("""
+        SELECT w.id, w.date, w.name, we.id, we.exercise_id, we.order_index, MAX(s.set_number)
+        FROM workouts w
+        JOIN workout_exercises we ON we.workout_id = w.id
+        LEFT JOIN sets s ON s.workout_exercise_id = we.id
+        WHERE w.id >= ? AND w.status = 'COMPLETED' AND w.template_id IS NULL
+        GROUP BY we.id
+        ORDER BY w.id, we.order_index
+    """, (first_workout_id,))
+
+def get_max_ids():
+    """Returns {table: MAX(id)} for the tables an import writes, in one batch."""
+    tables = ["exercises", "workouts", "workout_exercises", "sets"]
+    results = execute_batch([Statement(f"SELECT COALESCE(MAX(id), 0) FROM {t}") for t in tables])
+    return {t: r.rows[0][0] for t, r in zip(tables, results)}
+
+def get_checkpoint(source_sha256):
+    row = query_one(f"SELECT {_CHECKPOINT_COLUMNS} FROM import_checkpoints WHERE source_sha256 = ?", (source_sha256,))
+    if not row:
+        return None
+    return {
+        "source_sha256": row[0],
+        "file_name": row[1],
+        "rows_done": row[2],
+        "sessions": row[3],
+        "sets": row[4],
+        "exercises": row[5],
+        "skipped_sessions": row[6],
+        "status": row[7],
+        "first_workout_id": row[8]
+    }
+
+def checkpoint_statement(checkpoint):
+    return Statement(f"""
+        INSERT INTO import_checkpoints ({_CHECKPOINT_COLUMNS}, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(source_sha256) DO UPDATE SET
+            rows_done = excluded.rows_done,
+            sessions = excluded.sessions,
+            sets = excluded.sets,
+            exercises = excluded.exercises,
+            skipped_sessions = excluded.skipped_sessions,
+            status = excluded.status,
+            updated_at = CURRENT_TIMESTAMP
+    """, (
+        checkpoint['source_sha256'], checkpoint['file_name'], checkpoint['rows_done'],
+        checkpoint['sessions'], checkpoint['sets'], checkpoint['exercises'],
+        checkpoint['skipped_sessions'], checkpoint['status'], checkpoint['first_workout_id']
+    ))
+
+def write_chunk(exercises, workouts, workout_exercises, sets, checkpoint, workout_updates=()):
+    """
+    Writes one chunk of imported sessions and its checkpoint in a single atomic batch.
+    Rows carry explicit ids:
+    - exercises (id, name)
+    - workouts (id, date, name, status, plan_type, started_at, completed_at)
+    - workout_exercises (id, workout_id, exercise_id, order_index)
+    - sets (id, workout_exercise_id, set_number, planned_reps, planned_weight, actual_reps, actual_weight, completed)
+    workout_updates are (id, name, completed_at) for sessions written by an earlier chunk
+    that gained rows; a None completed_at keeps the stored one.
+    PLANNED rows on the new workouts' dates are replaced by them.
+    """
+    statements = []
+    if workouts:
+        dates = [w[1] for w in workouts]
+        statements.append(Statement(f"""
+            DELETE FROM workouts
+            WHERE COALESCE(status, 'PLANNED') = 'PLANNED'
+              AND date IN ({", ".join("?" * len(dates))})
+        """, dates))
+    statements += [
+        Statement(
+            "UPDATE workouts SET name = ?, completed_at = COALESCE(?, completed_at) WHERE id = ?",
+            (name, completed_at, workout_id)
+        )
+        for workout_id, name, completed_at in workout_updates
+    ]
+    if exercises:
+        statements += insert_statements("exercises", ["id", "name"], exercises)
+    if workouts:
+        statements += insert_statements(
+            "workouts", ["id", "date", "name", "status", "plan_type", "started_at", "completed_at"], workouts
+        )
+    if workout_exercises:
+        statements += insert_statements(
+            "workout_exercises", ["id", "workout_id", "exercise_id", "order_index"], workout_exercises
+        )
+    if sets:
+        statements += insert_statements(
+            "sets",
+            ["id", "workout_exercise_id", "set_number", "planned_reps", "planned_weight",
+             "actual_reps", "actual_weight", "completed"],
+            sets
+        )
+    statements.append(checkpoint_statement(checkpoint))
+    execute_batch(statements)
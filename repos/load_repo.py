@@ -0,0 +1,56 @@
+from db.conn import execute_batch, query_all
+from libsql_client import Statement
+
+# Completed sets rolled up per (date, exercise). Bodyweight sets count as 0 tonnage.
+_ROLLUP_SELECT = """
+    SELECT w.date, we.exercise_id,
+           SUM(s.actual_reps * COALESCE(s.actual_weight, 0)),
+           SUM(s.actual_reps),
+           COUNT(*)
+    FROM sets s
+    JOIN workout_exercises we ON s.workout_exercise_id = we.id
+    JOIN workouts w ON we.workout_id = w.id
+    WHERE w.status = 'COMPLETED' AND s.completed = 1 AND s.actual_reps IS NOT NULL
+"""
+
+def _reroll_statements(date_sql, params):
+    return [
+        Statement(f"DELETE FROM daily_load WHERE date = {date_sql}", params),
+        Statement(f"""
+            INSERT INTO daily_load (date, exercise_id, tonnage, reps, sets)
+            {_ROLLUP_SELECT}
+              AND w.date = {date_sql}
+            GROUP BY w.date, we.exercise_id
+        """, params)
+    ]
+
+def daily_load_statements(workout_id):
+    """
+    Statements that re-roll the daily_load rows for the session's date.
+    Meant to run in the same batch that completes the session or edits one of its sets.
+    """
+    return _reroll_statements("(SELECT date FROM workouts WHERE id = ?)", (workout_id,))
+
+def date_load_statements(date_str):
+    """Statements that re-roll the daily_load rows for a date, e.g. after its workout is deleted."""
+    return _reroll_statements("?", (date_str,))
+
+def rebuild_daily_load():
+    """Rebuilds daily_load from the full set history."""
+    execute_batch([
+        Statement("DELETE FROM daily_load"),
+        Statement(f"""
+            INSERT INTO daily_load (date, exercise_id, tonnage, reps, sets)
+            {_ROLLUP_SELECT}
+            GROUP BY w.date, we.exercise_id
+        """)
+    ])
+
+def get_daily_load(date_str=None):
+    """Returns daily_load rows (date, exercise_id, tonnage, reps), optionally for one date."""
+    if date_str:
+        return query_all(
+            "SELECT date, exercise_id, tonnage, reps FROM daily_load WHERE date = ?",
+            (date_str,)
+        )
+    return query_all("SELECT date, exercise_id, tonnage, reps FROM daily_load ORDER BY date")
@@ -1,59 +1,260 @@
-from db.conn import execute, query_one, query_all
+import datetime
+from db.conn import execute, execute_batch, query_one, query_all
+from libsql_client import Statement
+
+# A rule fires on a date inside its range that is a whole number of periods after its start
+_RULE_FIRES = """
+    {date} >= r.start_date
+    AND (r.end_date IS NULL OR {date} <= r.end_date)
+    AND CAST(julianday({date}) - julianday(r.start_date) AS INTEGER) % r.period_days = 0
+"""
+
+def _to_plan(r):
+    return {
+        "id": r[0],
+        "date": r[1],
+        "name": r[2],
+        "status": r[3],
+        "plan_type": r[4],
+        "template_id": r[5],
+        "rule_id": r[6]
+    }
 
 def get_day_plan(date_str):
-    """Returns the workout row for the date."""
-    row = query_one("""
-        SELECT id, date, name, status, plan_type, template_id 
-        FROM workouts 
-        WHERE date = ?
-    """, (date_str,))
-    if row:
-        return {
-            "id": row[0],
-            "date": row[1],
-            "name": row[2],
-            "status": row[3],
-            "plan_type": row[4],
-            "template_id": row[5]
-        }
-    return None
+    """Returns the plan for the date: its workout row, else what a schedule rule puts there."""
+    plans = get_range(date_str, date_str)
+    return plans[0] if plans else None
 
 def upsert_day_plan(date_str, plan_type, template_id=None, name=None):
     """Creates or updates the plan for a date."""
     # Check if exists
-    existing = get_day_plan(date_str)
-    
+    existing = query_one("SELECT id FROM workouts WHERE date = ?", (date_str,))
+
     if existing:
-        execute("""
-            UPDATE workouts 
+        stmt = Statement("""
+            UPDATE workouts
             SET plan_type = ?, template_id = ?, name = ?
             WHERE date = ?
         """, (plan_type, template_id, name, date_str))
     else:
-        execute("""
+        stmt = Statement("""
             INSERT INTO workouts (date, plan_type, template_id, name)
             VALUES (?, ?, ?, ?)
         """, (date_str, plan_type, template_id, name))
+    execute_batch([stmt, Statement("DELETE FROM schedule_skips WHERE date = ?", (date_str,))])
 
-def get_range(start_date, end_date):
-    """Returns list of plans in range."""
-    rows = query_all("""
-        SELECT id, date, name, status, plan_type, template_id
+# Every plan from date ? to date ?: workout rows plus the days schedule rules fill.
+# Used as a WITH RECURSIVE clause; binds (start, end, start, end).
+_PLANS = f"""
+    days(d) AS (
+        SELECT date(?)
+        UNION ALL
+        SELECT date(d, '+1 day') FROM days WHERE d < ?
+    ),
+    ruled AS (
+        SELECT days.d, MAX(r.id) AS rule_id
+        FROM days
+        JOIN schedule_rules r ON {_RULE_FIRES.format(date="days.d")}
+        WHERE NOT EXISTS (SELECT 1 FROM workouts w WHERE w.date = days.d)
+          AND NOT EXISTS (SELECT 1 FROM schedule_skips k WHERE k.date = days.d)
+        GROUP BY days.d
+    ),
+    plans(id, date, name, status, plan_type, template_id, rule_id) AS (
+        SELECT id, date, name, status, plan_type, template_id, NULL
         FROM workouts
         WHERE date >= ? AND date <= ?
-        ORDER BY date
-    """, (start_date, end_date))
-    
+        UNION ALL
+        SELECT NULL, ruled.d, CASE WHEN r.plan_type = 'REST' THEN 'Rest Day' ELSE t.name END,
+               'PLANNED', r.plan_type, r.template_id, r.id
+        FROM ruled
+        JOIN schedule_rules r ON r.id = ruled.rule_id
+        LEFT JOIN templates t ON t.id = r.template_id
+    )
+"""
+
+def get_range(start_date, end_date):
+    """
+    Returns list of plans in range: workout rows, plus the days schedule rules fill
+    (id None, status PLANNED, rule_id set). A workout row or a skip on a date hides
+    the rules; when several rules fire, the newest wins.
+    """
+    rows = query_all(
+        f"WITH RECURSIVE {_PLANS} SELECT * FROM plans ORDER BY date",
+        (start_date, end_date, start_date, end_date)
+    )
+    return [_to_plan(r) for r in rows]
+
+def get_date_bounds():
+    """Returns (first_date, last_date) across all plans and bounded rules, or (None, None)."""
+    row = query_one("""
+        SELECT MIN(d), MAX(d) FROM (
+            SELECT date AS d FROM workouts
+            UNION ALL SELECT start_date FROM schedule_rules
+            UNION ALL SELECT end_date FROM schedule_rules WHERE end_date IS NOT NULL
+        )
+    """)
+    if not row:
+        return None, None
+    return row[0], row[1]
+
+def delete_day_plan(date_str, before_statements=None, after_statements=None):
+    """
+    Deletes the plan for a date. A date a rule would fill is marked skipped.
+    Derived rows are cleaned up in the same batch: before_statements run ahead of the
+    delete (while the workout's sets still exist), after_statements after it.
+    """
+    execute_batch(list(before_statements or []) + [
+        Statement("DELETE FROM workouts WHERE date = ?", (date_str,)),
+        Statement(f"""
+            INSERT INTO schedule_skips (date)
+            SELECT ? WHERE EXISTS (SELECT 1 FROM schedule_rules r WHERE {_RULE_FIRES.format(date="?")})
+            ON CONFLICT(date) DO NOTHING
+        """, (date_str, date_str, date_str, date_str))
+    ] + list(after_statements or []))
+
+def add_rules(rules):
+    """
+    Inserts schedule rules, dicts of plan_type, template_id, start_date, end_date and
+    period_days, in one batch. Returns their ids in order.
+    """
+    stmts = [
+        Statement("""
+            INSERT INTO schedule_rules (plan_type, template_id, start_date, end_date, period_days)
+            VALUES (?, ?, ?, ?, ?)
+        """, (r['plan_type'], r['template_id'], r['start_date'], r['end_date'], r['period_days']))
+        for r in rules
+    ]
+    stmts.append(Statement("SELECT id FROM schedule_rules ORDER BY id DESC LIMIT ?", (len(rules),)))
+    rows = execute_batch(stmts)[-1].rows
+    return [r[0] for r in reversed(rows)]
+
+def get_rules():
+    """Returns every schedule rule with its template name, oldest first."""
+    rows = query_all("""
+        SELECT r.id, r.plan_type, r.template_id, t.name, r.start_date, r.end_date, r.period_days
+        FROM schedule_rules r
+        LEFT JOIN templates t ON t.id = r.template_id
+        ORDER BY r.id
+    """)
     return [{
         "id": r[0],
-        "date": r[1],
-        "name": r[2],
-        "status": r[3],
-        "plan_type": r[4],
-        "template_id": r[5]
+        "plan_type": r[1],
+        "template_id": r[2],
+        "template_name": r[3],
+        "start_date": r[4],
+        "end_date": r[5],
+        "period_days": r[6]
     } for r in rows]
 
-def delete_day_plan(date_str):
-    """Deletes the plan for a date."""
-    execute("DELETE FROM workouts WHERE date = ?", (date_str,))
+def delete_rule(rule_id):
+    """Deletes a schedule rule."""
+    execute("DELETE FROM schedule_rules WHERE id = ?", (rule_id,))
+
+# --- Range operations ---
+# Each runs as one batch. Rule-filled days in the source dates are first written as
+# rows so they move with the rest; dates left empty where a rule fires get a skip.
+# ACTIVE and COMPLETED sessions are never moved, replaced or cleared.
+
+_MOVABLE = "COALESCE(status, 'PLANNED') = 'PLANNED'"
+
+def _materialize_statement(start_date, end_date):
+    return Statement(f"""
+        INSERT INTO workouts (date, plan_type, template_id, name)
+        WITH RECURSIVE {_PLANS}
+        SELECT date, plan_type, template_id, name FROM plans WHERE rule_id IS NOT NULL
+    """, (start_date, end_date, start_date, end_date))
+
+def _skip_vacated_statement(start_date, end_date):
+    return Statement(f"""
+        INSERT INTO schedule_skips (date)
+        WITH RECURSIVE days(d) AS (
+            SELECT date(?)
+            UNION ALL
+            SELECT date(d, '+1 day') FROM days WHERE d < ?
+        )
+        SELECT d FROM days
+        WHERE NOT EXISTS (SELECT 1 FROM workouts w WHERE w.date = days.d)
+          AND EXISTS (SELECT 1 FROM schedule_rules r WHERE {_RULE_FIRES.format(date="days.d")})
+        ON CONFLICT(date) DO NOTHING
+    """, (start_date, end_date))
+
+def _offset(days):
+    return f"{days:+d} days"
+
+def get_shift_conflicts(start_date, end_date, days):
+    """Returns the dates holding an ACTIVE/COMPLETED session that a shifted plan would land on."""
+    rows = query_all(f"""
+        WITH RECURSIVE {_PLANS}
+        SELECT DISTINCT w.date
+        FROM plans p
+        JOIN workouts w ON w.date = date(p.date, ?)
+        WHERE p.status = 'PLANNED' AND w.status IN ('ACTIVE', 'COMPLETED')
+        ORDER BY w.date
+    """, (start_date, end_date, start_date, end_date, _offset(days)))
+    return [r[0] for r in rows]
+
+def shift_range(start_date, end_date, days):
+    """
+    Moves every planned day in [start_date, end_date] by days. Planned rows already on
+    a destination date outside the range are replaced. Returns the number of days moved.
+    """
+    results = execute_batch([
+        _materialize_statement(start_date, end_date),
+        Statement(f"""
+            DELETE FROM workouts
+            WHERE {_MOVABLE} AND (date < ? OR date > ?)
+              AND date IN (
+                  SELECT date(date, ?) FROM workouts
+                  WHERE {_MOVABLE} AND date >= ? AND date <= ?
+              )
+        """, (start_date, end_date, _offset(days), start_date, end_date)),
+        Statement(f"""
+            UPDATE workouts SET date = date(date, ?)
+            WHERE {_MOVABLE} AND date >= ? AND date <= ?
+        """, (_offset(days), start_date, end_date)),
+        _skip_vacated_statement(start_date, end_date)
+    ])
+    return results[2].rows_affected
+
+def swap_days(first_date, second_date):
+    """Exchanges the plans of two dates."""
+    execute_batch([
+        _materialize_statement(first_date, first_date),
+        _materialize_statement(second_date, second_date),
+        Statement(f"""
+            UPDATE workouts SET date = CASE WHEN date = ? THEN ? ELSE ? END
+            WHERE {_MOVABLE} AND date IN (?, ?)
+        """, (first_date, second_date, first_date, first_date, second_date)),
+        _skip_vacated_statement(first_date, first_date),
+        _skip_vacated_statement(second_date, second_date)
+    ])
+
+def copy_days(source_start, source_end, target_start, target_end):
+    """
+    Makes the target dates mirror the source dates (same length, not overlapping): planned
+    rows there are replaced and days empty in the source are cleared. Dates holding an
+    ACTIVE/COMPLETED session keep it. Returns the number of days written.
+    """
+    days = (
+        datetime.date.fromisoformat(target_start) - datetime.date.fromisoformat(source_start)
+    ).days
+    results = execute_batch([
+        Statement(f"DELETE FROM workouts WHERE {_MOVABLE} AND date >= ? AND date <= ?", (target_start, target_end)),
+        Statement(f"""
+            INSERT INTO workouts (date, plan_type, template_id, name)
+            WITH RECURSIVE {_PLANS}
+            SELECT date(date, ?), plan_type, template_id, name
+            FROM plans
+            WHERE NOT EXISTS (SELECT 1 FROM workouts w WHERE w.date = date(plans.date, ?))
+        """, (source_start, source_end, source_start, source_end, _offset(days), _offset(days))),
+        _skip_vacated_statement(target_start, target_end)
+    ])
+    return results[1].rows_affected
 
+def clear_range(start_date, end_date):
+    """Clears every planned day in [start_date, end_date]. Returns the number of rows deleted."""
+    results = execute_batch([
+        Statement(f"DELETE FROM workouts WHERE {_MOVABLE} AND date >= ? AND date <= ?", (start_date, end_date)),
+        _skip_vacated_statement(start_date, end_date)
+    ])
+    return results[0].rows_affected
@@ -0,0 +1,167 @@
+from db.conn import execute_batch, query_all
+from libsql_client import Statement
+
+# Per-set record types: (weight_key expression, value expression, extra condition)
+_E1RM_EXPR = "CASE WHEN s.actual_reps = 1 THEN s.actual_weight ELSE s.actual_weight * (1 + s.actual_reps / 30.0) END"
+_SET_RECORDS = {
+    "MAX_WEIGHT": ("0", "s.actual_weight", "s.actual_weight > 0"),
+    "REPS_AT_WEIGHT": ("COALESCE(s.actual_weight, 0)", "s.actual_reps", "1 = 1"),
+    "E1RM": ("0", _E1RM_EXPR, "s.actual_weight > 0"),
+}
+_VOLUME_EXPR = "SUM(s.actual_reps * COALESCE(s.actual_weight, 0))"
+
+_FROM = """
+    FROM sets s
+    JOIN workout_exercises we ON s.workout_exercise_id = we.id
+    JOIN workouts w ON we.workout_id = w.id
+    WHERE s.completed = 1 AND s.actual_reps > 0
+"""
+
+_UPSERT = """
+    ON CONFLICT(exercise_id, record_type, weight_key) DO UPDATE SET
+        value = excluded.value,
+        set_id = excluded.set_id,
+        workout_id = excluded.workout_id,
+        achieved_date = excluded.achieved_date
+    WHERE excluded.value > personal_records.value
+"""
+
+_INSERT = "INSERT INTO personal_records (exercise_id, record_type, weight_key, value, set_id, workout_id, achieved_date)"
+
+def _best_statements(exercise_filter="", params=()):
+    """
+    Statements that write the best row per record key, using window functions.
+    With a filter they rebuild one exercise; without, the whole table.
+    """
+    stmts = []
+    for record_type, (key_expr, value_expr, cond) in _SET_RECORDS.items():
+        stmts.append(Statement(f"""
+            {_INSERT}
+            SELECT exercise_id, '{record_type}', weight_key, value, set_id, workout_id, date
+            FROM (
+                SELECT we.exercise_id, {key_expr} AS weight_key, {value_expr} AS value,
+                       s.id AS set_id, w.id AS workout_id, w.date,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY we.exercise_id, {key_expr}
+                           ORDER BY {value_expr} DESC, w.date, s.id
+                       ) AS rn
+                {_FROM} AND {cond} {exercise_filter}
+            )
+            WHERE rn = 1
+            {_UPSERT}
+        """, params))
+    
+    stmts.append(Statement(f"""
+        {_INSERT}
+        SELECT exercise_id, 'SESSION_VOLUME', 0, value, set_id, workout_id, date
+        FROM (
+            SELECT we.exercise_id, {_VOLUME_EXPR} AS value, MAX(s.id) AS set_id, w.id AS workout_id, w.date,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY we.exercise_id
+                       ORDER BY {_VOLUME_EXPR} DESC, w.date, w.id
+                   ) AS rn
+            {_FROM} {exercise_filter}
+            GROUP BY w.id, we.exercise_id
+        )
+        WHERE rn = 1 AND value > 0
+        {_UPSERT}
+    """, params))
+    return stmts
+
+def set_completed_statements(set_id):
+    """
+    Statements that raise records with a newly completed set.
+    Each is a conditional upsert against the set's own row; no history scan.
+    """
+    stmts = []
+    for record_type, (key_expr, value_expr, cond) in _SET_RECORDS.items():
+        stmts.append(Statement(f"""
+            {_INSERT}
+            SELECT we.exercise_id, '{record_type}', {key_expr}, {value_expr}, s.id, w.id, w.date
+            {_FROM} AND {cond} AND s.id = ?
+            {_UPSERT}
+        """, (set_id,)))
+    
+    # Session volume for this exercise in this workout, including the new set
+    stmts.append(Statement(f"""
+        {_INSERT}
+        SELECT we.exercise_id, 'SESSION_VOLUME', 0, {_VOLUME_EXPR}, ?, w.id, w.date
+        {_FROM} AND we.id = (SELECT workout_exercise_id FROM sets WHERE id = ?)
+        GROUP BY w.id, we.exercise_id
+        HAVING {_VOLUME_EXPR} > 0
+        {_UPSERT}
+    """, (set_id, set_id)))
+    return stmts
+
+def set_edited_statements(set_id):
+    """
+    Statements for an edited set. Records the set (or its session) held are dropped
+    and the set's exercise is re-scanned, so an edit that lowers a PR hands the
+    record back to the next best set.
+    """
+    exercise_sql = """(
+        SELECT we2.exercise_id FROM sets s2
+        JOIN workout_exercises we2 ON s2.workout_exercise_id = we2.id
+        WHERE s2.id = ?
+    )"""
+    stmts = [
+        Statement("DELETE FROM personal_records WHERE set_id = ?", (set_id,)),
+        Statement(f"""
+            DELETE FROM personal_records
+            WHERE record_type = 'SESSION_VOLUME'
+              AND exercise_id = {exercise_sql}
+              AND workout_id = (
+                  SELECT we2.workout_id FROM sets s2
+                  JOIN workout_exercises we2 ON s2.workout_exercise_id = we2.id
+                  WHERE s2.id = ?
+              )
+        """, (set_id, set_id)),
+    ]
+    stmts.extend(_best_statements(f"AND we.exercise_id = {exercise_sql}", (set_id,)))
+    return stmts
+
+def day_deleted_statements(date_str):
+    """
+    Statements to run before a date's workouts are deleted. Records they hold are
+    dropped and their exercises re-scanned without that date, so the next best set
+    takes each record over instead of it pointing at sets that no longer exist.
+    """
+    stmts = [Statement("""
+        DELETE FROM personal_records
+        WHERE workout_id IN (SELECT id FROM workouts WHERE date = ?)
+    """, (date_str,))]
+    stmts.extend(_best_statements("""
+        AND w.date != ?
+        AND we.exercise_id IN (
+            SELECT we2.exercise_id FROM workout_exercises we2
+            JOIN workouts w2 ON we2.workout_id = w2.id
+            WHERE w2.date = ?
+        )
+    """, (date_str, date_str)))
+    return stmts
+
+def rebuild_all():
+    """Rebuilds personal_records from the full set history in one batch."""
+    execute_batch([Statement("DELETE FROM personal_records")] + _best_statements())
+
+def get_records_for_set(set_id):
+    """Returns the record types currently held by a set (indexed lookup)."""
+    rows = query_all("SELECT record_type, weight_key, value FROM personal_records WHERE set_id = ?", (set_id,))
+    return [{"record_type": r[0], "weight_key": r[1], "value": r[2]} for r in rows]
+
+def get_exercise_records(exercise_id):
+    """Returns all records for an exercise."""
+    rows = query_all("""
+        SELECT record_type, weight_key, value, set_id, workout_id, achieved_date
+        FROM personal_records
+        WHERE exercise_id = ?
+        ORDER BY record_type, weight_key
+    """, (exercise_id,))
+    return [{
+        "record_type": r[0],
+        "weight_key": r[1],
+        "value": r[2],
+        "set_id": r[3],
+        "workout_id": r[4],
+        "achieved_date": r[5]
+    } for r in rows]
@@ -1,4 +1,6 @@
-from db.conn import get_conn, execute, query_one, query_all
+from db.conn import get_conn, execute, execute_batch, query_one, query_all
+from libsql_client import Statement
+from repos import templates_repo
 import datetime
 
 def get_active_session(date_str):
@@ -23,54 +25,26 @@ def get_active_session(date_str):
 
 def create_session_from_template(date_str, template_id):
     """
-    Creates a snapshot of the template into the workout session tables.
-    Must be called when starting a workout.
+    Starts a session on the template's current version. The version is stored the first
+    time its content is seen; after that, starting a session only writes the workout row.
+    Planned sets are read from the version, and set rows are written as sets are performed.
     """
     # 1. Enforce one ACTIVE session per date
     active = get_active_session(date_str)
     if active:
         raise Exception("An active session already exists for this date.")
 
-    # 2. Get Template Data (Exercises & Sets)
-    # We need a deep fetch. 
-    # For now, we'll do raw queries or reuse service/repo? 
-    # Better to keep repo self-contained or use other repos.
-    # Let's do raw queries for speed and decoupling from 'templates_service' logic which might change.
-    
-    # Fetch Template
-    template = query_one("SELECT name FROM templates WHERE id = ?", (template_id,))
-    if not template:
+    # 2. Resolve the template's content to a version
+    source = templates_repo.get_version_source(template_id)
+    if not source:
         raise Exception("Template not found.")
-    template_name = template[0]
-    
-    # Fetch Template Exercises
-    t_exercises = query_all("""
-        SELECT id, exercise_id, order_index 
-        FROM template_exercises 
-        WHERE template_id = ? 
-        ORDER BY order_index
-    """, (template_id,))
+    template_name, content = source
+    content_hash = templates_repo.version_hash(content)
     
-    # Fetch Template Sets
-    # Map temlpate_exercise_id -> list of sets
-    t_sets_map = {}
-    if t_exercises:
-        placeholders = ','.join(['?'] * len(t_exercises))
-        te_ids = [te[0] for te in t_exercises]
-        rows = query_all(f"""
-            SELECT template_exercise_id, set_number, reps, weight
-            FROM template_sets
-            WHERE template_exercise_id IN ({placeholders})
-        """, te_ids)
-        for r in rows:
-            tid, s_num, reps, weight = r
-            if tid not in t_sets_map:
-                t_sets_map[tid] = []
-            t_sets_map[tid].append({
-                "set_number": s_num,
-                "reps": reps,
-                "weight": weight
-            })
+    stmts = []
+    if templates_repo.get_version_id(content_hash) is None:
+        stmts.extend(templates_repo.version_statements(content, content_hash))
+    version_id = "(SELECT id FROM template_versions WHERE content_hash = ?)"
 
     # 3. Create/Update Workout
     # Check if workout row exists (PLANNED)
@@ -80,71 +54,36 @@ def create_session_from_template(date_str, template_id):
     
     if existing:
         workout_id = existing[0]
-        execute("""
+        stmts.append(Statement(f"""
             UPDATE workouts 
-            SET status = 'ACTIVE', started_at = ?, template_id = ?, name = ?, plan_type = 'WORKOUT'
+            SET status = 'ACTIVE', started_at = ?, template_id = ?, template_version_id = {version_id},
+                name = ?, plan_type = 'WORKOUT'
             WHERE id = ?
-        """, (started_at, template_id, template_name, workout_id))
-        
-        # Cleanup existing workout_exercises if any (start fresh snapshot)
-        # This handles case where we might have started before or it was partial? 
-        # Requirement says "Snapshot matches template at start time".
-        # If we are "starting", we assume fresh snapshot of layout.
-        execute("DELETE FROM workout_exercises WHERE workout_id = ?", (workout_id,))
-        
+        """, (started_at, template_id, content_hash, template_name, workout_id)))
+        # Start fresh: anything performed under an earlier start is dropped
+        stmts.append(Statement("DELETE FROM workout_exercises WHERE workout_id = ?", (workout_id,)))
+        execute_batch(stmts)
     else:
-        execute("""
-            INSERT INTO workouts (date, status, started_at, template_id, name, plan_type)
-            VALUES (?, 'ACTIVE', ?, ?, ?, 'WORKOUT')
-        """, (date_str, started_at, template_id, template_name))
-        
-        # Need to get the ID.
-        # Since execute doesn't return ID easily in this wrapper, fetch it.
-        row = query_one("SELECT id FROM workouts WHERE date = ? AND status = 'ACTIVE'", (date_str,))
-        workout_id = row[0]
-
-    # 4. Insert Exercises & Sets
-    # NOTE: Ideally this loop is in a transaction.
-    # We will proceed sequentially.
-    
-    for te in t_exercises:
-        te_id = te[0]
-        ex_id = te[1]
-        order = te[2]
-        
-        execute("""
-            INSERT INTO workout_exercises (workout_id, exercise_id, order_index)
-            VALUES (?, ?, ?)
-        """, (workout_id, ex_id, order))
-        
-        # Get new ID
-        # reliable way without last_insert_rowid race condition in app:
-        # lookup by unique constraint (workout_id, order_index)
-        we_row = query_one("""
-            SELECT id FROM workout_exercises 
-            WHERE workout_id = ? AND order_index = ?
-        """, (workout_id, order))
-        we_id = we_row[0]
-        
-        # Insert Sets
-        sets = t_sets_map.get(te_id, [])
-        for s in sets:
-            execute("""
-                INSERT INTO sets (workout_exercise_id, set_number, planned_reps, planned_weight, completed)
-                VALUES (?, ?, ?, ?, 0)
-            """, (we_id, s['set_number'], s['reps'], s['weight']))
+        stmts.append(Statement(f"""
+            INSERT INTO workouts (date, status, started_at, template_id, template_version_id, name, plan_type)
+            VALUES (?, 'ACTIVE', ?, ?, {version_id}, ?, 'WORKOUT')
+        """, (date_str, started_at, template_id, content_hash, template_name)))
+        stmts.append(Statement("SELECT id FROM workouts WHERE date = ? AND status = 'ACTIVE'", (date_str,)))
+        workout_id = execute_batch(stmts)[-1].rows[0][0]
 
     return workout_id
 
 def get_workout_set(workout_id, exercise_order, set_number):
-    """Retrieves a specific set by workout structure."""
+    """
+    Retrieves a specific set by workout structure. The id is None for a planned set
+    that has not been performed yet (see materialize_set).
+    """
     row = query_one("""
-        SELECT s.id, s.completed, s.actual_reps, s.actual_weight, s.started_at, s.completed_at
-        FROM sets s
-        JOIN workout_exercises we ON s.workout_exercise_id = we.id
-        WHERE we.workout_id = ? 
-          AND we.order_index = ? 
-          AND s.set_number = ?
+        SELECT set_id, completed, actual_reps, actual_weight, started_at, completed_at
+        FROM session_sets
+        WHERE workout_id = ? 
+          AND order_index = ? 
+          AND set_number = ?
     """, (workout_id, exercise_order, set_number))
     
     if row:
@@ -158,14 +97,54 @@ def get_workout_set(workout_id, exercise_order, set_number):
         }
     return None
 
-def update_set_actuals(set_id, reps, weight):
-    """Updates set with actual values and marks as complete."""
+def materialize_set(workout_id, exercise_order, set_number):
+    """
+    Writes the workout_exercises and sets rows for a planned set of a versioned session,
+    copying its planned values from the version. Returns the set id.
+    """
+    results = execute_batch([
+        Statement("""
+            INSERT INTO workout_exercises (workout_id, exercise_id, order_index)
+            SELECT w.id, ve.exercise_id, ve.position
+            FROM workouts w
+            JOIN template_version_exercises ve ON ve.version_id = w.template_version_id
+            WHERE w.id = ? AND ve.position = ?
+            ON CONFLICT(workout_id, order_index) DO NOTHING
+        """, (workout_id, exercise_order)),
+        Statement("""
+            INSERT INTO sets (workout_exercise_id, set_number, planned_reps, planned_weight, completed)
+            SELECT we.id, vs.set_number, vs.reps, vs.weight, 0
+            FROM workout_exercises we
+            JOIN workouts w ON w.id = we.workout_id
+            JOIN template_version_exercises ve
+              ON ve.version_id = w.template_version_id AND ve.position = we.order_index
+            JOIN template_version_sets vs ON vs.version_exercise_id = ve.id
+            WHERE we.workout_id = ? AND we.order_index = ? AND vs.set_number = ?
+            ON CONFLICT(workout_exercise_id, set_number) DO NOTHING
+        """, (workout_id, exercise_order, set_number)),
+        Statement("""
+            SELECT s.id
+            FROM sets s
+            JOIN workout_exercises we ON s.workout_exercise_id = we.id
+            WHERE we.workout_id = ? AND we.order_index = ? AND s.set_number = ?
+        """, (workout_id, exercise_order, set_number))
+    ])
+    rows = results[-1].rows
+    return rows[0][0] if rows else None
+
+def update_set_actuals(set_id, reps, weight, extra_statements=None):
+    """
+    Updates set with actual values and marks as complete.
+    Any extra statements (e.g. personal record upserts) run after it in the same batch.
+    """
     completed_at = datetime.datetime.now().isoformat()
-    execute("""
+    stmts = [Statement("""
         UPDATE sets 
         SET actual_reps = ?, actual_weight = ?, completed = 1, completed_at = ?
         WHERE id = ?
-    """, (reps, weight, completed_at, set_id))
+    """, (reps, weight, completed_at, set_id))]
+    stmts.extend(extra_statements or [])
+    execute_batch(stmts)
 
 def start_set_timer(set_id):
     """Marks a set as started (IN_SET state)."""
@@ -179,34 +158,35 @@ def get_workout_exercises_with_sets(workout_id):
     # This is a bit complex, let's fetch flat and restructure or fetch hierarchically.
     # Flat fetch of sets joined with workout_exercises
     rows = query_all("""
-        SELECT we.id, we.exercise_id, e.name, we.order_index, 
-               s.id, s.set_number, s.planned_reps, s.planned_weight, s.actual_reps, s.actual_weight, s.completed,
-               s.started_at, s.completed_at
-        FROM workout_exercises we
-        JOIN exercises e ON we.exercise_id = e.id
-        JOIN sets s ON s.workout_exercise_id = we.id
-        WHERE we.workout_id = ?
-        ORDER BY we.order_index, s.set_number
+        SELECT ss.workout_exercise_id, ss.exercise_id, e.name, ss.order_index, 
+               ss.set_id, ss.set_number, ss.planned_reps, ss.planned_weight, ss.actual_reps, ss.actual_weight,
+               ss.completed, ss.started_at, ss.completed_at
+        FROM session_sets ss
+        JOIN exercises e ON ss.exercise_id = e.id
+        WHERE ss.workout_id = ?
+        ORDER BY ss.order_index, ss.set_number
     """, (workout_id,))
     
     # Structure: [ { ...exercise, sets: [...] } ]
     exercises_map = {}
     results = []
     
+    # Exercises are keyed by position: a versioned session has no workout_exercises
+    # row (id None) for an exercise until one of its sets is performed.
     for r in rows:
-        we_id = r[0]
-        if we_id not in exercises_map:
+        order_index = r[3]
+        if order_index not in exercises_map:
             ex_obj = {
-                "id": we_id,
+                "id": r[0],
                 "exercise_id": r[1],
                 "name": r[2],
                 "order_index": r[3],
                 "sets": []
             }
-            exercises_map[we_id] = ex_obj
+            exercises_map[order_index] = ex_obj
             results.append(ex_obj)
         else:
-            ex_obj = exercises_map[we_id]
+            ex_obj = exercises_map[order_index]
             
         ex_obj["sets"].append({
             "id": r[4],
@@ -226,10 +206,51 @@ def start_workout_session(date_str, template_id):
     """Wrapper for create_session_from_template."""
     return create_session_from_template(date_str, template_id)
 
-def complete_workout_session(workout_id):
-    """Marks the workout as completed."""
+def complete_workout_session(workout_id, extra_statements=None):
+    """
+    Marks the workout as completed.
+    Any extra statements (e.g. deferred template sync) run in the same batch.
+    """
     completed_at = datetime.datetime.now().isoformat()
-    execute("UPDATE workouts SET status = 'COMPLETED', completed_at = ? WHERE id = ?", (completed_at, workout_id))
+    stmts = [Statement(
+        "UPDATE workouts SET status = 'COMPLETED', completed_at = ? WHERE id = ?",
+        (completed_at, workout_id)
+    )]
+    stmts.extend(extra_statements or [])
+    execute_batch(stmts)
+
+def get_workout(workout_id):
+    """Returns the workout row by id."""
+    row = query_one("""
+        SELECT id, date, name, status, plan_type, template_id, started_at, completed_at
+        FROM workouts
+        WHERE id = ?
+    """, (workout_id,))
+    
+    if row:
+        return {
+            "id": row[0],
+            "date": row[1],
+            "name": row[2],
+            "status": row[3],
+            "plan_type": row[4],
+            "template_id": row[5],
+            "started_at": row[6],
+            "completed_at": row[7]
+        }
+    return None
+
+def get_session_template(workout_id):
+    """Returns (template_id, sync_policy) for the session, or (None, None)."""
+    row = query_one("""
+        SELECT w.template_id, t.sync_policy
+        FROM workouts w
+        LEFT JOIN templates t ON t.id = w.template_id
+        WHERE w.id = ?
+    """, (workout_id,))
+    if not row:
+        return None, None
+    return row[0], row[1]
 
 def get_last_completed_workout_for_template(template_id, exclude_workout_id=None):
     """Returns exercise/set data from the most recent COMPLETED workout using this template."""
@@ -268,3 +289,91 @@ def set_overload_cursor(template_id, exercise_id, target_set):
         DO UPDATE SET current_target_set = excluded.current_target_set
     """, (template_id, exercise_id, target_set))
 
+
+def get_progression_context(workout_id):
+    """
+    Loads everything progression policies need for a session in one batch:
+    the session's planned sets with each exercise's effective policy, the previous
+    COMPLETED session of the same template, the overload cursors and best e1RMs.
+    Returns None for sessions without a template.
+    """
+    results = execute_batch([
+        Statement("""
+            SELECT w.template_id, ss.order_index, ss.exercise_id,
+                   COALESCE(CASE WHEN w.template_version_id IS NULL
+                                 THEN te.progression_policy ELSE ss.progression_policy END,
+                            t.progression_policy),
+                   ss.set_number, ss.planned_reps, ss.planned_weight
+            FROM workouts w
+            JOIN session_sets ss ON ss.workout_id = w.id
+            LEFT JOIN templates t ON t.id = w.template_id
+            LEFT JOIN template_exercise_positions te
+                ON w.template_version_id IS NULL
+               AND te.template_id = w.template_id
+               AND te.position = ss.order_index
+               AND te.exercise_id = ss.exercise_id
+            WHERE w.id = ?
+            ORDER BY ss.order_index, ss.set_number
+        """, (workout_id,)),
+        Statement("""
+            SELECT order_index, exercise_id, set_number, completed, actual_reps, actual_weight
+            FROM session_sets
+            WHERE workout_id = (
+                SELECT p.id FROM workouts p
+                JOIN workouts w ON p.template_id = w.template_id
+                WHERE w.id = ? AND p.status = 'COMPLETED' AND p.id != w.id
+                ORDER BY p.date DESC LIMIT 1
+            )
+            ORDER BY order_index, set_number
+        """, (workout_id,)),
+        Statement("""
+            SELECT ot.exercise_id, ot.current_target_set
+            FROM overload_tracking ot
+            JOIN workouts w ON w.template_id = ot.template_id
+            WHERE w.id = ?
+        """, (workout_id,)),
+        Statement("""
+            SELECT exercise_id, value
+            FROM personal_records
+            WHERE record_type = 'E1RM'
+              AND exercise_id IN (SELECT exercise_id FROM session_sets WHERE workout_id = ?)
+        """, (workout_id,)),
+    ])
+    
+    planned_rows, last_rows, cursor_rows, e1rm_rows = (r.rows for r in results)
+    if not planned_rows or planned_rows[0][0] is None:
+        return None
+    
+    exercises = []
+    for _, order_index, exercise_id, policy, set_number, planned_reps, planned_weight in planned_rows:
+        if not exercises or exercises[-1]['order_index'] != order_index:
+            exercises.append({
+                "order_index": order_index,
+                "exercise_id": exercise_id,
+                "policy": policy,
+                "planned_sets": []
+            })
+        exercises[-1]['planned_sets'].append({
+            "set_number": set_number,
+            "planned_reps": planned_reps,
+            "planned_weight": planned_weight
+        })
+    
+    last_exercises = []
+    for order_index, exercise_id, set_number, completed, actual_reps, actual_weight in last_rows:
+        if not last_exercises or last_exercises[-1]['order_index'] != order_index:
+            last_exercises.append({"order_index": order_index, "exercise_id": exercise_id, "sets": []})
+        last_exercises[-1]['sets'].append({
+            "set_number": set_number,
+            "completed": bool(completed),
+            "actual_reps": actual_reps,
+            "actual_weight": actual_weight
+        })
+    
+    return {
+        "template_id": planned_rows[0][0],
+        "exercises": exercises,
+        "last_exercises": last_exercises,
+        "cursors": {r[0]: r[1] for r in cursor_rows},
+        "best_e1rm": {r[0]: r[1] for r in e1rm_rows}
+    }
@@ -1,4 +1,11 @@
-from db.conn import execute, query_all, query_one, transaction
+import hashlib
+import json
+from db.conn import execute, execute_batch, query_all, query_one
+from core.ordering import ORDER_GAP, key_writes
+
+# template_exercises.order_index and template_sets.set_number are sparse sort keys
+# (see core.ordering). Display numbers are derived: get_template returns positions,
+# and SQL that matches sessions to templates joins the *_positions views.
 
 def create_template(name):
     """Creates a new workout template."""
@@ -7,7 +14,7 @@ def create_template(name):
 
 def get_template(template_id):
     """Returns a template with nested exercises and sets."""
-    template = query_one("SELECT * FROM templates WHERE id = ?", (template_id,))
+    template = query_one("SELECT id, name, created_at, sync_policy, progression_policy FROM templates WHERE id = ?", (template_id,))
     if not template:
         return None
     
@@ -16,27 +23,31 @@ def get_template(template_id):
         "id": template[0],
         "name": template[1],
         "created_at": template[2],
+        "sync_policy": template[3],
+        "progression_policy": template[4],
         "exercises": []
     }
     
     # Fetch exercises
     exercises = query_all("""
-        SELECT te.id, te.exercise_id, e.name, te.order_index, te.sets, te.reps, te.weight
+        SELECT te.id, te.exercise_id, e.name, te.order_index, te.sets, te.reps, te.weight, te.progression_policy
         FROM template_exercises te
         JOIN exercises e ON te.exercise_id = e.id
         WHERE te.template_id = ?
         ORDER BY te.order_index
     """, (template_id,))
     
-    for ex in exercises:
+    for position, ex in enumerate(exercises, start=1):
         ex_data = {
             "id": ex[0],
             "exercise_id": ex[1],
             "name": ex[2],
-            "order_index": ex[3],
+            "order_index": position,
+            "sort_key": ex[3],
             "default_sets_count": ex[4], # Legacy/Summary column
             "default_reps": ex[5],       # Legacy/Summary column
             "default_weight": ex[6],     # Legacy/Summary column
+            "progression_policy": ex[7], # None inherits the template's policy
             "sets": []
         }
         
@@ -48,10 +59,11 @@ def get_template(template_id):
             ORDER BY set_number
         """, (ex[0],))
         
-        for s in sets:
+        for set_position, s in enumerate(sets, start=1):
             ex_data["sets"].append({
                 "id": s[0],
-                "set_number": s[1],
+                "set_number": set_position,
+                "sort_key": s[1],
                 "reps": s[2],
                 "weight": s[3]
             })
@@ -62,9 +74,8 @@ def get_template(template_id):
 
 def add_exercise(template_id, exercise_id):
     """Adds an exercise to the template at the end of the list."""
-    # Get current max order
     row = query_one("SELECT MAX(order_index) FROM template_exercises WHERE template_id = ?", (template_id,))
-    next_order = (row[0] or 0) + 1
+    next_order = (row[0] or 0) + ORDER_GAP
     
     execute("""
         INSERT INTO template_exercises (template_id, exercise_id, order_index)
@@ -75,52 +86,37 @@ def add_exercise(template_id, exercise_id):
     return query_one("SELECT id FROM template_exercises WHERE template_id = ? AND order_index = ?", (template_id, next_order))[0]
 
 def remove_exercise(template_exercise_id):
-    """Removes an exercise and re-normalizes order."""
-    with transaction() as tx:
-        # Get template_id and order_index
-        row = query_one("SELECT template_id, order_index FROM template_exercises WHERE id = ?", (template_exercise_id,))
-        if not row:
-            return
-        template_id, order_index = row
-        
-        # Delete
-        execute("DELETE FROM template_exercises WHERE id = ?", (template_exercise_id,))
-        
-        # Shift others down
-        execute("""
-            UPDATE template_exercises
-            SET order_index = order_index - 1
-            WHERE template_id = ? AND order_index > ?
-        """, (template_id, order_index))
+    """Removes an exercise. Later exercises keep their keys; display numbers close the gap."""
+    execute("DELETE FROM template_exercises WHERE id = ?", (template_exercise_id,))
 
 from libsql_client import Statement
-from db.conn import get_conn
 
 def reorder_exercises(template_id, new_order_ids):
-    """Updates order_index for all exercises in the list using batch execution."""
-    stmts = []
+    """
+    Puts the template's exercises in the given order. Only rows that moved are
+    rewritten (a swap of neighbours is one UPDATE); the list is respaced when a gap runs out.
+    """
+    rows = query_all("SELECT id, order_index FROM template_exercises WHERE template_id = ?", (template_id,))
+    current = dict(rows)
+    ids = [te_id for te_id in new_order_ids if te_id in current]
+    parks, updates, _ = key_writes(ids, [current[te_id] for te_id in ids])
     
-    # 1. Set all to negative temporary values to avoid unique constraint collisions
-    for te_id in new_order_ids:
-        stmts.append(Statement(
-            "UPDATE template_exercises SET order_index = -1 * id WHERE id = ? AND template_id = ?",
-            (te_id, template_id)
-        ))
-        
-    # 2. Set to correct new values
-    for index, te_id in enumerate(new_order_ids):
-        stmts.append(Statement(
-            "UPDATE template_exercises SET order_index = ? WHERE id = ? AND template_id = ?",
-            (index + 1, te_id, template_id)
-        ))
-    
-    with get_conn() as client:
-        client.batch(stmts)
+    # Several moving rows are parked at negative keys first so none collide mid-batch
+    stmts = [
+        Statement("UPDATE template_exercises SET order_index = -1 * id WHERE id = ? AND template_id = ?", (te_id, template_id))
+        for te_id in parks
+    ]
+    stmts += [
+        Statement("UPDATE template_exercises SET order_index = ? WHERE id = ? AND template_id = ?", (key, te_id, template_id))
+        for te_id, key in updates
+    ]
+    if stmts:
+        execute_batch(stmts)
 
 def add_set(template_exercise_id, reps=None, weight=None):
     """Adds a set to a template exercise."""
     row = query_one("SELECT MAX(set_number) FROM template_sets WHERE template_exercise_id = ?", (template_exercise_id,))
-    next_set = (row[0] or 0) + 1
+    next_set = (row[0] or 0) + ORDER_GAP
     
     execute("""
         INSERT INTO template_sets (template_exercise_id, set_number, reps, weight)
@@ -128,15 +124,9 @@ def add_set(template_exercise_id, reps=None, weight=None):
     """, (template_exercise_id, next_set, reps, weight))
 
 def delete_set(set_id):
-    """Deletes a set and re-normalizes set numbers."""
-    with transaction() as tx:
-        row = query_one("SELECT template_exercise_id, set_number FROM template_sets WHERE id = ?", (set_id,))
-        if not row:
-            return
-        te_id, set_num = row
-        
-        execute("DELETE FROM template_sets WHERE id = ?", (set_id,))
-        
+    """Deletes a set. Display numbers of the later sets close the gap at read time."""
+    execute("DELETE FROM template_sets WHERE id = ?", (set_id,))
+
 def get_all_templates():
     """Returns a list of all templates."""
     rows = query_all("SELECT id, name, created_at FROM templates ORDER BY name")
@@ -146,26 +136,286 @@ def update_template(template_id, name):
     """Updates template name."""
     execute("UPDATE templates SET name = ? WHERE id = ?", (name, template_id))
 
+def update_sync_policy(template_id, sync_policy):
+    """Sets how session actuals are written back to the template."""
+    execute("UPDATE templates SET sync_policy = ? WHERE id = ?", (sync_policy, template_id))
+
+def update_progression_policy(template_id, progression_policy):
+    """Sets the template-wide progressive overload policy."""
+    execute("UPDATE templates SET progression_policy = ? WHERE id = ?", (progression_policy, template_id))
+
+def update_exercise_progression_policy(template_exercise_id, progression_policy):
+    """Overrides the progression policy for one template exercise. None inherits the template's."""
+    execute("UPDATE template_exercises SET progression_policy = ? WHERE id = ?", (progression_policy, template_exercise_id))
+
 def delete_template(template_id):
     """Deletes a template."""
     execute("DELETE FROM templates WHERE id = ?", (template_id,))
 
+def get_template_name(template_id):
+    """Returns the template's name, or None if it doesn't exist."""
+    row = query_one("SELECT name FROM templates WHERE id = ?", (template_id,))
+    return row[0] if row else None
+
+def clone_templates(template_id, clones, weight_step=None):
+    """
+    Copies a template with its exercises and sets, once per (name, weight_factor) in
+    clones, in one atomic batch. Set weights are multiplied by the factor (None copies
+    them as is) and rounded to weight_step when given. Returns the new template ids.
+    """
+    # Each copy's exercises and sets attach to MAX(id), the template just inserted;
+    # the batch runs in one transaction, so nothing else can insert in between.
+    new_id = "(SELECT MAX(id) FROM templates)"
+    stmts = []
+    for name, factor in clones:
+        if factor is None:
+            weight, params = "ts.weight", ()
+        elif weight_step:
+            weight, params = "ROUND(ts.weight * ? / ?) * ?", (factor, weight_step, weight_step)
+        else:
+            weight, params = "ts.weight * ?", (factor,)
+        stmts += [
+            Statement("""
+                INSERT INTO templates (name, sync_policy, progression_policy)
+                SELECT ?, sync_policy, progression_policy FROM templates WHERE id = ?
+            """, (name, template_id)),
+            Statement(f"""
+                INSERT INTO template_exercises (template_id, exercise_id, order_index, sets, reps, weight, progression_policy)
+                SELECT {new_id}, exercise_id, order_index, sets, reps, weight, progression_policy
+                FROM template_exercises
+                WHERE template_id = ?
+            """, (template_id,)),
+            Statement(f"""
+                INSERT INTO template_sets (template_exercise_id, set_number, reps, weight)
+                SELECT nte.id, ts.set_number, ts.reps, {weight}
+                FROM template_sets ts
+                JOIN template_exercises ote ON ote.id = ts.template_exercise_id
+                JOIN template_exercises nte ON nte.template_id = {new_id} AND nte.order_index = ote.order_index
+                WHERE ote.template_id = ?
+            """, params + (template_id,))
+        ]
+    stmts.append(Statement("SELECT id FROM templates ORDER BY id DESC LIMIT ?", (len(clones),)))
+    rows = execute_batch(stmts)[-1].rows
+    return [r[0] for r in reversed(rows)]
+
 def update_set(set_id, reps=None, weight=None):
     """Updates a set."""
     execute("UPDATE template_sets SET reps = ?, weight = ? WHERE id = ?", (reps, weight, set_id))
 
 def update_template_set_match(template_id, order_index, set_number, reps, weight):
-    """Updates the template set that matches the given structure."""
-    # Find list of exercises to map order_index
-    # We could do a complex join update, but SQLite syntax varies.
-    # Safe way: Find ID first.
+    """Updates the template set at the given exercise and set positions (display numbers)."""
     row = query_one("""
         SELECT ts.id 
-        FROM template_sets ts
-        JOIN template_exercises te ON ts.template_exercise_id = te.id
-        WHERE te.template_id = ? AND te.order_index = ? AND ts.set_number = ?
+        FROM template_set_positions ts
+        JOIN template_exercise_positions te ON ts.template_exercise_id = te.id
+        WHERE te.template_id = ? AND te.position = ? AND ts.position = ?
     """, (template_id, order_index, set_number))
     
     if row:
         ts_id = row[0]
         execute("UPDATE template_sets SET reps = ?, weight = ? WHERE id = ?", (reps, weight, ts_id))
+
+def get_session_sync_statements(workout_id):
+    """
+    Diffs a session's completed actuals against its template's sets and returns
+    UPDATE statements for only the rows that changed.
+    Returns nothing unless the template syncs at session end.
+    """
+    rows = query_all("""
+        SELECT ts.id, s.actual_reps, s.actual_weight
+        FROM sets s
+        JOIN workout_exercises we ON s.workout_exercise_id = we.id
+        JOIN workouts w ON we.workout_id = w.id
+        JOIN templates t ON t.id = w.template_id
+        JOIN template_exercise_positions te
+          ON te.template_id = w.template_id
+         AND te.position = we.order_index
+         AND te.exercise_id = we.exercise_id
+        JOIN template_set_positions ts
+          ON ts.template_exercise_id = te.id
+         AND ts.position = s.set_number
+        WHERE w.id = ?
+          AND t.sync_policy = 'SESSION_END'
+          AND s.completed = 1
+          AND (ts.reps IS NOT s.actual_reps OR ts.weight IS NOT s.actual_weight)
+    """, (workout_id,))
+    
+    return [
+        Statement("UPDATE template_sets SET reps = ?, weight = ? WHERE id = ?", (r[1], r[2], r[0]))
+        for r in rows
+    ]
+
+def get_sync_state():
+    """
+    Loads everything a template sync needs in one round-trip: every template with its
+    exercises and sets, the exercise library and the next free ids.
+    Returns (templates, exercises, next_ids) where templates are dicts shaped like
+    get_template (exercise rows carry exercise_id and sort_key, sets carry id/sort_key/reps/weight),
+    exercises is {casefolded name: (id, name)} and next_ids is {table: id}.
+    """
+    id_tables = ["templates", "template_exercises", "template_sets", "exercises"]
+    results = execute_batch([
+        Statement("""
+            SELECT t.id, t.name, t.sync_policy, t.progression_policy,
+                   te.id, te.exercise_id, te.order_index, te.progression_policy,
+                   ts.id, ts.set_number, ts.reps, ts.weight
+            FROM templates t
+            LEFT JOIN template_exercises te ON te.template_id = t.id
+            LEFT JOIN template_sets ts ON ts.template_exercise_id = te.id
+            ORDER BY t.id, te.order_index, ts.set_number
+        """),
+        Statement("SELECT id, name FROM exercises")
+    ] + [Statement(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {t}") for t in id_tables])
+    
+    templates = {}
+    for r in results[0].rows:
+        template = templates.setdefault(r[0], {
+            "id": r[0],
+            "name": r[1],
+            "sync_policy": r[2],
+            "progression_policy": r[3],
+            "exercises": []
+        })
+        if r[4] is None:
+            continue
+        exercises = template["exercises"]
+        if not exercises or exercises[-1]["id"] != r[4]:
+            exercises.append({
+                "id": r[4],
+                "exercise_id": r[5],
+                "order_index": len(exercises) + 1,
+                "sort_key": r[6],
+                "progression_policy": r[7],
+                "sets": []
+            })
+        if r[8] is not None:
+            sets = exercises[-1]["sets"]
+            sets.append({"id": r[8], "set_number": len(sets) + 1, "sort_key": r[9], "reps": r[10], "weight": r[11]})
+    
+    exercises = {name.strip().casefold(): (id, name) for id, name in results[1].rows}
+    next_ids = {t: res.rows[0][0] for t, res in zip(id_tables, results[2:])}
+    return list(templates.values()), exercises, next_ids
+
+# Phases of a template sync batch. Deletes free keys, parked rows move to -id, moved
+# rows get their final keys before inserts take the gaps they left.
+_CHANGE_SQL = {
+    "create_exercise": (0, "INSERT INTO exercises (id, name) VALUES (?, ?)"),
+    "create_template": (0, "INSERT INTO templates (id, name, sync_policy, progression_policy) VALUES (?, ?, ?, ?)"),
+    "update_template": (0, "UPDATE templates SET name = ?, sync_policy = ?, progression_policy = ? WHERE id = ?"),
+    "delete_set": (1, "DELETE FROM template_sets WHERE id = ?"),
+    "delete_exercise_sets": (1, "DELETE FROM template_sets WHERE template_exercise_id = ?"),
+    "delete_exercise": (2, "DELETE FROM template_exercises WHERE id = ?"),
+    "park_exercise": (3, "UPDATE template_exercises SET order_index = -1 * id WHERE id = ?"),
+    "update_exercise": (4, "UPDATE template_exercises SET order_index = ?, progression_policy = ? WHERE id = ?"),
+    "insert_exercise": (5, """
+        INSERT INTO template_exercises (id, template_id, exercise_id, order_index, progression_policy)
+        VALUES (?, ?, ?, ?, ?)
+    """),
+    "insert_set": (6, "INSERT INTO template_sets (id, template_exercise_id, set_number, reps, weight) VALUES (?, ?, ?, ?, ?)"),
+    "update_set": (6, "UPDATE template_sets SET reps = ?, weight = ? WHERE id = ?")
+}
+
+def template_change_statements(changes):
+    """
+    Turns sync changes, tuples of (kind, *params) with kinds from _CHANGE_SQL, into
+    statements ordered so positions never collide within the batch.
+    """
+    ordered = sorted(changes, key=lambda c: _CHANGE_SQL[c[0]][0])
+    return [Statement(_CHANGE_SQL[c[0]][1], c[1:]) for c in ordered]
+
+def apply_template_changes(changes):
+    """Applies sync changes in one atomic batch."""
+    if changes:
+        execute_batch(template_change_statements(changes))
+
+def respace_statements():
+    """
+    Statements that rewrite every template's exercise and set keys to ORDER_GAP spacing,
+    keeping the current order. Rows are parked at -id first.
+    """
+    stmts = [
+        Statement("UPDATE template_exercises SET order_index = -1 * id"),
+        Statement("UPDATE template_sets SET set_number = -1 * id")
+    ]
+    for table, parent, key in (
+        ("template_exercises", "template_id", "order_index"),
+        ("template_sets", "template_exercise_id", "set_number")
+    ):
+        rows = query_all(f"SELECT id, {parent} FROM {table} ORDER BY {parent}, {key}, id")
+        position, last_parent = 0, None
+        for row_id, parent_id in rows:
+            position = position + 1 if parent_id == last_parent else 1
+            last_parent = parent_id
+            stmts.append(Statement(f"UPDATE {table} SET {key} = ? WHERE id = ?", (position * ORDER_GAP, row_id)))
+    return stmts
+
+# Template versions are immutable, content-addressed snapshots of a template's exercises
+# and sets. Sessions reference a version; identical content shares one version.
+
+def get_version_source(template_id):
+    """
+    Reads the template's name and its current content in one batch.
+    Returns (name, content) or None, where content is
+    [(exercise_id, progression_policy, [(reps, weight), ...]), ...] in display order.
+    """
+    results = execute_batch([
+        Statement("SELECT name FROM templates WHERE id = ?", (template_id,)),
+        Statement("""
+            SELECT te.id, te.exercise_id, te.progression_policy, ts.id, ts.reps, ts.weight
+            FROM template_exercises te
+            LEFT JOIN template_sets ts ON ts.template_exercise_id = te.id
+            WHERE te.template_id = ?
+            ORDER BY te.order_index, ts.set_number
+        """, (template_id,))
+    ])
+    if not results[0].rows:
+        return None
+    
+    content, last_te = [], None
+    for te_id, exercise_id, policy, set_id, reps, weight in results[1].rows:
+        if te_id != last_te:
+            content.append((exercise_id, policy, []))
+            last_te = te_id
+        # Blank sets (no reps or weight yet) are still sets
+        if set_id is not None:
+            content[-1][2].append((reps, weight))
+    return results[0].rows[0][0], content
+
+def version_hash(content):
+    """Returns the content hash that identifies a template version."""
+    canonical = json.dumps(
+        [[exercise_id, policy, [[reps, weight] for reps, weight in sets]] for exercise_id, policy, sets in content],
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def get_version_id(content_hash):
+    """Returns the id of the version with this content hash, or None."""
+    row = query_one("SELECT id FROM template_versions WHERE content_hash = ?", (content_hash,))
+    return row[0] if row else None
+
+def version_statements(content, content_hash):
+    """
+    Statements that store a version. Rows are keyed by the content hash and positions
+    (1-based), so running them for an existing version changes nothing.
+    """
+    stmts = [Statement(
+        "INSERT INTO template_versions (content_hash) VALUES (?) ON CONFLICT(content_hash) DO NOTHING",
+        (content_hash,)
+    )]
+    for position, (exercise_id, policy, sets) in enumerate(content, start=1):
+        stmts.append(Statement("""
+            INSERT INTO template_version_exercises (version_id, position, exercise_id, progression_policy)
+            SELECT id, ?, ?, ? FROM template_versions WHERE content_hash = ?
+            ON CONFLICT(version_id, position) DO NOTHING
+        """, (position, exercise_id, policy, content_hash)))
+        for set_number, (reps, weight) in enumerate(sets, start=1):
+            stmts.append(Statement("""
+                INSERT INTO template_version_sets (version_exercise_id, set_number, reps, weight)
+                SELECT ve.id, ?, ?, ?
+                FROM template_version_exercises ve
+                JOIN template_versions v ON v.id = ve.version_id
+                WHERE v.content_hash = ? AND ve.position = ?
+                ON CONFLICT(version_exercise_id, set_number) DO NOTHING
+            """, (set_number, reps, weight, content_hash, position)))
+    return stmts
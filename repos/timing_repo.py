@@ -0,0 +1,85 @@
+from db.conn import execute_batch, query_all, query_one
+from libsql_client import Statement
+
+# Rows per multi-row INSERT when rewriting the whole table
+_CHUNK = 200
+
+def get_set_times(workout_id=None):
+    """
+    Returns (workout_id, set_id, exercise_id, started_at, completed_at) for completed sets,
+    ordered by workout and then execution order. Optionally for one workout.
+    """
+    where = "AND we.workout_id = ?" if workout_id is not None else ""
+    params = (workout_id,) if workout_id is not None else ()
+    return query_all(f"""
+        SELECT we.workout_id, s.id, we.exercise_id, s.started_at, s.completed_at
+        FROM sets s
+        JOIN workout_exercises we ON s.workout_exercise_id = we.id
+        WHERE s.completed = 1 AND s.completed_at IS NOT NULL {where}
+        ORDER BY we.workout_id, COALESCE(s.started_at, s.completed_at)
+    """, params)
+
+def _insert_statements(set_rows, session_rows):
+    stmts = []
+    for i in range(0, len(set_rows), _CHUNK):
+        chunk = set_rows[i:i + _CHUNK]
+        stmts.append(Statement(
+            "INSERT INTO set_timing (set_id, workout_id, exercise_id, duration_seconds, rest_seconds) VALUES "
+            + ", ".join(["(?, ?, ?, ?, ?)"] * len(chunk)),
+            [v for row in chunk for v in row]
+        ))
+    for i in range(0, len(session_rows), _CHUNK):
+        chunk = session_rows[i:i + _CHUNK]
+        stmts.append(Statement(
+            "INSERT INTO session_timing (workout_id, timed_sets, work_seconds, rest_seconds, active_seconds, density, avg_rest_seconds) VALUES "
+            + ", ".join(["(?, ?, ?, ?, ?, ?, ?)"] * len(chunk)),
+            [v for row in chunk for v in row]
+        ))
+    return stmts
+
+def session_timing_statements(workout_id, set_rows, session_rows):
+    """
+    Statements that replace one session's materialized timing.
+    Meant to run in the same batch that marks the session COMPLETED.
+    """
+    return [
+        Statement("DELETE FROM set_timing WHERE workout_id = ?", (workout_id,)),
+        Statement("DELETE FROM session_timing WHERE workout_id = ?", (workout_id,)),
+    ] + _insert_statements(set_rows, session_rows)
+
+def replace_all(set_rows, session_rows):
+    """Rewrites set_timing and session_timing in one batch."""
+    execute_batch([
+        Statement("DELETE FROM set_timing"),
+        Statement("DELETE FROM session_timing"),
+    ] + _insert_statements(set_rows, session_rows))
+
+def get_session_timing(workout_id):
+    row = query_one("""
+        SELECT workout_id, timed_sets, work_seconds, rest_seconds, active_seconds, density, avg_rest_seconds
+        FROM session_timing
+        WHERE workout_id = ?
+    """, (workout_id,))
+    if not row:
+        return None
+    return {
+        "workout_id": row[0],
+        "timed_sets": row[1],
+        "work_seconds": row[2],
+        "rest_seconds": row[3],
+        "active_seconds": row[4],
+        "density": row[5],
+        "avg_rest_seconds": row[6]
+    }
+
+def get_rest_samples():
+    """Returns (exercise_ids, rest_seconds) lists of every measured rest interval."""
+    rows = query_all("""
+        SELECT exercise_id, rest_seconds
+        FROM set_timing
+        WHERE rest_seconds IS NOT NULL
+    """)
+    if not rows:
+        return [], []
+    exercise_ids, rests = zip(*rows)
+    return list(exercise_ids), list(rests)
@@ -0,0 +1,50 @@
+from db.conn import execute_batch, query_one, query_all
+from libsql_client import Statement
+
+def get_week(week_start):
+    """Returns the rollup row for the week starting on the given Sunday."""
+    row = query_one("""
+        SELECT week_start, planned_days, planned_workouts, completed_workouts, rest_days, is_consistent
+        FROM weekly_summary
+        WHERE week_start = ?
+    """, (week_start,))
+    if row:
+        return {
+            "week_start": row[0],
+            "planned_days": row[1],
+            "planned_workouts": row[2],
+            "completed_workouts": row[3],
+            "rest_days": row[4],
+            "is_consistent": bool(row[5])
+        }
+    return None
+
+def get_consistency_flags(before_week_start):
+    """Returns [(week_start, is_consistent)] for all weeks before the given week, oldest first."""
+    rows = query_all("""
+        SELECT week_start, is_consistent
+        FROM weekly_summary
+        WHERE week_start < ?
+        ORDER BY week_start
+    """, (before_week_start,))
+    return [(r[0], bool(r[1])) for r in rows]
+
+def upsert_weeks(weeks):
+    """Writes a list of week rollups in one batch."""
+    if not weeks:
+        return
+    stmts = [Statement("""
+        INSERT INTO weekly_summary (week_start, planned_days, planned_workouts, completed_workouts, rest_days, is_consistent, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(week_start) DO UPDATE SET
+            planned_days = excluded.planned_days,
+            planned_workouts = excluded.planned_workouts,
+            completed_workouts = excluded.completed_workouts,
+            rest_days = excluded.rest_days,
+            is_consistent = excluded.is_consistent,
+            updated_at = excluded.updated_at
+    """, (
+        w['week_start'], w['planned_days'], w['planned_workouts'],
+        w['completed_workouts'], w['rest_days'], 1 if w['is_consistent'] else 0
+    )) for w in weeks]
+    execute_batch(stmts)
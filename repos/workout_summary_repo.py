@@ -0,0 +1,144 @@
+from db.conn import execute_batch, query_all, query_one
+from libsql_client import Statement
+
+# One summary row per COMPLETED workout. Duration comes from the workout's own
+# started_at/completed_at, so this must run after the status update in the same batch.
+# Versioned sessions only hold the sets that were performed; their planned counts come
+# from the version.
+_SUMMARY_SELECT = """
+    SELECT w.id, w.date, w.name, w.template_id, w.started_at, w.completed_at,
+           CASE WHEN w.started_at IS NOT NULL AND w.completed_at IS NOT NULL
+                THEN CAST(ROUND((julianday(w.completed_at) - julianday(w.started_at)) * 86400) AS INTEGER)
+           END,
+           CASE WHEN w.template_version_id IS NULL THEN COUNT(DISTINCT we.id)
+                ELSE (SELECT COUNT(*) FROM template_version_exercises ve
+                      WHERE ve.version_id = w.template_version_id)
+           END,
+           CASE WHEN w.template_version_id IS NULL THEN COUNT(s.id)
+                ELSE (SELECT COUNT(*) FROM template_version_sets vs
+                      JOIN template_version_exercises ve ON ve.id = vs.version_exercise_id
+                      WHERE ve.version_id = w.template_version_id)
+           END,
+           COALESCE(SUM(s.completed), 0),
+           COALESCE(SUM(CASE WHEN s.completed = 1 THEN s.actual_reps END), 0),
+           COALESCE(SUM(CASE WHEN s.completed = 1 THEN s.actual_reps * COALESCE(s.actual_weight, 0) END), 0),
+           (SELECT COUNT(*) FROM personal_records pr WHERE pr.workout_id = w.id)
+    FROM workouts w
+    LEFT JOIN workout_exercises we ON we.workout_id = w.id
+    LEFT JOIN sets s ON s.workout_exercise_id = we.id
+    WHERE w.status = 'COMPLETED'
+"""
+
+_INSERT = """
+    INSERT INTO workout_summaries (
+        workout_id, date, name, template_id, started_at, completed_at, duration_seconds,
+        exercises, sets_planned, sets_completed, total_reps, tonnage, prs_hit
+    )
+"""
+
+_COLUMNS = """
+    workout_id, date, name, template_id, started_at, completed_at, duration_seconds,
+    exercises, sets_planned, sets_completed, total_reps, tonnage, prs_hit
+"""
+
+def _to_dict(row):
+    return {
+        "workout_id": row[0],
+        "date": row[1],
+        "name": row[2],
+        "template_id": row[3],
+        "started_at": row[4],
+        "completed_at": row[5],
+        "duration_seconds": row[6],
+        "exercises": row[7],
+        "sets_planned": row[8],
+        "sets_completed": row[9],
+        "total_reps": row[10],
+        "tonnage": row[11],
+        "prs_hit": row[12]
+    }
+
+def summary_statements(workout_id):
+    """
+    Statements that (re)write the session's summary row.
+    Meant to run in the same batch that marks the session COMPLETED; a no-op for other sessions.
+    """
+    return [
+        Statement("DELETE FROM workout_summaries WHERE workout_id = ?", (workout_id,)),
+        Statement(f"{_INSERT} {_SUMMARY_SELECT} AND w.id = ? GROUP BY w.id", (workout_id,))
+    ]
+
+def set_edited_statements(set_id):
+    """Statements that refresh the summary of the (completed) session a set belongs to."""
+    workout_of_set = """(
+        SELECT we.workout_id FROM sets s
+        JOIN workout_exercises we ON s.workout_exercise_id = we.id
+        WHERE s.id = ?
+    )"""
+    return [
+        Statement(f"DELETE FROM workout_summaries WHERE workout_id = {workout_of_set}", (set_id,)),
+        Statement(f"{_INSERT} {_SUMMARY_SELECT} AND w.id = {workout_of_set} GROUP BY w.id", (set_id,))
+    ]
+
+def rebuild_all():
+    """Rebuilds workout_summaries for every completed workout."""
+    execute_batch([
+        Statement("DELETE FROM workout_summaries"),
+        Statement(f"{_INSERT} {_SUMMARY_SELECT} GROUP BY w.id")
+    ])
+
+def get_summary(workout_id):
+    row = query_one(f"SELECT {_COLUMNS} FROM workout_summaries WHERE workout_id = ?", (workout_id,))
+    return _to_dict(row) if row else None
+
+def get_range(start_date, end_date):
+    """Returns summaries for completed workouts in the date range, ordered by date."""
+    rows = query_all(f"""
+        SELECT {_COLUMNS}
+        FROM workout_summaries
+        WHERE date >= ? AND date <= ?
+        ORDER BY date, workout_id
+    """, (start_date, end_date))
+    return [_to_dict(r) for r in rows]
+
+def get_totals(start_date, end_date):
+    """Returns {sessions, duration_seconds, sets_completed, tonnage, prs_hit} over a date range."""
+    row = query_one("""
+        SELECT COUNT(*), COALESCE(SUM(duration_seconds), 0), COALESCE(SUM(sets_completed), 0),
+               COALESCE(SUM(tonnage), 0), COALESCE(SUM(prs_hit), 0)
+        FROM workout_summaries
+        WHERE date >= ? AND date <= ?
+    """, (start_date, end_date))
+    return {
+        "sessions": row[0],
+        "duration_seconds": row[1],
+        "sets_completed": row[2],
+        "tonnage": row[3],
+        "prs_hit": row[4]
+    }
+
+def get_page(before=None, limit=20):
+    """
+    Keyset page of summaries, newest first.
+    before is the (date, workout_id) of the last row of the previous page.
+    Returns (rows, next_before) where next_before is None on the last page.
+    """
+    if before:
+        rows = query_all(f"""
+            SELECT {_COLUMNS}
+            FROM workout_summaries
+            WHERE (date, workout_id) < (?, ?)
+            ORDER BY date DESC, workout_id DESC
+            LIMIT ?
+        """, (before[0], before[1], limit + 1))
+    else:
+        rows = query_all(f"""
+            SELECT {_COLUMNS}
+            FROM workout_summaries
+            ORDER BY date DESC, workout_id DESC
+            LIMIT ?
+        """, (limit + 1,))
+    
+    page = [_to_dict(r) for r in rows[:limit]]
+    next_before = (page[-1]['date'], page[-1]['workout_id']) if len(rows) > limit else None
+    return page, next_before
@@ -0,0 +1,41 @@
+import sys
+import time
+from services.backup_service import restore_backup, BackupError
+import streamlit as st
+
+# Verify we can access secrets
+try:
+    _ = st.secrets["TURSO_DATABASE_URL"]
+except:
+    print("Secrets not loaded automatically. Attempting manual load for script context.")
+    import os, toml
+    secrets_path = os.path.join(".streamlit", "secrets.toml")
+    if os.path.exists(secrets_path):
+        with open(secrets_path, "r") as f:
+             st.secrets = toml.load(f)
+
+# Usage: python restore_backup.py FULL_BACKUP [INCREMENTAL ...]
+# A full backup (or legacy JSON export) replaces all workout data.
+files = sys.argv[1:]
+if not files:
+    print("Usage: python restore_backup.py FULL_BACKUP [INCREMENTAL ...]")
+    import os
+    os._exit(1)
+
+print(f"Restoring {len(files)} file(s)...")
+start = time.time()
+try:
+    report = restore_backup(files)
+except BackupError as e:
+    print(f"Restore failed: {e}")
+    import os
+    os._exit(1)
+
+for entry in report:
+    print(f"\n{entry['file']} ({entry['kind']}, sha256 {entry['sha256'][:12]})")
+    for table, r in entry['tables'].items():
+        status = "ok" if r['verified'] else "MISMATCH"
+        print(f"  {table:<20}{r['rows']:>8} rows{r['deleted']:>6} deleted  {r['checksum']}  {status}")
+print(f"\nSuccess! Restored and verified in {time.time() - start:.1f}s; derived tables rebuilt.")
+import os
+os._exit(0)
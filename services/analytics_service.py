@@ -0,0 +1,133 @@
+import numpy as np
+from functools import lru_cache
+from repos import analytics_repo
+from services import history_frame
+
+FORMULAS = ("epley", "brzycki")
+
+def estimate_1rm(weight, reps, formula="epley"):
+    """
+    Vectorized estimated 1RM.
+    - Epley:   w * (1 + r / 30)
+    - Brzycki: w * 36 / (37 - r)   (reps capped at 36)
+    A single rep is its own 1RM.
+    """
+    weight = np.asarray(weight, dtype=np.float64)
+    reps = np.asarray(reps, dtype=np.float64)
+    
+    if formula == "brzycki":
+        est = weight * 36.0 / (37.0 - np.minimum(reps, 36.0))
+    else:
+        est = weight * (1.0 + reps / 30.0)
+    
+    return np.where(reps == 1, weight, est)
+
+def week_start_days(days):
+    """Maps days-since-epoch to the Sunday that starts their week (1970-01-01 was a Thursday)."""
+    return days - (days + 4) % 7
+
+@lru_cache(maxsize=2)
+def load_set_history(version):
+    """
+    Completed set history as NumPy columns, ordered by date. Cached per data version.
+    Sliced from the columnar history frame, which is reused from its disk cache
+    (keyed by database as well as version).
+    """
+    cols = history_frame.get_history_columns()
+    mask = np.asarray(cols["completed"]) & ~np.isnan(cols["actual_reps"])
+    order = np.argsort(np.asarray(cols["date"])[mask], kind="stable")
+    
+    return {
+        "date": np.asarray(cols["date"])[mask][order],
+        "exercise_id": np.asarray(cols["exercise_id"])[mask][order],
+        "reps": np.asarray(cols["actual_reps"], dtype=np.float64)[mask][order],
+        # Bodyweight sets have no weight
+        "weight": np.nan_to_num(np.asarray(cols["actual_weight"])[mask][order]),
+    }
+
+@lru_cache(maxsize=4)
+def _weekly_stats(version, formula):
+    hist = load_set_history(version)
+    if len(hist["reps"]) == 0:
+        return None
+    
+    days = hist["date"].astype(np.int64)
+    weeks = week_start_days(days)
+    ex = hist["exercise_id"]
+    reps = hist["reps"]
+    weight = hist["weight"]
+    
+    # Group key: (exercise, week) packed into one integer
+    week_min = weeks.min()
+    span = weeks.max() - week_min + 1
+    keys, inv = np.unique(ex * span + (weeks - week_min), return_inverse=True)
+    n = len(keys)
+    
+    set_counts = np.bincount(inv, minlength=n)
+    total_reps = np.bincount(inv, weights=reps, minlength=n)
+    tonnage = np.bincount(inv, weights=reps * weight, minlength=n)
+    
+    # Best e1RM per group: sort by (group, e1rm) and take the last of each group
+    e1rm = estimate_1rm(weight, reps, formula)
+    order = np.lexsort((e1rm, inv))
+    last_of_group = np.r_[np.nonzero(np.diff(inv[order]))[0], len(order) - 1]
+    best_e1rm = e1rm[order][last_of_group]
+    
+    group_ex = keys // span
+    group_week = keys % span + week_min
+    
+    # Running best e1RM per exercise (keys are sorted by exercise, then week).
+    # Offset each exercise above the previous one so a single accumulate works.
+    ex_rank = np.unique(group_ex, return_inverse=True)[1]
+    offset = ex_rank * (best_e1rm.max() + 1.0)
+    running_best = np.maximum.accumulate(best_e1rm + offset) - offset
+    
+    avg_weight = np.divide(tonnage, total_reps, out=np.zeros(n), where=total_reps > 0)
+    intensity = np.divide(avg_weight, running_best, out=np.full(n, np.nan), where=running_best > 0)
+    
+    return {
+        "exercise_id": group_ex,
+        "week_start": group_week.astype("datetime64[D]"),
+        "sets": set_counts,
+        "reps": total_reps,
+        "tonnage": tonnage,
+        "best_e1rm": best_e1rm,
+        "avg_weight": avg_weight,
+        "intensity": intensity,
+    }
+
+def get_weekly_stats(formula="epley"):
+    """
+    Returns per-exercise, per-week columns:
+    exercise_id, week_start, sets, reps, tonnage, best_e1rm, avg_weight and
+    intensity (average working weight / best e1RM to date).
+    Recomputed only when the data version changes.
+    """
+    if formula not in FORMULAS:
+        raise ValueError(f"Unknown 1RM formula: {formula}")
+    return _weekly_stats(analytics_repo.get_data_version(), formula)
+
+def get_exercise_weekly_stats(exercise_id, formula="epley"):
+    """Slices the weekly stats down to a single exercise."""
+    stats = get_weekly_stats(formula)
+    if stats is None:
+        return None
+    mask = stats["exercise_id"] == exercise_id
+    return {k: v[mask] for k, v in stats.items()}
+
+def get_exercise_totals(formula="epley"):
+    """All-time totals per exercise: sets, reps, tonnage and best e1RM."""
+    stats = get_weekly_stats(formula)
+    if stats is None:
+        return None
+    ex_ids, inv = np.unique(stats["exercise_id"], return_inverse=True)
+    n = len(ex_ids)
+    best = np.zeros(n)
+    np.maximum.at(best, inv, stats["best_e1rm"])
+    return {
+        "exercise_id": ex_ids,
+        "sets": np.bincount(inv, weights=stats["sets"], minlength=n).astype(np.int64),
+        "reps": np.bincount(inv, weights=stats["reps"], minlength=n),
+        "tonnage": np.bincount(inv, weights=stats["tonnage"], minlength=n),
+        "best_e1rm": best,
+    }
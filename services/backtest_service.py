@@ -0,0 +1,215 @@
+"""
+Offline backtester for progressive overload policies.
+
+Session history is loaded once and replayed in memory: for every (template, exercise)
+the policy computes targets from the previous session, the next session's actuals are
+scored against them and the policy advances its state. Nothing is written to the DB.
+"""
+import numpy as np
+from repos import analytics_repo
+from services.runner_service import ProgressionPolicy, RotatingCursorPolicy, PROGRESSION_POLICIES
+
+class AllSetsPolicy(ProgressionPolicy):
+    """Every set targets last reps + 1 at the same weight; advances when all targets are hit."""
+    name = "ALL_SETS"
+    
+    def targets(self, state, ctx):
+        return {
+            s['set_number']: (s['actual_reps'] + 1, s['actual_weight'])
+            for s in ctx['last_sets']
+            if s['completed'] and s['actual_reps'] is not None
+        }
+    
+    def advance(self, state, ctx, met):
+        return bool(met) and all(met.values())
+
+# Every live policy plus experimental variants that only exist here
+DEFAULT_POLICIES = tuple(PROGRESSION_POLICIES.values()) + (RotatingCursorPolicy(exact=False), AllSetsPolicy())
+
+def load_history():
+    """
+    Loads all completed template sessions in one query, grouped as
+    [{workout_id, template_id, date, exercises: [{order_index, exercise_id, sets}]}]
+    with the same set keys runner_repo returns.
+    """
+    sessions = []
+    session = None
+    exercise = None
+    for (wid, tid, date, order_index, ex_id, set_number,
+         planned_reps, planned_weight, completed, reps, weight) in analytics_repo.get_template_session_history():
+        if session is None or session['workout_id'] != wid:
+            session = {"workout_id": wid, "template_id": tid, "date": date, "exercises": []}
+            sessions.append(session)
+            exercise = None
+        if exercise is None or exercise['order_index'] != order_index:
+            exercise = {"order_index": order_index, "exercise_id": ex_id, "sets": []}
+            session['exercises'].append(exercise)
+        exercise['sets'].append({
+            "set_number": set_number,
+            "planned_reps": planned_reps,
+            "planned_weight": planned_weight,
+            "completed": bool(completed),
+            "actual_reps": reps,
+            "actual_weight": weight,
+        })
+    return sessions
+
+def synthetic_history(sessions=156, exercises=4, sets=3, start_weight=100.0, start_reps=8,
+                      rep_ceiling=12, weight_step=5.0, gain=0.01, noise=0.8, seed=0):
+    """
+    Generates a single-template history in the load_history format.
+    Each exercise has a lifter whose rep capacity at the working weight grows by
+    `gain` per session with Gaussian noise and fatigue across sets. When every set
+    reaches rep_ceiling the weight goes up by weight_step and capacity drops back.
+    """
+    rng = np.random.default_rng(seed)
+    capacity = np.full(exercises, float(start_reps))
+    weight = np.full(exercises, start_weight)
+    fatigue = np.arange(sets) * 0.5
+    
+    history = []
+    for i in range(sessions):
+        capacity *= 1.0 + gain
+        reps = np.floor(capacity[:, None] - fatigue[None, :] + rng.normal(0, noise, (exercises, sets)))
+        reps = np.clip(reps, 1, rep_ceiling).astype(np.int64)
+        history.append({
+            "workout_id": i + 1,
+            "template_id": 1,
+            "date": str(np.datetime64("2020-01-01") + i * 2),
+            "exercises": [
+                {
+                    "order_index": e + 1,
+                    "exercise_id": e + 1,
+                    "sets": [
+                        {"set_number": n + 1, "planned_reps": start_reps, "planned_weight": float(weight[e]),
+                         "completed": True, "actual_reps": int(reps[e, n]), "actual_weight": float(weight[e])}
+                        for n in range(sets)
+                    ],
+                }
+                for e in range(exercises)
+            ],
+        })
+        bump = (reps >= rep_ceiling).all(axis=1)
+        weight[bump] += weight_step
+        capacity[bump] = start_reps
+    return history
+
+def _prescription(ctx, targets):
+    """
+    Total reps and top weight prescribed for a session: targets where the policy set
+    them, otherwise last session's actuals (or the plan for sets that are new).
+    """
+    last = {s['set_number']: s for s in ctx['last_sets']}
+    total_reps = 0
+    top_weight = 0.0
+    for p in ctx['planned_sets']:
+        prev = last.get(p['set_number'])
+        fallback = (prev['actual_reps'], prev['actual_weight']) if prev else (p['planned_reps'], p['planned_weight'])
+        reps, weight = targets.get(p['set_number'], fallback)
+        total_reps += reps or 0
+        top_weight = max(top_weight, weight or 0.0)
+    return total_reps, top_weight
+
+def _best_e1rm(sets):
+    """Best Epley e1RM of a session's completed sets (same formula as personal_records)."""
+    best = None
+    for s in sets:
+        if s['completed'] and s['actual_reps']:
+            w = s['actual_weight'] or 0.0
+            e1rm = w if s['actual_reps'] == 1 else w * (1 + s['actual_reps'] / 30.0)
+            best = e1rm if best is None else max(best, e1rm)
+    return best
+
+def replay(sessions, policy):
+    """
+    Replays sessions (ordered by template, then date) through one policy.
+    Returns the per-(template, exercise) results and the aggregate report.
+    """
+    states = {}
+    last = {}
+    best_e1rm = {}
+    per_key = {}
+    
+    for session in sessions:
+        seen = set()
+        for ex in session['exercises']:
+            key = (session['template_id'], ex['exercise_id'])
+            # A repeated exercise only counts once per session, like the live lookup
+            if key in seen:
+                continue
+            seen.add(key)
+            
+            last_sets = last.get(key)
+            last[key] = ex['sets']
+            ctx = {
+                "last_sets": last_sets,
+                "planned_sets": ex['sets'],
+                "best_e1rm": best_e1rm.get(ex['exercise_id']),
+            }
+            # Records only see this session after it has been scored
+            session_best = _best_e1rm(ex['sets'])
+            if session_best is not None:
+                best_e1rm[ex['exercise_id']] = max(session_best, best_e1rm.get(ex['exercise_id']) or 0.0)
+            if not last_sets:
+                continue
+            
+            state = states.setdefault(key, {})
+            targets = policy.targets(state, ctx)
+            actuals = {s['set_number']: s for s in ex['sets']}
+            met = {}
+            for set_number, target in targets.items():
+                actual = actuals.get(set_number)
+                if actual and actual['completed'] and actual['actual_reps'] is not None:
+                    met[set_number] = policy.is_met(target, actual)
+                else:
+                    met[set_number] = False
+            
+            cursor_before = state.get("cursor")
+            advanced = policy.advance(state, ctx, met)
+            
+            r = per_key.get(key)
+            if r is None:
+                r = per_key[key] = {
+                    "template_id": key[0], "exercise_id": key[1], "sessions": 0,
+                    "targets": 0, "met": 0, "advances": 0, "wraps": 0,
+                    "first_prescription": _prescription(ctx, targets),
+                }
+            r['sessions'] += 1
+            r['targets'] += len(targets)
+            r['met'] += sum(met.values())
+            r['advances'] += int(advanced)
+            if cursor_before is not None and state.get("cursor", cursor_before) < cursor_before:
+                r['wraps'] += 1
+            r['last_prescription'] = _prescription(ctx, targets)
+    
+    results = list(per_key.values())
+    for r in results:
+        (first_reps, first_weight), (last_reps, last_weight) = r.pop('first_prescription'), r.pop('last_prescription')
+        r['rep_progression'] = last_reps - first_reps
+        r['weight_progression'] = last_weight - first_weight
+        r['met_rate'] = r['met'] / r['targets'] if r['targets'] else None
+    
+    targets = sum(r['targets'] for r in results)
+    met = sum(r['met'] for r in results)
+    report = {
+        "policy": policy.name,
+        "exercises": len(results),
+        "sessions": sum(r['sessions'] for r in results),
+        "targets": targets,
+        "met": met,
+        "met_rate": met / targets if targets else None,
+        "advances": sum(r['advances'] for r in results),
+        "wraps": sum(r['wraps'] for r in results),
+        "avg_rep_progression": float(np.mean([r['rep_progression'] for r in results])) if results else 0.0,
+        "avg_weight_progression": float(np.mean([r['weight_progression'] for r in results])) if results else 0.0,
+    }
+    return results, report
+
+def backtest(sessions=None, policies=DEFAULT_POLICIES):
+    """
+    Replays history through each policy and returns {policy name: report}.
+    Loads the real session history when no sessions are given.
+    """
+    if sessions is None:
+        sessions = load_history()
+    return {policy.name: replay(sessions, policy)[1] for policy in policies}
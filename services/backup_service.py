@@ -0,0 +1,303 @@
+import datetime
+from contextlib import contextmanager
+from repos import backup_repo
+
+class BackupError(Exception):
+    pass
+
+MANIFEST_FORMAT = "workout-manager-manifest"
+
+def _file_name(kind):
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"workout_manager_{kind.lower()}_{stamp}.ndjson.gz"
+
+def create_full_backup():
+    """
+    Writes a full gzip NDJSON backup to a temp file. Nothing is recorded yet: pass the
+    returned pending marker to record_backup once the file has been saved.
+    Returns (path, pending).
+    """
+    to_seq = backup_repo.get_change_seq()
+    stats = {}
+    header = {"kind": "FULL", "from_seq": 0, "to_seq": to_seq}
+    path, sha256 = backup_repo.write_tempfile(
+        backup_repo.gzip_chunks(backup_repo.iter_ndjson(header=header, stats=stats))
+    )
+    pending = {
+        "kind": "FULL", "from_seq": 0, "to_seq": to_seq, "parent_id": None,
+        "sha256": sha256, "file_name": _file_name("FULL"), "counts": stats
+    }
+    return path, pending
+
+def create_incremental_backup():
+    """
+    Writes only the rows inserted, updated or deleted since the last backup marker.
+    The file header carries the parent's sha256 so increments chain. Like full backups,
+    it only joins the chain through record_backup. Returns (path, pending).
+    """
+    parent = backup_repo.get_last_marker()
+    if parent is None:
+        raise BackupError("Take a full backup first; incremental backups build on it.")
+    
+    from_seq = parent['to_seq']
+    to_seq = backup_repo.get_change_seq()
+    if backup_repo.count_changes(from_seq, to_seq) == 0:
+        raise BackupError("No changes since the last backup.")
+    
+    stats = {}
+    header = {
+        "kind": "INCREMENTAL",
+        "from_seq": from_seq,
+        "to_seq": to_seq,
+        "parent_sha256": parent['sha256']
+    }
+    path, sha256 = backup_repo.write_tempfile(
+        backup_repo.gzip_chunks(backup_repo.iter_changes_ndjson(from_seq, to_seq, header=header, stats=stats))
+    )
+    pending = {
+        "kind": "INCREMENTAL", "from_seq": from_seq, "to_seq": to_seq, "parent_id": parent['id'],
+        "sha256": sha256, "file_name": _file_name("INCREMENTAL"), "counts": stats
+    }
+    return path, pending
+
+def record_backup(pending):
+    """
+    Records a prepared backup in the chain once its file has been handed to the user.
+    A full backup becomes the new chain root and the change_log entries it covers are
+    pruned. Recording the same file twice is a no-op. Returns the marker.
+    """
+    last = backup_repo.get_last_marker()
+    if last and last['sha256'] == pending['sha256']:
+        return last
+    if pending['kind'] == "INCREMENTAL" and (last is None or last['id'] != pending['parent_id']):
+        raise BackupError("Another backup was recorded after this one was prepared. Take a new incremental backup.")
+    marker = backup_repo.add_marker(
+        pending['kind'], pending['from_seq'], pending['to_seq'], pending['parent_id'],
+        pending['sha256'], pending['file_name'], pending['counts']
+    )
+    if pending['kind'] == "FULL":
+        backup_repo.prune_change_log(pending['to_seq'])
+    return marker
+
+def get_manifest():
+    """
+    Returns the manifest for the current chain: the latest full backup and every
+    increment after it, each with its sequence range, parent and sha256.
+    """
+    return {
+        "format": MANIFEST_FORMAT,
+        "created_at": datetime.datetime.now().isoformat(),
+        "chain": backup_repo.get_chain()
+    }
+
+# --- Restore ---
+# A restore works on record readers: zero-argument callables returning a context
+# manager over backup_repo.iter_backup-style records, so files and the chunk store
+# (services.backup_store) share the same scan/load/verify path.
+
+def file_reader(source):
+    """Returns a record reader for a backup file path or uploaded file object."""
+    @contextmanager
+    def read():
+        with backup_repo.open_source(source) as raw:
+            yield backup_repo.iter_backup(raw)
+    return read
+
+def scan_backup(read, name):
+    """
+    Reads a backup end to end without writing anything: header, and per table the
+    columns, row count and checksum. Incremental scans also keep the row and deleted ids.
+    Raises BackupError on unreadable, truncated or mismatched files.
+    """
+    try:
+        with read() as records:
+            return _scan_records(records, name)
+    except (ValueError, EOFError, OSError) as e:
+        raise BackupError(f"{name}: not a readable backup file ({e}).")
+
+def _scan_records(records, name):
+    header = None
+    footer = None
+    tables = {}
+    for record in records:
+        kind = record[0]
+        if kind == "header":
+            header = record[1]
+            if header.get("version", 1) > backup_repo.NDJSON_VERSION:
+                raise BackupError(f"{name}: written by a newer version (format v{header['version']}).")
+            if header.get("kind", "FULL") not in ("FULL", "INCREMENTAL"):
+                raise BackupError(f"{name}: unknown backup kind {header.get('kind')}.")
+        elif kind == "table":
+            table, columns = record[1], record[2]
+            if table not in backup_repo.BACKUP_TABLES:
+                raise BackupError(f"{name}: unexpected table {table}.")
+            unknown = set(columns) - set(backup_repo.get_columns(table))
+            if unknown or "id" not in columns:
+                raise BackupError(f"{name}: {table} columns don't match this database ({', '.join(sorted(unknown)) or 'no id'}).")
+            tables[table] = {"columns": columns, "rows": 0, "checksum": 0, "ids": [], "deleted": []}
+        elif kind == "rows":
+            table, columns, rows = record[1], record[2], record[3]
+            if table not in tables:
+                raise BackupError(f"{name}: rows before a table header.")
+            entry = tables[table]
+            id_index = columns.index("id")
+            for row in rows:
+                if len(row) != len(columns):
+                    raise BackupError(f"{name}: {table} row has {len(row)} values for {len(columns)} columns.")
+                entry["rows"] += 1
+                entry["checksum"] = backup_repo.combine_digests(entry["checksum"], backup_repo.row_digest(row))
+                entry["ids"].append(row[id_index])
+        elif kind == "deleted":
+            if record[1] not in tables:
+                raise BackupError(f"{name}: deletes before a table header.")
+            tables[record[1]]["deleted"].extend(record[2])
+        elif kind == "end":
+            footer = record[1]
+    
+    backup_kind = header.get("kind", "FULL")
+    if header.get("format") != backup_repo.LEGACY_FORMAT:
+        if footer is None:
+            raise BackupError(f"{name}: file is truncated (no end record).")
+        counts = {t: e["rows"] for t, e in tables.items()}
+        deleted = {t: len(e["deleted"]) for t, e in tables.items() if e["deleted"]}
+        if footer.get("counts") != counts or footer.get("deleted", {}) != deleted:
+            raise BackupError(f"{name}: row counts don't match the file's end record.")
+    if backup_kind == "FULL":
+        # Full restores verify whole tables; the id lists are only needed for increments.
+        for entry in tables.values():
+            entry["ids"] = []
+    return {"name": name, "header": header, "kind": backup_kind, "tables": tables}
+
+def _load(read, scan):
+    """Writes one scanned backup: full files replace the tables, increments delete then upsert."""
+    tables = scan['tables']
+    incremental = scan['kind'] == "INCREMENTAL"
+    if incremental:
+        backup_repo.run_batches([
+            [s for t in reversed(backup_repo.BACKUP_TABLES) if t in tables
+             for s in backup_repo.delete_statements(t, tables[t]['deleted'])],
+            [s for t in backup_repo.BACKUP_TABLES if t in tables
+             for s in backup_repo.park_statements(t, tables[t]['ids'])]
+        ])
+    else:
+        backup_repo.run_batches([backup_repo.clear_statements()])
+    
+    with read() as records:
+        backup_repo.run_batches(
+            backup_repo.insert_statements(record[1], record[2], record[3], upsert=incremental)
+            for record in records
+            if record[0] == "rows"
+        )
+
+def _verify(scan):
+    """Compares row counts and checksums in the database with the scanned file. Returns per-table results."""
+    results = {}
+    failed = []
+    incremental = scan['kind'] == "INCREMENTAL"
+    for table, entry in scan['tables'].items():
+        ids = entry['ids'] if incremental else None
+        count, checksum = backup_repo.table_checksum(table, entry['columns'], ids)
+        leftover = backup_repo.count_ids(table, entry['deleted']) if entry['deleted'] else 0
+        ok = count == entry['rows'] and checksum == entry['checksum'] and leftover == 0
+        results[table] = {
+            "rows": entry['rows'],
+            "deleted": len(entry['deleted']),
+            "checksum": f"{entry['checksum']:016x}",
+            "verified": ok
+        }
+        if not ok:
+            failed.append(table)
+    if failed:
+        raise BackupError(f"{scan['name']}: verification failed for {', '.join(failed)}.")
+    return results
+
+def rebuild_derived():
+    """Rebuilds every table derived from the backed-up ones."""
+    from repos import load_repo, records_repo, workout_summary_repo
+    from services import consistency_service, timing_service
+    consistency_service.rebuild_weekly_summary()
+    load_repo.rebuild_daily_load()
+    records_repo.rebuild_all()
+    timing_service.rebuild_timing()
+    workout_summary_repo.rebuild_all()
+
+def restore_backup(sources, names=None):
+    """
+    Restores backup files: a full backup (or legacy JSON export) followed by any
+    incremental backups, which must chain through parent_sha256. A lone incremental is
+    applied on top of the current data.
+    Every file is read and checked before anything is written. Rows go in FK order as
+    multi-row INSERTs, RESTORE_BATCH_ROWS per client.batch; each table is then verified by
+    row count and checksum, and the derived tables are rebuilt.
+    Returns a report per file. Raises BackupError.
+    """
+    sources = list(sources)
+    names = list(names) if names else [getattr(s, "name", str(s)) for s in sources]
+    if not sources:
+        raise BackupError("No backup files given.")
+    
+    scans = []
+    for source, name in zip(sources, names):
+        try:
+            with backup_repo.open_source(source) as raw:
+                sha256 = backup_repo.file_sha256(raw)
+        except OSError as e:
+            raise BackupError(f"{name}: cannot read file ({e}).")
+        read = file_reader(source)
+        scan = scan_backup(read, name)
+        scan['sha256'] = sha256
+        scans.append((read, scan))
+    
+    scans.sort(key=lambda item: (item[1]['kind'] != "FULL", item[1]['header'].get("from_seq", 0)))
+    if sum(1 for _, s in scans if s['kind'] == "FULL") > 1:
+        raise BackupError("Restore one full backup at a time.")
+    for (_, prev), (_, cur) in zip(scans, scans[1:]):
+        if cur['header'].get("parent_sha256") != prev['sha256']:
+            raise BackupError(f"{cur['name']} does not follow {prev['name']} in the backup chain.")
+    return restore_scanned(scans)
+
+def restore_scanned(scans, store_root=None):
+    """
+    Loads and verifies already-scanned backups in order, then rebuilds derived tables.
+    scans is a list of (reader, scan) pairs. Returns a report per backup.
+    
+    The batches are not one transaction, so the current data is first stored as a
+    snapshot in the store at store_root (services.backup_store; its default store when
+    None). If loading or verification fails, the BackupError names that snapshot to roll
+    back to.
+    """
+    from services import backup_store
+    full = scans[0][1]['kind'] == "FULL"
+    cursors = backup_repo.get_overload_cursors() if full else []
+    
+    store_root = store_root or backup_store.STORE_DIR
+    try:
+        rollback_id = backup_store.create_snapshot(root=store_root)['id']
+    except (OSError, ValueError) as e:
+        raise BackupError(f"Could not snapshot the current data before restoring ({e}). Nothing was changed.")
+    
+    report = []
+    try:
+        for read, scan in scans:
+            _load(read, scan)
+            report.append({
+                "file": scan['name'],
+                "kind": scan['kind'],
+                "sha256": scan.get('sha256'),
+                "rollback_snapshot": rollback_id,
+                "tables": _verify(scan)
+            })
+    except Exception as e:
+        command = f"python backup_snapshots.py restore {rollback_id}"
+        if store_root != backup_store.STORE_DIR:
+            command = f"BACKUP_STORE_DIR={store_root} {command}"
+        raise BackupError(
+            f"Restore failed and may have left partial data ({e}). "
+            f"The previous data is saved as snapshot {rollback_id}; "
+            f"run `{command}` to roll back."
+        ) from e
+    
+    if cursors:
+        backup_repo.run_batches([backup_repo.restore_cursor_statements(cursors)])
+    rebuild_derived()
+    return report
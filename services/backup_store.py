@@ -0,0 +1,314 @@
+"""
+Content-addressed, deduplicated backup store on local disk.
+
+Every backed-up table is cut into fixed rowid ranges of CHUNK_IDS ids. A range's
+rows are serialized as NDJSON, named by the sha256 of that text and stored gzip
+compressed exactly once under chunks/<hh>/<hash>.ndjson.gz. A snapshot is a JSON
+manifest listing each table's chunk hashes.
+
+Ranges with no change_log entries since the previous snapshot reuse its chunk
+hashes without being read, so a snapshot costs time and space in proportion to
+what changed, not to the size of the database. Restore and diff work from any
+manifest; prune drops old manifests and garbage-collects chunks nothing references.
+"""
+import datetime
+import gzip
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from repos import backup_repo
+from services.backup_service import BackupError, restore_scanned, scan_backup
+
+STORE_DIR = os.environ.get(
+    "BACKUP_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backups", "store")
+)
+CHUNK_IDS = 1000
+MANIFEST_FORMAT = "workout-manager-store"
+MANIFEST_VERSION = 1
+
+def _chunk_path(digest, root):
+    return os.path.join(root, "chunks", digest[:2], f"{digest}.ndjson.gz")
+
+def _manifest_dir(root):
+    return os.path.join(root, "manifests")
+
+def _chunk_text(table, columns, rows):
+    lines = [json.dumps({"table": table, "columns": columns})]
+    lines.extend(json.dumps(list(r), default=str) for r in rows)
+    return "\n".join(lines) + "\n"
+
+def _write_chunk(text, digest, root):
+    """Stores a chunk unless it already exists. Returns the bytes written."""
+    path = _chunk_path(digest, root)
+    if os.path.exists(path):
+        return 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = gzip.compress(text.encode("utf-8"), mtime=0)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+def _read_chunk(digest, root):
+    """Returns (columns, rows) for a stored chunk, checking its content against the hash."""
+    path = _chunk_path(digest, root)
+    try:
+        with open(path, "rb") as f:
+            text = gzip.decompress(f.read())
+    except FileNotFoundError:
+        raise BackupError(f"Chunk {digest[:12]} is missing from the store.")
+    if hashlib.sha256(text).hexdigest() != digest:
+        raise BackupError(f"Chunk {digest[:12]} is corrupt.")
+    lines = text.decode("utf-8").splitlines()
+    return json.loads(lines[0])["columns"], [json.loads(line) for line in lines[1:]]
+
+def _chunk_entry(table, columns, index, rows, root, write, bodies, stats):
+    text = _chunk_text(table, columns, rows)
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    checksum = 0
+    for r in rows:
+        checksum = backup_repo.combine_digests(checksum, backup_repo.row_digest(r))
+    if write:
+        written = _write_chunk(text, digest, root)
+        stats['bytes_written'] += written
+        stats['new_chunks'] += 1 if written else 0
+    else:
+        bodies[digest] = (columns, rows)
+    stats['read_chunks'] += 1
+    return {"range": index, "hash": digest, "rows": len(rows), "checksum": f"{checksum:016x}"}
+
+def _scan_table(table, columns, root, write, bodies, stats):
+    """Reads a whole table in keyset pages and cuts it into range chunks."""
+    id_index = columns.index("id")
+    chunks = []
+    current, rows = None, []
+    for page in backup_repo.iter_table_pages(table, columns, CHUNK_IDS):
+        for r in page:
+            index = r[id_index] // CHUNK_IDS
+            if index != current and rows:
+                chunks.append(_chunk_entry(table, columns, current, rows, root, write, bodies, stats))
+                rows = []
+            current = index
+            rows.append(r)
+    if rows:
+        chunks.append(_chunk_entry(table, columns, current, rows, root, write, bodies, stats))
+    return chunks
+
+def _update_table(table, columns, base_chunks, changed, root, write, bodies, stats):
+    """Re-reads only the changed ranges; every other range keeps the base chunk."""
+    by_range = {c['range']: c for c in base_chunks}
+    for index in changed:
+        rows = backup_repo.get_range_rows(table, columns, index * CHUNK_IDS, (index + 1) * CHUNK_IDS)
+        if rows:
+            by_range[index] = _chunk_entry(table, columns, index, rows, root, write, bodies, stats)
+        else:
+            by_range.pop(index, None)
+    stats['reused_chunks'] += sum(1 for i in by_range if i not in changed)
+    return [by_range[i] for i in sorted(by_range)]
+
+def _build_manifest(base=None, full=False, root=STORE_DIR, write=True):
+    """
+    Builds a manifest of the current database. With a usable base manifest only the
+    ranges logged in change_log since base['change_seq'] are read. Without write, new
+    chunks are kept in memory and returned as {hash: (columns, rows)} instead of being stored.
+    """
+    database_id = backup_repo.get_database_id()
+    change_seq = backup_repo.get_change_seq()
+    changed = None
+    # The base must come from this database, and the change_log must cover everything
+    # after it (nothing pruned past it). Otherwise every table is scanned in full.
+    if (base and not full and database_id is not None and base.get('database_id') == database_id
+            and backup_repo.get_pruned_seq() <= base['change_seq'] <= change_seq):
+        changed = backup_repo.get_changed_ranges(base['change_seq'], CHUNK_IDS)
+
+    stats = {"read_chunks": 0, "new_chunks": 0, "reused_chunks": 0, "bytes_written": 0}
+    bodies = {}
+    tables = {}
+    for table in backup_repo.BACKUP_TABLES:
+        columns = backup_repo.get_columns(table)
+        base_table = base['tables'].get(table) if changed is not None else None
+        if base_table and base_table['columns'] == columns:
+            chunks = _update_table(table, columns, base_table['chunks'], changed.get(table, set()), root, write, bodies, stats)
+        else:
+            chunks = _scan_table(table, columns, root, write, bodies, stats)
+        checksum = 0
+        for c in chunks:
+            checksum = backup_repo.combine_digests(checksum, int(c['checksum'], 16))
+        tables[table] = {
+            "columns": columns,
+            "rows": sum(c['rows'] for c in chunks),
+            "checksum": f"{checksum:016x}",
+            "chunks": chunks
+        }
+
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "version": MANIFEST_VERSION,
+        "created_at": datetime.datetime.now().isoformat(),
+        "database_id": database_id,
+        "change_seq": change_seq,
+        "base": base['id'] if changed is not None else None,
+        "stats": stats,
+        "tables": tables
+    }
+    return manifest, bodies
+
+# --- Snapshots ---
+
+def list_snapshots(root=STORE_DIR):
+    """Returns every manifest in the store, oldest first."""
+    directory = _manifest_dir(root)
+    if not os.path.isdir(directory):
+        return []
+    manifests = []
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith(".json"):
+            with open(os.path.join(directory, file_name)) as f:
+                manifests.append(json.load(f))
+    return manifests
+
+def get_snapshot(snapshot_id=None, root=STORE_DIR):
+    """Returns a manifest by id (the latest when None). Raises BackupError if unknown."""
+    if snapshot_id is None:
+        snapshots = list_snapshots(root)
+        if not snapshots:
+            raise BackupError("The backup store has no snapshots.")
+        return snapshots[-1]
+    path = os.path.join(_manifest_dir(root), f"{snapshot_id}.json")
+    if not os.path.exists(path):
+        raise BackupError(f"Unknown snapshot {snapshot_id}.")
+    with open(path) as f:
+        return json.load(f)
+
+def create_snapshot(full=False, root=STORE_DIR):
+    """
+    Stores a snapshot of the backed-up tables and returns its manifest. Only ranges
+    changed since this database's previous snapshot are read and only unseen chunks are written;
+    full=True re-reads every table (chunks still dedupe).
+    """
+    # The store may hold snapshots of other databases (e.g. dev and prod); build on
+    # the latest one of this database
+    database_id = backup_repo.get_database_id()
+    base = next((s for s in reversed(list_snapshots(root)) if s.get('database_id') == database_id), None)
+    manifest, _ = _build_manifest(base, full, root, write=True)
+
+    body = json.dumps(manifest, sort_keys=True)
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    manifest['id'] = f"{stamp}_{hashlib.sha256(body.encode('utf-8')).hexdigest()[:8]}"
+
+    directory = _manifest_dir(root)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{manifest['id']}.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+def _manifest_reader(manifest, root):
+    """Record reader (see backup_service) that replays a manifest's chunks."""
+    @contextmanager
+    def read():
+        def records():
+            tables = manifest['tables']
+            yield ("header", {"format": MANIFEST_FORMAT, "kind": "FULL", "tables": list(tables)})
+            for table, entry in tables.items():
+                yield ("table", table, entry['columns'])
+                for chunk in entry['chunks']:
+                    columns, rows = _read_chunk(chunk['hash'], root)
+                    for i in range(0, len(rows), backup_repo.RESTORE_BATCH_ROWS):
+                        yield ("rows", table, columns, rows[i:i + backup_repo.RESTORE_BATCH_ROWS])
+            yield ("end", {"end": True, "counts": {t: e['rows'] for t, e in tables.items()}})
+        yield records()
+    return read
+
+def restore_snapshot(snapshot_id=None, root=STORE_DIR):
+    """
+    Replaces the backed-up tables with a snapshot (the latest when None). Every chunk is
+    read and checked against its hash and the manifest checksums before anything is written.
+    Returns the restore report from backup_service.restore_scanned.
+    """
+    manifest = get_snapshot(snapshot_id, root)
+    read = _manifest_reader(manifest, root)
+    scan = scan_backup(read, manifest['id'])
+    for table, entry in manifest['tables'].items():
+        if scan['tables'][table]['checksum'] != int(entry['checksum'], 16):
+            raise BackupError(f"Snapshot {manifest['id']}: {table} does not match its manifest checksum.")
+    scan['sha256'] = manifest['id']
+    return restore_scanned([(read, scan)], store_root=root)
+
+def _rows_by_id(chunk, root, bodies):
+    if chunk is None:
+        return {}
+    columns, rows = bodies.get(chunk['hash']) or _read_chunk(chunk['hash'], root)
+    id_index = columns.index("id")
+    return {r[id_index]: backup_repo.canonical_row(r) for r in rows}
+
+def diff_snapshots(old_id=None, new_id=None, root=STORE_DIR):
+    """
+    Compares two snapshots, or a snapshot with the live database when new_id is None.
+    Only ranges whose chunk hashes differ are opened. Returns
+    {table: {"added": [ids], "removed": [ids], "changed": [ids]}} for tables that differ.
+    """
+    old = get_snapshot(old_id, root)
+    if new_id is None:
+        new, bodies = _build_manifest(old, root=root, write=False)
+    else:
+        new, bodies = get_snapshot(new_id, root), {}
+
+    diff = {}
+    for table in backup_repo.BACKUP_TABLES:
+        old_chunks = {c['range']: c for c in old['tables'].get(table, {}).get('chunks', [])}
+        new_chunks = {c['range']: c for c in new['tables'].get(table, {}).get('chunks', [])}
+        added, removed, changed = [], [], []
+        for index in sorted(set(old_chunks) | set(new_chunks)):
+            a, b = old_chunks.get(index), new_chunks.get(index)
+            if a and b and a['hash'] == b['hash']:
+                continue
+            old_rows = _rows_by_id(a, root, bodies)
+            new_rows = _rows_by_id(b, root, bodies)
+            added.extend(i for i in new_rows if i not in old_rows)
+            removed.extend(i for i in old_rows if i not in new_rows)
+            changed.extend(i for i in new_rows if i in old_rows and new_rows[i] != old_rows[i])
+        if added or removed or changed:
+            diff[table] = {"added": added, "removed": removed, "changed": changed}
+    return diff
+
+def prune(keep=7, root=STORE_DIR):
+    """
+    Deletes all but the newest `keep` snapshots, then garbage-collects chunks that no
+    remaining manifest references. Returns (snapshots_removed, chunks_removed, bytes_freed).
+    """
+    snapshots = list_snapshots(root)
+    doomed = snapshots[:-keep] if keep > 0 else snapshots
+    for manifest in doomed:
+        os.remove(os.path.join(_manifest_dir(root), f"{manifest['id']}.json"))
+    chunks_removed, bytes_freed = collect_garbage(root)
+    return len(doomed), chunks_removed, bytes_freed
+
+def collect_garbage(root=STORE_DIR):
+    """Removes chunk files no manifest references. Returns (chunks_removed, bytes_freed)."""
+    referenced = {
+        c['hash']
+        for manifest in list_snapshots(root)
+        for entry in manifest['tables'].values()
+        for c in entry['chunks']
+    }
+    chunks_removed, bytes_freed = 0, 0
+    chunk_root = os.path.join(root, "chunks")
+    if not os.path.isdir(chunk_root):
+        return 0, 0
+    for prefix in os.listdir(chunk_root):
+        directory = os.path.join(chunk_root, prefix)
+        for file_name in os.listdir(directory):
+            if file_name.split(".")[0] in referenced:
+                continue
+            path = os.path.join(directory, file_name)
+            bytes_freed += os.path.getsize(path)
+            os.remove(path)
+            chunks_removed += 1
+        if not os.listdir(directory):
+            os.rmdir(directory)
+    return chunks_removed, bytes_freed
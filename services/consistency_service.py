@@ -1,65 +1,176 @@
-from repos import planner_repo
+from repos import planner_repo, weekly_summary_repo
 import datetime
 from core.timeutil import get_week_start
 
+def is_week_consistent(rest_days, planned_workouts, completed_workouts):
+    """
+    Consistency rule on a week's counts:
+    1. At least 1 Rest Day.
+    2. All planned workouts are completed.
+
+    A week with no workouts planned is not a "Training Week" and does not count.
+    """
+    if planned_workouts == 0:
+        return False
+    return rest_days > 0 and completed_workouts == planned_workouts
+
 def check_week_consistency(week_plans):
     """
     Determines if a week's plan (list of workouts) meets the consistency criteria:
     1. At least 1 Rest Day (plan_type='REST').
     2. All 'WORKOUT' plans are 'COMPLETED'.
-    
+
     If strict adherence is required, we might also check if planned days were actually done on that day,
     but checking status='COMPLETED' is usually sufficient for "Did I do my workouts?".
     """
-    
-    has_rest = False
-    all_workouts_done = True
+
+    rest_days = 0
     workout_count = 0
-    
+    completed_count = 0
+
     for p in week_plans:
         if p['plan_type'] == 'REST':
-            has_rest = True
+            rest_days += 1
         elif p['plan_type'] == 'WORKOUT':
             workout_count += 1
-            if p.get('status') != 'COMPLETED':
-                all_workouts_done = False
-                
-    # If no workouts planned, is it consistent? 
-    # Usually "Zero Days" weeks are not streaks.
-    # Let's assume at least 1 workout required to count as a "Training Week".
-    # Or just rest rule? 
-    # Let's say: Streak requires >0 completed workouts AND adherence to rules.
-    
-    if workout_count == 0:
-        return False 
-        
-    return has_rest and all_workouts_done
+            if p.get('status') == 'COMPLETED':
+                completed_count += 1
 
-def calculate_current_streak(today_str):
+    return is_week_consistent(rest_days, workout_count, completed_count)
+
+def _streaks_from_weeks(week_flags, last_week_start):
     """
-    Calculates consecutive consistent weeks ending at the most recently completed full week.
+    Single pass over (week_start, consistent) pairs ordered by week_start.
+    Weeks missing from the input are treated as inconsistent.
+    Returns (current, longest, weeks) where weeks covers every week up to last_week_start.
     """
-    current_date = datetime.datetime.strptime(today_str, '%Y-%m-%d')
-    
-    # Start looking from "Last Week".
-    # We find the Monday of the CURRENT week, then subtract 7 days to get Monday of PREVIOUS week.
-    current_week_monday = current_date - datetime.timedelta(days=current_date.weekday())
-    search_monday = current_week_monday - datetime.timedelta(days=7)
-    
-    streak = 0
-    
-    # We will loop backward for up to 52 weeks (1 year) cap to prevent infinite or slow loops 
-    # if database is huge (not likely an issue here).
-    for _ in range(52):
-        week_start = search_monday.strftime('%Y-%m-%d')
-        week_end = (search_monday + datetime.timedelta(days=6)).strftime('%Y-%m-%d')
-        
-        week_plans = planner_repo.get_range(week_start, week_end)
-        
-        if check_week_consistency(week_plans):
-            streak += 1
-            search_monday -= datetime.timedelta(days=7)
-        else:
+    last = datetime.datetime.strptime(last_week_start, '%Y-%m-%d').date()
+    one_week = datetime.timedelta(days=7)
+
+    weeks = []
+    run = 0
+    longest = 0
+    expected = None
+
+    for week_start, consistent in week_flags:
+        ws = datetime.datetime.strptime(week_start, '%Y-%m-%d').date()
+        if ws > last:
             break
-            
-    return streak
+
+        # Fill empty weeks between the previous row and this one
+        if expected is not None:
+            while expected < ws:
+                weeks.append({"week_start": expected.strftime('%Y-%m-%d'), "consistent": False})
+                run = 0
+                expected += one_week
+
+        weeks.append({"week_start": week_start, "consistent": consistent})
+        run = run + 1 if consistent else 0
+        longest = max(longest, run)
+        expected = ws + one_week
+
+    # Trailing empty weeks up to the last closed week break the current run
+    if expected is not None:
+        while expected <= last:
+            weeks.append({"week_start": expected.strftime('%Y-%m-%d'), "consistent": False})
+            run = 0
+            expected += one_week
+
+    return run, longest, weeks
+
+def summarize_weeks(plans, start_date, end_date):
+    """
+    Rolls plans up into per-week counts in one pass.
+    Every week between start_date and end_date gets a row, including empty ones.
+    """
+    first = datetime.datetime.strptime(get_week_start(start_date), '%Y-%m-%d').date()
+    last = datetime.datetime.strptime(get_week_start(end_date), '%Y-%m-%d').date()
+
+    weeks = {}
+    ws = first
+    while ws <= last:
+        key = ws.strftime('%Y-%m-%d')
+        weeks[key] = {
+            "week_start": key,
+            "planned_days": 0,
+            "planned_workouts": 0,
+            "completed_workouts": 0,
+            "rest_days": 0
+        }
+        ws += datetime.timedelta(days=7)
+
+    for p in plans:
+        w = weeks.get(get_week_start(p['date']))
+        if w is None:
+            continue
+        w['planned_days'] += 1
+        if p['plan_type'] == 'REST':
+            w['rest_days'] += 1
+        elif p['plan_type'] == 'WORKOUT':
+            w['planned_workouts'] += 1
+            if p.get('status') == 'COMPLETED':
+                w['completed_workouts'] += 1
+
+    for w in weeks.values():
+        w['is_consistent'] = is_week_consistent(w['rest_days'], w['planned_workouts'], w['completed_workouts'])
+
+    return list(weeks.values())
+
+def refresh_weeks(start_date, end_date):
+    """Recomputes the weekly_summary rows for the weeks spanning the date range."""
+    range_start = get_week_start(start_date)
+    range_end = (
+        datetime.datetime.strptime(get_week_start(end_date), '%Y-%m-%d') + datetime.timedelta(days=6)
+    ).strftime('%Y-%m-%d')
+
+    plans = planner_repo.get_range(range_start, range_end)
+    weeks = summarize_weeks(plans, range_start, range_end)
+    weekly_summary_repo.upsert_weeks(weeks)
+    return len(weeks)
+
+def refresh_week(date_str):
+    """Recomputes the weekly_summary row for the week containing the date. Called from write paths."""
+    refresh_weeks(date_str, date_str)
+
+def rebuild_weekly_summary():
+    """Backfills weekly_summary from the full plan history."""
+    first_date, last_date = planner_repo.get_date_bounds()
+    if not first_date:
+        return 0
+    return refresh_weeks(first_date, last_date)
+
+def get_week_summary(date_str):
+    """Returns the KPI rollup for the week containing the date."""
+    week_start = get_week_start(date_str)
+    week = weekly_summary_repo.get_week(week_start)
+    if week is None:
+        # Week was never written to; build it once.
+        refresh_week(date_str)
+        week = weekly_summary_repo.get_week(week_start)
+    return week
+
+def calculate_current_streak(today_str):
+    """
+    Calculates consecutive consistent weeks ending at the most recently completed full week
+    (weeks run Sunday to Saturday).
+
+    Closed weeks are read from weekly_summary and never recomputed here.
+
+    Returns a dict:
+    - current: the streak ending last week
+    - longest: the longest streak in all history
+    - weeks: [{week_start, consistent}] for every week from the first plan to last week
+    """
+    current_week_start = get_week_start(today_str)
+    last_week_start = (
+        datetime.datetime.strptime(current_week_start, '%Y-%m-%d') - datetime.timedelta(days=7)
+    ).strftime('%Y-%m-%d')
+
+    week_flags = weekly_summary_repo.get_consistency_flags(current_week_start)
+
+    current, longest, weeks = _streaks_from_weeks(week_flags, last_week_start)
+    return {
+        "current": current,
+        "longest": longest,
+        "weeks": weeks
+    }
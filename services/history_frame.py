@@ -0,0 +1,139 @@
+"""
+Columnar set history for analysis.
+
+The whole set history is streamed from the DB in keyset pages straight into
+preallocated typed NumPy arrays, then cached on disk as one .npy file per column
+(memory-mapped on load) under a directory keyed by the database identity, data
+version and a set count/max id fingerprint (analytics_repo.get_cache_key), so a cache
+built from another database or an earlier copy of this one is never reused. Notebooks
+and pages reopen the cache instantly until the next write changes the key.
+
+pandas is optional: get_history_frame returns a DataFrame when it is installed.
+"""
+import os
+import shutil
+import numpy as np
+from functools import lru_cache
+from repos import analytics_repo
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+PAGE_SIZE = 5000
+CACHE_DIR = os.environ.get(
+    "HISTORY_FRAME_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "history_frame")
+)
+
+# Column name -> dtype, in query order. Nullable integers are stored as float NaN,
+# nullable timestamps as NaT.
+COLUMNS = (
+    ("set_id", np.int64),
+    ("date", "datetime64[D]"),
+    ("workout_id", np.int64),
+    ("exercise_id", np.int64),
+    ("set_number", np.int32),
+    ("planned_reps", np.float32),
+    ("planned_weight", np.float64),
+    ("actual_reps", np.float32),
+    ("actual_weight", np.float64),
+    ("completed", np.bool_),
+    ("started_at", "datetime64[ms]"),
+    ("completed_at", "datetime64[ms]"),
+)
+
+_NULLABLE_NUMBERS = {"planned_reps", "planned_weight", "actual_reps", "actual_weight"}
+_TIMESTAMPS = {"started_at", "completed_at"}
+
+def _empty(n):
+    return {name: np.empty(n, dtype=dtype) for name, dtype in COLUMNS}
+
+def _fill(arrays, start, rows):
+    """Writes one page of rows into the arrays at [start, start + len(rows))."""
+    end = start + len(rows)
+    for i, (name, dtype) in enumerate(COLUMNS):
+        values = [r[i] for r in rows]
+        if name in _NULLABLE_NUMBERS:
+            values = [np.nan if v is None else v for v in values]
+        elif name in _TIMESTAMPS:
+            values = ["NaT" if v is None else v for v in values]
+        arrays[name][start:end] = np.array(values, dtype=dtype)
+    return end
+
+def build_history_columns(page_size=PAGE_SIZE):
+    """Streams set history from the DB into typed arrays, one keyset page at a time."""
+    capacity = analytics_repo.count_sets()
+    arrays = _empty(capacity)
+    filled = 0
+    last_id = 0
+    while True:
+        rows = analytics_repo.get_set_history_page(last_id, page_size)
+        if not rows:
+            break
+        # Rows written since the count was taken: grow instead of failing
+        if filled + len(rows) > capacity:
+            capacity = max(capacity * 2, filled + len(rows))
+            arrays = {name: np.resize(a, capacity) for name, a in arrays.items()}
+        filled = _fill(arrays, filled, rows)
+        last_id = rows[-1][0]
+    return {name: a[:filled] for name, a in arrays.items()}
+
+def _version_dir(key):
+    return os.path.join(CACHE_DIR, f"v{key}")
+
+def _write_cache(key, arrays):
+    """Writes the columns as .npy files and swaps the directory into place atomically."""
+    final = _version_dir(key)
+    tmp = f"{final}.tmp{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    for name, a in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), a)
+    try:
+        os.replace(tmp, final)
+    except OSError:
+        # Another process got there first
+        shutil.rmtree(tmp, ignore_errors=True)
+    
+    # Older keys are never read again
+    for entry in os.listdir(CACHE_DIR):
+        if entry.startswith("v") and entry != f"v{key}" and ".tmp" not in entry:
+            shutil.rmtree(os.path.join(CACHE_DIR, entry), ignore_errors=True)
+
+def _read_cache(key):
+    path = _version_dir(key)
+    if not os.path.isdir(path):
+        return None
+    try:
+        return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name, _ in COLUMNS}
+    except (OSError, ValueError):
+        return None
+
+@lru_cache(maxsize=2)
+def _history_columns(key):
+    arrays = _read_cache(key)
+    if arrays is not None:
+        return arrays
+    arrays = build_history_columns()
+    try:
+        _write_cache(key, arrays)
+    except OSError:
+        return arrays  # Read-only filesystem: serve from memory
+    return _read_cache(key) or arrays
+
+def get_history_columns(key=None):
+    """
+    Returns the full set history as {column: read-only array}, ordered by set id.
+    Loaded from the memory-mapped disk cache when the cache key is unchanged.
+    """
+    if key is None:
+        key = analytics_repo.get_cache_key()
+    return _history_columns(key)
+
+def get_history_frame():
+    """Returns the set history as a pandas DataFrame, or the column dict if pandas is missing."""
+    columns = get_history_columns()
+    if pd is None:
+        return columns
+    return pd.DataFrame({name: np.asarray(a) for name, a in columns.items()})
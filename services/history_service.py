@@ -0,0 +1,14 @@
+from repos import workout_summary_repo, runner_repo
+
+PAGE_SIZE = 20
+
+def get_history_page(before=None, limit=PAGE_SIZE):
+    """
+    Returns (summaries, next_before) for completed workouts, newest first.
+    Keyset-paginated on (date, workout_id), so every page costs the same.
+    """
+    return workout_summary_repo.get_page(before, limit)
+
+def get_session_sets(workout_id):
+    """Loads one session's exercises and sets, for an expanded history row."""
+    return runner_repo.get_workout_exercises_with_sets(workout_id)
@@ -0,0 +1,310 @@
+import codecs
+import csv
+import datetime
+from repos import import_repo
+from repos.backup_repo import open_source, file_sha256
+
+class ImporterError(Exception):
+    pass
+
+# Sets per atomic batch. Each batch also advances the file's checkpoint.
+BATCH_SETS = 2000
+
+# Header aliases (lowercase) for the fields the importer reads. Covers the Strong,
+# Hevy and FitNotes exports as well as plain date/workout/exercise/weight/reps files.
+FIELD_ALIASES = {
+    "date": ["date", "start_time", "workout date", "day"],
+    "end": ["end_time"],
+    "workout": ["workout name", "workout", "title", "workout_name", "routine"],
+    "exercise": ["exercise name", "exercise", "exercise_title", "exercise_name"],
+    "weight": ["weight", "weight (lbs)", "weight (kgs)", "weight (lb)", "weight (kg)", "weight_lbs", "weight_kg"],
+    "reps": ["reps", "repetitions"]
+}
+REQUIRED_FIELDS = ("date", "exercise", "reps")
+
+DATE_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d",
+    "%d %b %Y, %H:%M",
+    "%d %b %Y",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y"
+)
+
+def detect_columns(header):
+    """Maps each known field to its column index. Raises ImporterError if a required field is missing."""
+    normalized = [h.strip().lower() for h in header]
+    columns = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized.index(alias)
+                break
+    missing = [f for f in REQUIRED_FIELDS if f not in columns]
+    if missing:
+        raise ImporterError(f"Unrecognized CSV layout: no column for {', '.join(missing)}.")
+    return columns
+
+def parse_datetime(value, formats=DATE_FORMATS):
+    """
+    Parses a date/datetime string with the first matching format, or returns None.
+    A list passed as formats is reordered so the matching format is tried first next time;
+    callers that want this pass their own copy, e.g. list(DATE_FORMATS).
+    """
+    value = (value or "").strip()
+    for i, fmt in enumerate(formats):
+        try:
+            parsed = datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if i and isinstance(formats, list):
+            formats.insert(0, formats.pop(i))
+        return parsed
+    return None
+
+def _number(value):
+    value = (value or "").strip().replace(",", ".")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def _text_lines(raw):
+    """Decodes a binary file line by line (UTF-8, BOM stripped)."""
+    return codecs.getreader("utf-8-sig")(raw, errors="replace")
+
+def iter_csv_rows(raw):
+    """Yields the header, then each data row, sniffing the delimiter from the first lines."""
+    lines = _text_lines(raw)
+    sample = lines.readline()
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.reader(_chain([sample], lines), dialect)
+
+def _chain(first, rest):
+    yield from first
+    yield from rest
+
+def _new_session(date_str, started):
+    return {
+        "date": date_str,
+        "names": [],
+        "started_at": started,
+        "completed_at": None,
+        "exercises": {}
+    }
+
+def _add_set(session, exercise_name, reps, weight):
+    key = exercise_name.casefold()
+    exercise = session['exercises'].setdefault(key, {"name": exercise_name, "sets": []})
+    exercise['sets'].append((reps, weight))
+
+class _Writer:
+    """
+    Turns finished sessions into id-assigned rows and writes them in checkpointed chunks.
+    Sessions already written keep their ids, so rows for their date that turn up later
+    in the file are appended to them.
+    """
+
+    def __init__(self, checkpoint, exercise_ids, batch_sets):
+        self.checkpoint = checkpoint
+        self.exercise_ids = exercise_ids
+        self.batch_sets = batch_sets
+        self.next_ids = {t: i + 1 for t, i in import_repo.get_max_ids().items()}
+        if checkpoint['first_workout_id'] is None:
+            checkpoint['first_workout_id'] = self.next_ids['workouts']
+        self.written = self._load_written(checkpoint['first_workout_id'])
+        self.pending = {}
+        self.pending_sets = 0
+
+    def _load_written(self, first_workout_id):
+        """Rebuilds the written-session map from the database when an import resumes."""
+        names = {id: key for key, id in self.exercise_ids.items()}
+        written = {}
+        for workout_id, date_str, name, we_id, exercise_id, order_index, last_set in \
+                import_repo.get_imported_sessions(first_workout_id):
+            entry = written.setdefault(date_str, {
+                "workout_id": workout_id,
+                "names": name.split(" + ") if name else [],
+                "exercises": {},
+                "last_order": 0
+            })
+            entry['exercises'][names.get(exercise_id)] = [we_id, last_set or 0]
+            entry['last_order'] = max(entry['last_order'], order_index)
+        return written
+
+    def _take_id(self, table):
+        value = self.next_ids[table]
+        self.next_ids[table] += 1
+        return value
+
+    def is_written(self, date_str):
+        return date_str in self.written
+
+    def add(self, session):
+        self.pending[session['date']] = session
+        self.pending_sets += sum(len(e['sets']) for e in session['exercises'].values())
+
+    def take_pending(self, date_str):
+        """Returns a not-yet-written session for the date, removing it from the queue."""
+        session = self.pending.pop(date_str, None)
+        if session:
+            self.pending_sets -= sum(len(e['sets']) for e in session['exercises'].values())
+        return session
+
+    def full(self):
+        return self.pending_sets >= self.batch_sets
+
+    def flush(self, rows_done, status="RUNNING"):
+        exercises, workouts, workout_exercises, sets, updates = [], [], [], [], []
+        for session in self.pending.values():
+            written = self.written.get(session['date'])
+            if written is None:
+                written = {"workout_id": self._take_id("workouts"), "names": [], "exercises": {}, "last_order": 0}
+                self.written[session['date']] = written
+                new_names = session['names']
+                workouts.append((
+                    written['workout_id'], session['date'], " + ".join(new_names) or "Imported Workout",
+                    "COMPLETED", "WORKOUT", session['started_at'], session['completed_at']
+                ))
+            else:
+                new_names = [n for n in session['names'] if n not in written['names']]
+                if new_names or session['completed_at']:
+                    updates.append((
+                        written['workout_id'], " + ".join(written['names'] + new_names) or "Imported Workout",
+                        session['completed_at']
+                    ))
+            written['names'] = written['names'] + new_names
+
+            for key, exercise in session['exercises'].items():
+                if key not in written['exercises']:
+                    exercise_id = self.exercise_ids.get(key)
+                    if exercise_id is None:
+                        exercise_id = self._take_id("exercises")
+                        self.exercise_ids[key] = exercise_id
+                        exercises.append((exercise_id, exercise['name']))
+                    we_id = self._take_id("workout_exercises")
+                    written['last_order'] += 1
+                    workout_exercises.append((we_id, written['workout_id'], exercise_id, written['last_order']))
+                    written['exercises'][key] = [we_id, 0]
+                entry = written['exercises'][key]
+                for reps, weight in exercise['sets']:
+                    entry[1] += 1
+                    sets.append((self._take_id("sets"), entry[0], entry[1], reps, weight, reps, weight, 1))
+
+        checkpoint = self.checkpoint
+        checkpoint['rows_done'] = rows_done
+        checkpoint['sessions'] += len(workouts)
+        checkpoint['sets'] += len(sets)
+        checkpoint['exercises'] += len(exercises)
+        checkpoint['status'] = status
+        import_repo.write_chunk(exercises, workouts, workout_exercises, sets, checkpoint, updates)
+        self.pending = {}
+        self.pending_sets = 0
+
+def import_csv(source, name=None, weight_factor=1.0, batch_sets=BATCH_SETS):
+    """
+    Streams a tracker CSV export (date, workout name, exercise, weight, reps) into
+    completed workouts. One workout per date: rows sharing a date are merged in file
+    order, wherever they appear in the file. Dates that already had an ACTIVE or
+    COMPLETED session are skipped (counted once each in "skipped_sessions"); a PLANNED
+    day is replaced by its imported session in the same batch. Exercises are matched by
+    name (case-insensitive) and created as needed.
+
+    Sessions are written in atomic batches of about batch_sets sets, each carrying the
+    file's checkpoint, so re-running an interrupted import resumes after the last batch.
+    Derived tables are rebuilt at the end. Returns the checkpoint dict with
+    "skipped_rows" and "resumed_from" added. Raises ImporterError.
+    """
+    name = name or getattr(source, "name", str(source))
+    with open_source(source) as raw:
+        sha256 = file_sha256(raw)
+    checkpoint = import_repo.get_checkpoint(sha256)
+    if checkpoint and checkpoint['status'] == "DONE":
+        raise ImporterError(f"{name} was already imported ({checkpoint['sessions']} sessions).")
+    checkpoint = checkpoint or {
+        "source_sha256": sha256, "file_name": name, "rows_done": 0, "sessions": 0,
+        "sets": 0, "exercises": 0, "skipped_sessions": 0, "status": "RUNNING",
+        "first_workout_id": None
+    }
+    resumed_from = checkpoint['rows_done']
+
+    writer = _Writer(checkpoint, import_repo.get_exercise_ids(), batch_sets)
+    # Dates with a started or finished session that this import did not write
+    existing_dates = {d for d in import_repo.get_workout_dates() if not writer.is_written(d)}
+    skipped_dates = set()
+    date_formats = list(DATE_FORMATS)
+    skipped_rows = 0
+    current_date = None
+    session = None
+    row_number = resumed_from
+
+    with open_source(source) as raw:
+        rows = iter_csv_rows(raw)
+        columns = detect_columns(next(rows, None) or [])
+
+        for row_number, row in enumerate(rows, start=1):
+            if row_number <= resumed_from or not any(cell.strip() for cell in row):
+                continue
+
+            def cell(field):
+                index = columns.get(field)
+                return row[index].strip() if index is not None and index < len(row) else ""
+
+            started = parse_datetime(cell("date"), date_formats)
+            reps = _number(cell("reps"))
+            exercise_name = cell("exercise")
+            if started is None or reps is None or reps < 1 or not exercise_name:
+                # Cardio, timed and rest-timer rows have no reps
+                skipped_rows += 1
+                continue
+
+            date_str = started.strftime('%Y-%m-%d')
+            if date_str != current_date:
+                current_date = date_str
+                if session is not None:
+                    writer.add(session)
+                    if writer.full():
+                        writer.flush(row_number - 1)
+                # Rows for a date seen earlier in the file merge into its queued session,
+                # or are appended to it once written; dates that had a session before the
+                # import are left untouched.
+                session = writer.take_pending(date_str)
+                if session is None:
+                    if date_str in existing_dates:
+                        if date_str not in skipped_dates:
+                            skipped_dates.add(date_str)
+                            checkpoint['skipped_sessions'] += 1
+                    else:
+                        session = _new_session(date_str, started.isoformat())
+            if session is None:
+                continue
+
+            workout_name = cell("workout")
+            if workout_name and workout_name not in session['names']:
+                session['names'].append(workout_name)
+            ended = parse_datetime(cell("end"), date_formats) if "end" in columns else None
+            if ended:
+                session['completed_at'] = ended.isoformat()
+            weight = _number(cell("weight"))
+            if weight is not None:
+                weight = round(weight * weight_factor, 2)
+            _add_set(session, exercise_name, int(reps), weight)
+
+        if session is not None:
+            writer.add(session)
+        writer.flush(row_number, status="DONE")
+
+    from services.backup_service import rebuild_derived
+    rebuild_derived()
+
+    result = dict(checkpoint)
+    result['skipped_rows'] = skipped_rows
+    result['resumed_from'] = resumed_from
+    return result
@@ -0,0 +1,139 @@
+import numpy as np
+from repos import load_repo
+
+MEASURES = ("tonnage", "reps")
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+
+# Per-day cache: {"day": 'YYYY-MM-DD', "model": {...}}
+_cache = {"day": None, "model": None}
+
+def rolling_sum(matrix, window):
+    """Trailing window sums along axis 1 from a prefix sum (partial windows at the start)."""
+    n = matrix.shape[1]
+    prefix = np.zeros((matrix.shape[0], n + 1))
+    np.cumsum(matrix, axis=1, out=prefix[:, 1:])
+    idx = np.arange(n)
+    return prefix[:, idx + 1] - prefix[:, np.maximum(idx - window + 1, 0)]
+
+def ewma(matrix, span):
+    """
+    Exponentially weighted load (lambda = 2 / (span + 1)) as a causal convolution
+    with a truncated exponential kernel, done for all rows at once via FFT.
+    """
+    n = matrix.shape[1]
+    lam = 2.0 / (span + 1)
+    length = int(min(n, np.ceil(np.log(1e-6) / np.log(1.0 - lam))))
+    kernel = lam * (1.0 - lam) ** np.arange(length)
+
+    size = 1 << int(np.ceil(np.log2(n + length - 1)))
+    out = np.fft.irfft(np.fft.rfft(matrix, size, axis=1) * np.fft.rfft(kernel, size), size, axis=1)
+    return np.maximum(out[:, :n], 0.0)
+
+def _ratio(acute, chronic):
+    return np.divide(acute, chronic, out=np.full(acute.shape, np.nan), where=chronic > 0)
+
+def _derive(daily):
+    """All rolling metrics for a (rows, days) daily load matrix."""
+    acute = rolling_sum(daily, ACUTE_DAYS)
+    chronic = rolling_sum(daily, CHRONIC_DAYS)
+    ewma_acute = ewma(daily, ACUTE_DAYS)
+    ewma_chronic = ewma(daily, CHRONIC_DAYS)
+    return {
+        "daily": daily,
+        "acute_7": acute,
+        "chronic_28": chronic,
+        # Coupled ACWR on average daily load
+        "acwr": _ratio(acute / ACUTE_DAYS, chronic / CHRONIC_DAYS),
+        "ewma_acute": ewma_acute,
+        "ewma_chronic": ewma_chronic,
+        "ewma_acwr": _ratio(ewma_acute, ewma_chronic),
+    }
+
+def _build_model(rows, today_str):
+    """
+    Turns daily_load rows into dense (exercise + total, day) matrices and derives
+    the rolling metrics. The last row of every matrix is the total across exercises.
+    """
+    if not rows:
+        return None
+    dates, exercise_ids, tonnage, reps = zip(*rows)
+    dates = np.array(dates, dtype="datetime64[D]")
+    exercise_ids = np.array(exercise_ids, dtype=np.int64)
+
+    start = dates.min()
+    end = max(dates.max(), np.datetime64(today_str, "D"))
+    n_days = int((end - start).astype(np.int64)) + 1
+
+    ex_ids, ex_idx = np.unique(exercise_ids, return_inverse=True)
+    day_idx = (dates - start).astype(np.int64)
+
+    model = {
+        "start": start,
+        "dates": start + np.arange(n_days),
+        "exercise_ids": ex_ids,
+    }
+    for measure, values in (("tonnage", tonnage), ("reps", reps)):
+        daily = np.zeros((len(ex_ids) + 1, n_days))
+        np.add.at(daily, (ex_idx, day_idx), np.array(values, dtype=np.float64))
+        daily[-1] = daily[:-1].sum(axis=0)
+        model[measure] = _derive(daily)
+    return model
+
+def get_load_model(today_str):
+    """
+    Returns the training-load model through today. Built once per day from daily_load;
+    completed, edited and deleted sessions are patched in by record_session.
+    """
+    if _cache["day"] != today_str or _cache["model"] is None:
+        _cache["model"] = _build_model(load_repo.get_daily_load(), today_str)
+        _cache["day"] = today_str
+    return _cache["model"]
+
+def record_session(date_str):
+    """
+    Patches the cached model with a date's re-rolled daily_load rows instead of
+    rebuilding it. Called whenever a write re-rolls a date: completing a session,
+    editing one of its sets, or deleting it.
+    """
+    model = _cache["model"]
+    if model is None:
+        return
+
+    rows = load_repo.get_daily_load(date_str)
+    day = int((np.datetime64(date_str, "D") - model["start"]).astype(np.int64))
+    known = set(model["exercise_ids"].tolist())
+    if day < 0 or day >= len(model["dates"]) or any(r[1] not in known for r in rows):
+        # Outside the cached window or a new exercise: rebuild on next read
+        _cache["model"] = None
+        return
+
+    ex_pos = {int(e): i for i, e in enumerate(model["exercise_ids"])}
+    for measure, col in (("tonnage", 2), ("reps", 3)):
+        daily = model[measure]["daily"]
+        daily[:, day] = 0.0
+        for r in rows:
+            daily[ex_pos[r[1]], day] = r[col]
+        daily[-1, day] = daily[:-1, day].sum()
+        model[measure] = _derive(daily)
+
+def get_total_load(today_str, measure="tonnage"):
+    """Returns (dates, metrics) for the total load across all exercises."""
+    if measure not in MEASURES:
+        raise ValueError(f"Unknown load measure: {measure}")
+    model = get_load_model(today_str)
+    if model is None:
+        return None, None
+    return model["dates"], {k: v[-1] for k, v in model[measure].items()}
+
+def get_exercise_load(today_str, exercise_id, measure="tonnage"):
+    """Returns (dates, metrics) for one exercise, or (None, None) if it has no history."""
+    if measure not in MEASURES:
+        raise ValueError(f"Unknown load measure: {measure}")
+    model = get_load_model(today_str)
+    if model is None:
+        return None, None
+    pos = np.nonzero(model["exercise_ids"] == exercise_id)[0]
+    if len(pos) == 0:
+        return None, None
+    return model["dates"], {k: v[pos[0]] for k, v in model[measure].items()}
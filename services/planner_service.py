@@ -1,6 +1,7 @@
-from repos import planner_repo
-from services import templates_service
-from core.timeutil import get_week_start, get_week_end
+from repos import planner_repo, load_repo, records_repo
+from services import templates_service, consistency_service, load_service
+from core.timeutil import get_week_start, get_week_end, today_str_et
+import datetime
 
 class PlannerError(Exception):
     pass
@@ -18,6 +19,7 @@ def assign_workout(date_str, template_id):
         raise PlannerError("Template not found.")
     
     planner_repo.upsert_day_plan(date_str, 'WORKOUT', template_id, template['name'])
+    consistency_service.refresh_week(date_str)
 
 def assign_rest(date_str):
     """Assigns a rest day to a date."""
@@ -27,6 +29,7 @@ def assign_rest(date_str):
         raise PlannerError("Cannot change plan: An active session exists for this date.")
     
     planner_repo.upsert_day_plan(date_str, 'REST', None, "Rest Day")
+    consistency_service.refresh_week(date_str)
 
 def assign_off(date_str):
     """Removes any plan from a date."""
@@ -35,7 +38,15 @@ def assign_off(date_str):
     if plan and plan['status'] == 'ACTIVE':
         raise PlannerError("Cannot change plan: An active session exists for this date.")
     
-    planner_repo.delete_day_plan(date_str)
+    # A completed session's records and daily load go with it
+    planner_repo.delete_day_plan(
+        date_str,
+        before_statements=records_repo.day_deleted_statements(date_str),
+        after_statements=load_repo.date_load_statements(date_str)
+    )
+    consistency_service.refresh_week(date_str)
+    if plan and plan['status'] == 'COMPLETED':
+        load_service.record_session(date_str)
 
 
 def get_day_plan(date_str):
@@ -46,3 +57,134 @@ def get_week_schedule(date_str):
     start = get_week_start(date_str)
     end = get_week_end(date_str)
     return planner_repo.get_range(start, end)
+
+
+# --- Schedule Rules ---
+
+def _parse_date(date_str):
+    try:
+        return datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise PlannerError(f"Invalid date: {date_str}")
+
+def _rule(template_id, start, end_date, period_days):
+    if template_id is None:
+        return {"plan_type": "REST", "template_id": None, "start_date": start.strftime('%Y-%m-%d'),
+                "end_date": end_date, "period_days": period_days}
+    if not templates_service.get_template(template_id):
+        raise PlannerError("Template not found.")
+    return {"plan_type": "WORKOUT", "template_id": template_id, "start_date": start.strftime('%Y-%m-%d'),
+            "end_date": end_date, "period_days": period_days}
+
+def _refresh_rule_weeks(start_date, end_date):
+    """Rules change every week they cover; refresh those up to the current one."""
+    last = end_date or max(start_date, today_str_et())
+    consistency_service.refresh_weeks(start_date, last)
+
+def add_weekly_rule(weekday, template_id, start_date, end_date=None):
+    """
+    Repeats a template (None for rest) every week on weekday (0=Monday ... 6=Sunday)
+    from start_date to end_date (None: no end). Returns the rule id.
+    """
+    start = _parse_date(start_date)
+    if end_date is not None and _parse_date(end_date) < start:
+        raise PlannerError("End date is before start date.")
+    if weekday not in range(7):
+        raise PlannerError("Weekday must be 0 (Monday) to 6 (Sunday).")
+    first = start + datetime.timedelta(days=(weekday - start.weekday()) % 7)
+    rule_id = planner_repo.add_rules([_rule(template_id, first, end_date, 7)])[0]
+    _refresh_rule_weeks(start_date, end_date)
+    return rule_id
+
+def add_cycle_rules(pattern, start_date, end_date=None):
+    """
+    Repeats an N-day cycle from start_date: pattern lists one template id (None for rest)
+    per day, e.g. [push, pull, legs, None]. Returns the rule ids.
+    """
+    start = _parse_date(start_date)
+    if end_date is not None and _parse_date(end_date) < start:
+        raise PlannerError("End date is before start date.")
+    if not pattern:
+        raise PlannerError("A cycle needs at least one day.")
+    rules = [
+        _rule(template_id, start + datetime.timedelta(days=i), end_date, len(pattern))
+        for i, template_id in enumerate(pattern)
+    ]
+    rule_ids = planner_repo.add_rules(rules)
+    _refresh_rule_weeks(start_date, end_date)
+    return rule_ids
+
+def get_rules():
+    return planner_repo.get_rules()
+
+def delete_rule(rule_id):
+    """Deletes a schedule rule. Days it already materialized keep their rows."""
+    rule = next((r for r in planner_repo.get_rules() if r['id'] == rule_id), None)
+    if rule is None:
+        raise PlannerError("Rule not found.")
+    planner_repo.delete_rule(rule_id)
+    _refresh_rule_weeks(rule['start_date'], rule['end_date'])
+
+
+# --- Range Operations ---
+# Each is one set-based batch whatever the range length, followed by one weekly
+# summary refresh. ACTIVE and COMPLETED sessions always stay where they are.
+
+def _date_range(start_date, end_date):
+    start, end = _parse_date(start_date), _parse_date(end_date)
+    if end < start:
+        raise PlannerError("End date is before start date.")
+    return start, end
+
+def _fmt(d):
+    return d.strftime('%Y-%m-%d')
+
+def shift_range(start_date, end_date, days):
+    """
+    Moves every planned day in [start_date, end_date] by days (negative moves earlier).
+    Planned days already at a destination are replaced. Returns the number of days moved.
+    """
+    start, end = _date_range(start_date, end_date)
+    if not days:
+        return 0
+    conflicts = planner_repo.get_shift_conflicts(start_date, end_date, days)
+    if conflicts:
+        raise PlannerError(f"Cannot shift onto started or completed sessions: {', '.join(conflicts)}.")
+    moved = planner_repo.shift_range(start_date, end_date, days)
+    offset = datetime.timedelta(days=days)
+    consistency_service.refresh_weeks(_fmt(min(start, start + offset)), _fmt(max(end, end + offset)))
+    return moved
+
+def swap_days(first_date, second_date):
+    """Exchanges the plans of two dates."""
+    first, second = _parse_date(first_date), _parse_date(second_date)
+    if first == second:
+        return
+    for date_str in (first_date, second_date):
+        plan = planner_repo.get_day_plan(date_str)
+        if plan and plan['status'] in ('ACTIVE', 'COMPLETED'):
+            raise PlannerError(f"Cannot move a started or completed session ({date_str}).")
+    planner_repo.swap_days(first_date, second_date)
+    consistency_service.refresh_week(first_date)
+    consistency_service.refresh_week(second_date)
+
+def copy_week(source_start, target_start):
+    """
+    Copies the 7 days starting at source_start onto the 7 days starting at target_start.
+    The target week ends up with the source's plans, except on days holding a started
+    or completed session. Returns the number of days written.
+    """
+    source, target = _parse_date(source_start), _parse_date(target_start)
+    if abs((target - source).days) < 7:
+        raise PlannerError("The weeks overlap.")
+    week = datetime.timedelta(days=6)
+    written = planner_repo.copy_days(source_start, _fmt(source + week), target_start, _fmt(target + week))
+    consistency_service.refresh_weeks(target_start, _fmt(target + week))
+    return written
+
+def clear_range(start_date, end_date):
+    """Clears every planned day in [start_date, end_date]. Returns the number of rows deleted."""
+    _date_range(start_date, end_date)
+    cleared = planner_repo.clear_range(start_date, end_date)
+    consistency_service.refresh_weeks(start_date, end_date)
+    return cleared
@@ -0,0 +1,106 @@
+import numpy as np
+from functools import lru_cache
+from repos import analytics_repo
+from services.analytics_service import estimate_1rm
+
+POINT_BUDGET = 300
+METHODS = ("lttb", "minmax")
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Keeps the first and last points and,
+    per bucket, the point forming the largest triangle with the previous pick and the
+    next bucket's average. Returns selected indices.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_start = min(end, n - 1)
+        avg_x = x[next_start:max(next_end, next_start + 1)].mean()
+        avg_y = y[next_start:max(next_end, next_start + 1)].mean()
+        
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    
+    return np.unique(selected)
+
+def minmax_buckets(x, y, threshold):
+    """
+    Keeps the first and last points plus the min and max of each of (threshold - 2) / 2
+    equal-count buckets, so at most threshold points. Returns indices.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+    
+    buckets = (threshold - 2) // 2
+    if buckets < 1:
+        return np.array([0, n - 1])
+    bucket = (np.arange(n) * buckets // n).astype(np.int64)
+    order = np.lexsort((y, bucket))
+    sorted_bucket = bucket[order]
+    firsts = np.r_[0, np.nonzero(np.diff(sorted_bucket))[0] + 1]
+    lasts = np.r_[firsts[1:] - 1, n - 1]
+    return np.unique(np.r_[order[firsts], order[lasts], 0, n - 1])
+
+def _per_session(dates, reps, weights, formula):
+    """Collapses per-set rows to one point per date: top weight, max reps and best e1RM."""
+    days = np.array(dates, dtype="datetime64[D]")
+    reps = np.array(reps, dtype=np.float64)
+    weights = np.array([w if w is not None else 0.0 for w in weights], dtype=np.float64)
+    e1rm = estimate_1rm(weights, reps, formula)
+    
+    uniq, inv = np.unique(days, return_inverse=True)
+    n = len(uniq)
+    series = {}
+    for name, values in (("weight", weights), ("reps", reps), ("e1rm", e1rm)):
+        top = np.full(n, -np.inf)
+        np.maximum.at(top, inv, values)
+        series[name] = top
+    return uniq, series
+
+@lru_cache(maxsize=32)
+def _progress_series(exercise_id, start_date, end_date, points, method, formula, version):
+    dates, reps, weights = analytics_repo.get_exercise_sets(exercise_id, start_date, end_date)
+    if not dates:
+        return None
+    
+    days, series = _per_session(dates, reps, weights, formula)
+    x = days.astype(np.int64).astype(np.float64)
+    downsample = lttb if method == "lttb" else minmax_buckets
+    
+    result = {"total_points": len(days)}
+    for name, y in series.items():
+        idx = downsample(x, y, points)
+        result[name] = {"date": days[idx], "value": y[idx]}
+    return result
+
+def get_progress_series(exercise_id, start_date, end_date, points=POINT_BUDGET, method="lttb", formula="epley"):
+    """
+    Returns per-session weight, reps and e1RM series for an exercise in [start_date, end_date],
+    each downsampled server-side to at most `points` points.
+    Cached by exercise, window and data version; zooming requeries only the window.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return _progress_series(
+        exercise_id, start_date, end_date, points, method, formula,
+        analytics_repo.get_data_version()
+    )
+
+def get_date_bounds(exercise_id):
+    return analytics_repo.get_exercise_date_bounds(exercise_id)
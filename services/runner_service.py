@@ -1,71 +1,112 @@
-from repos import runner_repo, templates_repo
+from abc import ABC, abstractmethod
+from repos import runner_repo, templates_repo, load_repo, records_repo, workout_summary_repo
+from services import consistency_service, load_service, timing_service
+from core.types import SyncPolicy, ProgressionType
 
 class RunnerError(Exception):
     pass
 
 def start_workout(date_str, template_id):
-    """Starts a new workout session (snapshot)."""
-    return runner_repo.start_workout_session(date_str, template_id)
+    """Starts a new workout session on the template's current version."""
+    workout_id = runner_repo.start_workout_session(date_str, template_id)
+    consistency_service.refresh_week(date_str)
+    return workout_id
 
-def start_set(workout_id, exercise_order, set_number):
-    """Starts the timer for a specific set."""
+def _performed_set(workout_id, exercise_order, set_number):
+    """Looks up a session set, writing its row first if it has only been planned so far."""
     target_set = runner_repo.get_workout_set(workout_id, exercise_order, set_number)
     if not target_set:
         raise RunnerError(f"Set not found: W:{workout_id} E:{exercise_order} S:{set_number}")
-    
+    if target_set['id'] is None:
+        target_set['id'] = runner_repo.materialize_set(workout_id, exercise_order, set_number)
+    return target_set
+
+def start_set(workout_id, exercise_order, set_number):
+    """Starts the timer for a specific set."""
+    target_set = _performed_set(workout_id, exercise_order, set_number)
     runner_repo.start_set_timer(target_set['id'])
     return True
 
 def complete_set(workout_id, exercise_order, set_number, actual_reps, actual_weight):
     """Marks a set as complete. Idempotent."""
-    target_set = runner_repo.get_workout_set(workout_id, exercise_order, set_number)
-    if not target_set:
-        raise RunnerError(f"Set not found: W:{workout_id} E:{exercise_order} S:{set_number}")
-    runner_repo.update_set_actuals(target_set['id'], actual_reps, actual_weight)
+    target_set = _performed_set(workout_id, exercise_order, set_number)
+    # Personal records are updated in the same batch. A re-completed set is an edit,
+    # which may lower a record it held.
+    if target_set['completed']:
+        record_stmts = records_repo.set_edited_statements(target_set['id'])
+    else:
+        record_stmts = records_repo.set_completed_statements(target_set['id'])
+    runner_repo.update_set_actuals(target_set['id'], actual_reps, actual_weight, record_stmts)
     
     # Sync to Template (Ticket 17)
-    # 1. Need template_id. Get it from session.
-    # Optimization: We could pass it in or fetch it. Fetching is safer.
-    # We don't have a direct "get_workout(id)" in runner_repo tailored for this, 
-    # but we can look up via SQL or assume we can get it from somewhere.
-    # Let's add a quick helper or just queries.
-    # Or rely on `get_active_session` if we know date? No, workout_id is specific.
-    # Let's assume we can fetch workout row.
-    from db.conn import query_one
-    w_row = query_one("SELECT template_id FROM workouts WHERE id = ?", (workout_id,))
-    if w_row and w_row[0]:
-        template_id = w_row[0]
+    # Only templates on the ALWAYS policy sync per set; SESSION_END templates
+    # are diffed and written once in complete_session.
+    template_id, sync_policy = runner_repo.get_session_template(workout_id)
+    if template_id and sync_policy == SyncPolicy.ALWAYS:
         templates_repo.update_template_set_match(template_id, exercise_order, set_number, actual_reps, actual_weight)
     
     # Check progressive overload advancement
     try:
-        check_and_advance_overload(workout_id, exercise_order, set_number, actual_reps)
+        check_and_advance_overload(workout_id, exercise_order, set_number, actual_reps, actual_weight)
     except Exception:
         pass  # Overload tracking should never block set completion
     
     return True
 
 def update_completed_set(set_id, actual_reps, actual_weight):
-    """Updates an already completed set."""
-    runner_repo.update_set_actuals(set_id, actual_reps, actual_weight)
-    
+    """
+    Updates an already completed set. A finished session's summary and daily load
+    are refreshed in the same batch.
+    """
     # Sync to Template (Ticket 17)
     # We have set_id. Need to traverse back to workout -> template
     from db.conn import query_one
     row = query_one("""
-        SELECT w.template_id, we.order_index, s.set_number
+        SELECT w.template_id, we.order_index, s.set_number, t.sync_policy, w.id, w.date
         FROM sets s
         JOIN workout_exercises we ON s.workout_exercise_id = we.id
         JOIN workouts w ON we.workout_id = w.id
+        LEFT JOIN templates t ON t.id = w.template_id
         WHERE s.id = ?
     """, (set_id,))
     
-    if row and row[0]: # ensure template_id exists (not None)
+    stmts = records_repo.set_edited_statements(set_id)
+    stmts.extend(workout_summary_repo.set_edited_statements(set_id))
+    if row:
+        stmts.extend(load_repo.daily_load_statements(row[4]))
+    runner_repo.update_set_actuals(set_id, actual_reps, actual_weight, stmts)
+    
+    if row and row[0] and row[3] == SyncPolicy.ALWAYS: # ensure template_id exists (not None)
         templates_repo.update_template_set_match(row[0], row[1], row[2], actual_reps, actual_weight)
+    if row:
+        load_service.record_session(row[5])
 
 def complete_session(workout_id):
-    """Finishes the session."""
-    runner_repo.complete_workout_session(workout_id)
+    """
+    Finishes the session.
+    For SESSION_END templates, the final actuals are diffed against the template
+    and only the changed sets are written, in the same batch as the status change.
+    The session's daily training load, set/rest timing and summary row are
+    materialized in that batch too.
+    """
+    stmts = templates_repo.get_session_sync_statements(workout_id)
+    stmts.extend(load_repo.daily_load_statements(workout_id))
+    stmts.extend(timing_service.session_timing_statements(workout_id))
+    stmts.extend(workout_summary_repo.summary_statements(workout_id))
+    runner_repo.complete_workout_session(workout_id, stmts)
+    
+    workout = runner_repo.get_workout(workout_id)
+    if workout:
+        consistency_service.refresh_week(workout['date'])
+        load_service.record_session(workout['date'])
+
+def get_session_summary(workout_id):
+    """Returns the materialized summary of a completed session, or None."""
+    return workout_summary_repo.get_summary(workout_id)
+
+def get_set_records(set_id):
+    """Returns the personal records held by a set, for the "new PR" flag."""
+    return records_repo.get_records_for_set(set_id)
 
 def get_workout_progression(workout_id):
     """
@@ -97,11 +138,11 @@ def get_workout_progression(workout_id):
                     is_completed = False # There are more incomplete sets
             
             # If we found the active exercise, collect its history (sets before the current one)
-            if active_exercise and ex['id'] == active_exercise['id']:
+            if ex is active_exercise:
                 if s['completed']:
                     active_exercise_history.append(s)
         
-        if not ex_completed and active_exercise and ex['id'] == active_exercise['id']:
+        if not ex_completed and ex is active_exercise:
             # We found our active exercise and set, break exercise loop? 
             # We need to continue checking is_completed for the rest? 
             # If we found an incomplete set, "is_completed" is definitely False.
@@ -139,7 +180,7 @@ def get_workout_progression(workout_id):
                     all_sets.append(s)
             
             for i, s in enumerate(all_sets):
-                if s['id'] == current_set['id']:
+                if s is current_set:
                     if i > 0:
                         last_completed = all_sets[i-1]
                     break
@@ -166,110 +207,248 @@ def get_workout_progression(workout_id):
 
 # --- Progressive Overload ---
 
-def get_progressive_overload_targets(workout_id):
+WEIGHT_INCREMENT = 2.5
+
+def _round_weight(weight):
+    return round(weight / WEIGHT_INCREMENT) * WEIGHT_INCREMENT
+
+def _weight_for_reps(one_rm, reps):
+    """Inverse Epley: the weight that projects to one_rm at the given reps."""
+    if reps <= 1:
+        return one_rm
+    return one_rm / (1.0 + reps / 30.0)
+
+def _done(sets):
+    """Maps set_number -> set for the completed sets that have reps logged."""
+    return {s['set_number']: s for s in sets if s['completed'] and s['actual_reps'] is not None}
+
+class ProgressionPolicy(ABC):
     """
-    Returns a dict mapping (exercise_id, set_number) -> {suggested_reps, last_reps}
-    for progressive overload display.
+    Computes every set target for one exercise in a session from preloaded context:
+    - last_sets:    the exercise's sets from the previous completed session of the template
+    - planned_sets: this session's sets (planned_reps / planned_weight)
+    - best_e1rm:    the exercise's best estimated 1RM, or None
     
-    The cursor starts at set 3 (or last set if fewer than 3).
-    Suggestion is always last_actual_reps + 1.
+    Policies never query. Per-exercise state (e.g. the cursor) is passed in as a dict;
+    callers persist it for stateful policies.
     """
-    from db.conn import query_one
-    w_row = query_one("SELECT template_id FROM workouts WHERE id = ?", (workout_id,))
-    if not w_row or not w_row[0]:
-        return {}
+    name = None
+    label = None
+    stateful = False
+    
+    @abstractmethod
+    def targets(self, state, ctx):
+        """Returns {set_number: (reps, weight)}."""
+    
+    def is_met(self, target, actual):
+        reps, weight = target
+        return actual['actual_reps'] >= reps and (weight is None or (actual['actual_weight'] or 0) >= weight)
+    
+    def advance(self, state, ctx, met):
+        """Updates state from scored targets ({set_number: met}). Returns True if it moved."""
+        return False
+
+class RotatingCursorPolicy(ProgressionPolicy):
+    """
+    One tracked set per exercise, starting at set 3 (or the last set).
+    Target is last reps + 1; on an exact match the cursor moves to the next set,
+    wrapping after the last. With exact=False, beating the target also counts.
+    """
+    label = "Rotating cursor"
+    stateful = True
+    
+    def __init__(self, exact=True):
+        self.exact = exact
+        self.name = ProgressionType.CURSOR.value if exact else "CURSOR_AT_LEAST"
+    
+    def targets(self, state, ctx):
+        last_sets = ctx['last_sets']
+        if not last_sets:
+            return {}
+        cursor = state.setdefault("cursor", min(3, len(last_sets)))
+        last = _done(last_sets).get(cursor)
+        if last is None:
+            return {}
+        planned = {p['set_number']: p['planned_weight'] for p in ctx['planned_sets']}
+        return {cursor: (last['actual_reps'] + 1, planned.get(cursor, last['actual_weight']))}
+    
+    def is_met(self, target, actual):
+        if self.exact:
+            return actual['actual_reps'] == target[0]
+        return actual['actual_reps'] >= target[0]
+    
+    def advance(self, state, ctx, met):
+        cursor = state.get("cursor")
+        if cursor is None or not met.get(cursor):
+            return False
+        state["cursor"] = 1 if cursor >= len(ctx['last_sets']) else cursor + 1
+        return True
+
+class DoubleProgressionPolicy(ProgressionPolicy):
+    """
+    Reps first, then weight: each set targets last reps + 1 (capped at rep_max) at the
+    same weight. Once every set reached rep_max, weight goes up and reps reset to rep_min.
+    """
+    name = ProgressionType.DOUBLE_PROGRESSION.value
+    label = "Double progression"
+    
+    def __init__(self, rep_min=8, rep_max=12, weight_step=5.0):
+        self.rep_min = rep_min
+        self.rep_max = rep_max
+        self.weight_step = weight_step
+    
+    def targets(self, state, ctx):
+        last = _done(ctx['last_sets'])
+        if not last:
+            return {}
+        if all(s['actual_reps'] >= self.rep_max for s in last.values()):
+            return {n: (self.rep_min, (s['actual_weight'] or 0) + self.weight_step) for n, s in last.items()}
+        return {n: (min(s['actual_reps'] + 1, self.rep_max), s['actual_weight']) for n, s in last.items()}
+
+class PercentagePolicy(ProgressionPolicy):
+    """
+    Weight from a training max (a fraction of the best e1RM) for each set's planned reps,
+    so the prescription follows strength as records move.
+    """
+    name = ProgressionType.PERCENTAGE.value
+    label = "Percentage of e1RM"
+    
+    def __init__(self, training_max=0.9):
+        self.training_max = training_max
     
-    template_id = w_row[0]
-    last_exercises = runner_repo.get_last_completed_workout_for_template(
-        template_id, exclude_workout_id=workout_id
+    def targets(self, state, ctx):
+        if not ctx['best_e1rm']:
+            return {}
+        tm = ctx['best_e1rm'] * self.training_max
+        return {
+            p['set_number']: (p['planned_reps'], _round_weight(_weight_for_reps(tm, p['planned_reps'])))
+            for p in ctx['planned_sets']
+            if p['planned_reps']
+        }
+
+class TopSetBackoffPolicy(ProgressionPolicy):
+    """
+    The first set is a top set at its planned reps; its weight goes up once last session's
+    top set hit them. Remaining sets are back-offs at a fraction of the top weight.
+    """
+    name = ProgressionType.TOP_SET_BACKOFF.value
+    label = "Top set + back-off"
+    
+    def __init__(self, backoff=0.85, weight_step=5.0):
+        self.backoff = backoff
+        self.weight_step = weight_step
+    
+    def targets(self, state, ctx):
+        planned = ctx['planned_sets']
+        if not planned:
+            return {}
+        top = planned[0]
+        last_top = _done(ctx['last_sets']).get(top['set_number'])
+        if last_top is None:
+            return {}
+        
+        top_reps = top['planned_reps'] or last_top['actual_reps']
+        top_weight = last_top['actual_weight'] or 0
+        if last_top['actual_reps'] >= top_reps:
+            top_weight += self.weight_step
+        
+        targets = {top['set_number']: (top_reps, top_weight)}
+        for p in planned[1:]:
+            targets[p['set_number']] = (p['planned_reps'] or top_reps, _round_weight(top_weight * self.backoff))
+        return targets
+
+PROGRESSION_POLICIES = {
+    p.name: p for p in (
+        RotatingCursorPolicy(), DoubleProgressionPolicy(), PercentagePolicy(), TopSetBackoffPolicy()
     )
-    if not last_exercises:
+}
+
+def get_policy(name):
+    """Returns the policy registered under name, defaulting to the rotating cursor."""
+    return PROGRESSION_POLICIES.get(name) or PROGRESSION_POLICIES[ProgressionType.CURSOR.value]
+
+def _exercise_context(ctx, ex):
+    """Builds a policy context for one session exercise from the preloaded session context."""
+    last_sets = []
+    for last_ex in ctx['last_exercises']:
+        if last_ex['exercise_id'] == ex['exercise_id']:
+            last_sets = last_ex['sets']
+            break
+    return {
+        "last_sets": last_sets,
+        "planned_sets": ex['planned_sets'],
+        "best_e1rm": ctx['best_e1rm'].get(ex['exercise_id'])
+    }
+
+def get_progressive_overload_targets(workout_id):
+    """
+    Returns a dict mapping (exercise_id, set_number) -> {suggested_reps, suggested_weight,
+    last_reps, last_weight, set_number, total_sets, policy} for every targeted set.
+    
+    Everything is loaded in one batch; each exercise's policy (the template's, or the
+    exercise's override) computes all of its targets in one call.
+    """
+    ctx = runner_repo.get_progression_context(workout_id)
+    if not ctx:
         return {}
     
     targets = {}
-    
-    for ex in last_exercises:
-        exercise_id = ex['exercise_id']
-        completed_sets = [s for s in ex['sets'] if s['completed']]
-        if not completed_sets:
-            continue
+    for ex in ctx['exercises']:
+        policy = get_policy(ex['policy'])
+        ex_ctx = _exercise_context(ctx, ex)
         
-        total_sets = len(ex['sets'])
+        state = {}
+        cursor = ctx['cursors'].get(ex['exercise_id'])
+        if cursor is not None:
+            state["cursor"] = cursor
         
-        # Get cursor position (or initialize to set 3 / last set)
-        cursor = runner_repo.get_overload_cursor(template_id, exercise_id)
-        if cursor is None:
-            cursor = min(3, total_sets)
-            runner_repo.set_overload_cursor(template_id, exercise_id, cursor)
+        ex_targets = policy.targets(state, ex_ctx)
         
-        # Find the targeted set's actual data from last workout
-        target_set_data = None
-        for s in completed_sets:
-            if s['set_number'] == cursor:
-                target_set_data = s
-                break
+        # First time a stateful policy sees this exercise: persist its initial cursor
+        if policy.stateful and cursor is None and "cursor" in state:
+            runner_repo.set_overload_cursor(ctx['template_id'], ex['exercise_id'], state["cursor"])
+            ctx['cursors'][ex['exercise_id']] = state["cursor"]
         
-        if target_set_data and target_set_data['actual_reps'] is not None:
-            targets[(exercise_id, cursor)] = {
-                'suggested_reps': target_set_data['actual_reps'] + 1,
-                'last_reps': target_set_data['actual_reps'],
-                'set_number': cursor,
-                'total_sets': total_sets
+        last = {s['set_number']: s for s in ex_ctx['last_sets']}
+        for set_number, (reps, weight) in ex_targets.items():
+            last_set = last.get(set_number) or {}
+            targets[(ex['exercise_id'], set_number)] = {
+                'suggested_reps': reps,
+                'suggested_weight': weight,
+                'last_reps': last_set.get('actual_reps'),
+                'last_weight': last_set.get('actual_weight'),
+                'set_number': set_number,
+                'total_sets': len(ex_ctx['last_sets']) or len(ex['planned_sets']),
+                'policy': policy.name
             }
     
     return targets
 
-
-def check_and_advance_overload(workout_id, exercise_order, set_number, actual_reps):
+def check_and_advance_overload(workout_id, exercise_order, set_number, actual_reps, actual_weight=None):
     """
-    After a set is completed, check if it was the overload target set
-    and if actual == suggested. If so, advance the cursor.
-    
-    Cursor advancement wraps: after last set -> set 1 -> set 2 -> ...
+    After a set is completed, let a stateful policy score it against its target
+    and advance. For the rotating cursor: an exact match on the tracked set moves
+    the cursor, wrapping after the last set -> set 1 -> set 2 -> ...
     """
-    from db.conn import query_one
-    
-    # Get template_id and exercise_id
-    row = query_one("""
-        SELECT w.template_id, we.exercise_id
-        FROM workouts w
-        JOIN workout_exercises we ON we.workout_id = w.id
-        WHERE w.id = ? AND we.order_index = ?
-    """, (workout_id, exercise_order))
-    
-    if not row or not row[0]:
+    ctx = runner_repo.get_progression_context(workout_id)
+    if not ctx:
         return
     
-    template_id, exercise_id = row[0], row[1]
-    
-    # Check if this set is the one being tracked
-    cursor = runner_repo.get_overload_cursor(template_id, exercise_id)
-    if cursor is None or cursor != set_number:
-        return  # Not the tracked set, nothing to do
+    ex = next((e for e in ctx['exercises'] if e['order_index'] == exercise_order), None)
+    if ex is None:
+        return
     
-    # Compute what was suggested (same logic as display)
-    last_exercises = runner_repo.get_last_completed_workout_for_template(
-        template_id, exclude_workout_id=workout_id
-    )
-    if not last_exercises:
+    policy = get_policy(ex['policy'])
+    cursor = ctx['cursors'].get(ex['exercise_id'])
+    if not policy.stateful or cursor is None:
         return
     
-    # Find matching exercise and set
-    for ex in last_exercises:
-        if ex['exercise_id'] != exercise_id:
-            continue
-        for s in ex['sets']:
-            if s['set_number'] == cursor and s['completed'] and s['actual_reps'] is not None:
-                suggested = s['actual_reps'] + 1
-                
-                if actual_reps == suggested:
-                    # TARGET MET → advance cursor
-                    total_sets = len(ex['sets'])
-                    if cursor >= total_sets:
-                        next_cursor = 1  # Wrap around to set 1
-                    else:
-                        next_cursor = cursor + 1
-                    
-                    runner_repo.set_overload_cursor(template_id, exercise_id, next_cursor)
-                # else: cursor stays, do nothing
-                return
+    state = {"cursor": cursor}
+    ex_ctx = _exercise_context(ctx, ex)
+    target = policy.targets(state, ex_ctx).get(set_number)
+    if target is None:
+        return  # Not a tracked set, nothing to do
+    
+    actual = {"actual_reps": actual_reps, "actual_weight": actual_weight}
+    if policy.advance(state, ex_ctx, {set_number: policy.is_met(target, actual)}):
+        runner_repo.set_overload_cursor(ctx['template_id'], ex['exercise_id'], state["cursor"])
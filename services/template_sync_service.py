@@ -0,0 +1,276 @@
+"""
+Templates as code.
+
+Template files (JSON, or YAML when PyYAML is installed) declare templates by name:
+
+    name: Push Day
+    sync_policy: SESSION_END          # optional, default SESSION_END
+    progression_policy: CURSOR        # optional, default CURSOR
+    exercises:
+      - exercise: Bench Press
+        progression_policy: PERCENTAGE  # optional, default inherits
+        sets:
+          - {reps: 8, weight: 135}
+          - {reps: 8, weight: 135}
+      - exercise: Dips
+        sets: 3                       # shorthand: 3 sets of reps x weight
+        reps: 10
+      - Plank                         # no sets
+
+A file holds one template, a list of them, or {"templates": [...]}. The files are the
+source of truth for the templates they name; other templates are left alone. A sync
+loads the current state in one round-trip, diffs it, and writes only what changed in
+one atomic batch.
+"""
+import json
+import os
+from core.ordering import ORDER_GAP, key_writes
+from core.types import SyncPolicy, ProgressionType
+from repos import templates_repo
+from services.templates_service import ValidationError, validate_template_name, validate_set_data
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+TEMPLATE_FILE_EXTENSIONS = (".json", ".yaml", ".yml")
+DEFAULT_SYNC_POLICY = SyncPolicy.SESSION_END.value
+DEFAULT_PROGRESSION_POLICY = ProgressionType.CURSOR.value
+
+def _read_file(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ValidationError(f"{path}: install PyYAML to read YAML template files.")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def find_template_files(paths):
+    """Expands files and directories into template file paths, sorted within each directory."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith(TEMPLATE_FILE_EXTENSIONS)
+            )
+        else:
+            files.append(path)
+    return files
+
+def _policy(value, allowed, default, where):
+    if value is None:
+        return default
+    if value not in [p.value for p in allowed]:
+        raise ValidationError(f"{where}: unknown policy {value}.")
+    return value
+
+def _parse_sets(entry, where):
+    sets = entry.get("sets")
+    if sets is None:
+        return []
+    if isinstance(sets, int):
+        sets = [{"reps": entry.get("reps"), "weight": entry.get("weight")}] * sets
+    parsed = []
+    for s in sets:
+        if isinstance(s, (list, tuple)):
+            s = dict(zip(("reps", "weight"), s))
+        reps, weight = s.get("reps"), s.get("weight")
+        try:
+            validate_set_data(reps, weight)
+        except ValidationError as e:
+            raise ValidationError(f"{where}: {e}")
+        parsed.append((reps, None if weight is None else float(weight)))
+    return parsed
+
+def parse_template(data, where):
+    """Validates one template declaration and returns its normalized spec."""
+    if not isinstance(data, dict):
+        raise ValidationError(f"{where}: a template must be a mapping.")
+    name = data.get("name")
+    validate_template_name(name)
+    where = f"{where} ({name})"
+    exercises = []
+    for i, entry in enumerate(data.get("exercises") or [], start=1):
+        if isinstance(entry, str):
+            entry = {"exercise": entry}
+        exercise_name = (entry.get("exercise") or entry.get("name") or "").strip()
+        if not exercise_name:
+            raise ValidationError(f"{where}: exercise {i} has no name.")
+        exercises.append({
+            "name": exercise_name,
+            "progression_policy": _policy(entry.get("progression_policy"), ProgressionType, None, where),
+            "sets": _parse_sets(entry, f"{where} {exercise_name}")
+        })
+    return {
+        "name": name.strip(),
+        "sync_policy": _policy(data.get("sync_policy"), SyncPolicy, DEFAULT_SYNC_POLICY, where),
+        "progression_policy": _policy(data.get("progression_policy"), ProgressionType, DEFAULT_PROGRESSION_POLICY, where),
+        "exercises": exercises
+    }
+
+def load_template_files(paths):
+    """Reads and validates template files. Returns specs. Raises ValidationError."""
+    specs = []
+    for path in find_template_files(paths):
+        try:
+            data = _read_file(path)
+        except (OSError, ValueError) as e:
+            raise ValidationError(f"{path}: {e}")
+        if isinstance(data, dict) and "templates" in data:
+            data = data["templates"]
+        for i, item in enumerate(data if isinstance(data, list) else [data], start=1):
+            specs.append(parse_template(item, f"{path}#{i}"))
+    names = [s["name"].casefold() for s in specs]
+    duplicates = sorted({s["name"] for s in specs if names.count(s["name"].casefold()) > 1})
+    if duplicates:
+        raise ValidationError(f"Templates declared more than once: {', '.join(duplicates)}.")
+    return specs
+
+def _fmt_set(reps, weight):
+    return f"{reps if reps is not None else '-'} x {weight if weight is not None else '-'}"
+
+def _match_exercises(current, desired_ids):
+    """Pairs desired positions with current rows of the same exercise, in order. Returns {position: row}."""
+    unused = {}
+    for row in current:
+        unused.setdefault(row["exercise_id"], []).append(row)
+    return {
+        position: unused[exercise_id].pop(0)
+        for position, exercise_id in enumerate(desired_ids, start=1)
+        if unused.get(exercise_id)
+    }
+
+def _diff_sets(te_id, current_sets, desired_sets, next_ids, changes, lines, label):
+    # Sets pair up by position; new sets are appended after the last kept key
+    last_key = current_sets[-1]["sort_key"] if current_sets else 0
+    for number, (reps, weight) in enumerate(desired_sets, start=1):
+        if number <= len(current_sets):
+            row = current_sets[number - 1]
+            if (row["reps"], row["weight"]) != (reps, weight):
+                changes.append(("update_set", reps, weight, row["id"]))
+                lines.append(f"  ~ {label} set {number}: {_fmt_set(row['reps'], row['weight'])} -> {_fmt_set(reps, weight)}")
+        else:
+            last_key += ORDER_GAP
+            changes.append(("insert_set", next_ids["template_sets"], te_id, last_key, reps, weight))
+            next_ids["template_sets"] += 1
+            lines.append(f"  + {label} set {number}: {_fmt_set(reps, weight)}")
+    for row in current_sets[len(desired_sets):]:
+        changes.append(("delete_set", row["id"]))
+        lines.append(f"  - {label} set {row['set_number']}")
+
+def _diff_template(spec, current, exercise_ids, names, next_ids, changes):
+    """Appends the changes that turn current (None for a new template) into spec. Returns report lines."""
+    lines = []
+    if current is None:
+        template_id = next_ids["templates"]
+        next_ids["templates"] += 1
+        changes.append(("create_template", template_id, spec["name"], spec["sync_policy"], spec["progression_policy"]))
+        lines.append(f"+ template {spec['name']}")
+        current = {"exercises": []}
+    else:
+        template_id = current["id"]
+        fields = (spec["name"], spec["sync_policy"], spec["progression_policy"])
+        if (current["name"], current["sync_policy"], current["progression_policy"]) != fields:
+            changes.append(("update_template",) + fields + (template_id,))
+            lines.append(f"~ template {spec['name']}: sync {fields[1]}, progression {fields[2]}")
+
+    desired_ids = []
+    for exercise in spec["exercises"]:
+        key = exercise["name"].casefold()
+        if key not in exercise_ids:
+            exercise_ids[key] = (next_ids["exercises"], exercise["name"])
+            next_ids["exercises"] += 1
+            names[exercise_ids[key][0]] = exercise["name"]
+            changes.append(("create_exercise",) + exercise_ids[key])
+            lines.append(f"  + exercise {exercise['name']} (new to the library)")
+        desired_ids.append(exercise_ids[key][0])
+
+    matched = _match_exercises(current["exercises"], desired_ids)
+    kept = {row["id"] for row in matched.values()}
+    for row in current["exercises"]:
+        if row["id"] not in kept:
+            changes.append(("delete_exercise_sets", row["id"]))
+            changes.append(("delete_exercise", row["id"]))
+            lines.append(f"  - #{row['order_index']} {names.get(row['exercise_id'], row['exercise_id'])}")
+
+    rows = [matched.get(position) for position in range(1, len(desired_ids) + 1)]
+    parks, updates, keys = key_writes(
+        [row and row["id"] for row in rows],
+        [row and row["sort_key"] for row in rows]
+    )
+    changes.extend(("park_exercise", id) for id in parks)
+    moved = dict(updates)
+
+    for position, (exercise, row, key) in enumerate(zip(spec["exercises"], rows, keys), start=1):
+        label = names[desired_ids[position - 1]]
+        if row is None:
+            te_id = next_ids["template_exercises"]
+            next_ids["template_exercises"] += 1
+            changes.append(("insert_exercise", te_id, template_id, desired_ids[position - 1], key, exercise["progression_policy"]))
+            lines.append(f"  + #{position} {label}")
+            _diff_sets(te_id, [], exercise["sets"], next_ids, changes, lines, label)
+            continue
+        if row["id"] in moved or row["progression_policy"] != exercise["progression_policy"]:
+            if row["id"] in moved:
+                lines.append(f"  ~ {label}: #{row['order_index']} -> #{position}")
+            if row["progression_policy"] != exercise["progression_policy"]:
+                lines.append(f"  ~ {label}: progression {exercise['progression_policy'] or 'inherit'}")
+            changes.append(("update_exercise", key, exercise["progression_policy"], row["id"]))
+        _diff_sets(row["id"], row["sets"], exercise["sets"], next_ids, changes, lines, label)
+    return lines
+
+def plan_sync(specs):
+    """
+    Diffs template specs against the database (one round-trip).
+    Returns (changes, report) where report is {template name: [lines]} for changed templates.
+    """
+    templates, exercise_ids, next_ids = templates_repo.get_sync_state()
+    by_name = {}
+    for t in templates:
+        by_name.setdefault(t["name"].strip().casefold(), []).append(t)
+    names = {id: name for id, name in exercise_ids.values()}
+
+    changes, report = [], {}
+    for spec in specs:
+        existing = by_name.get(spec["name"].casefold(), [])
+        if len(existing) > 1:
+            raise ValidationError(f"Several templates are named {spec['name']}; rename them before syncing.")
+        lines = _diff_template(spec, existing[0] if existing else None, exercise_ids, names, next_ids, changes)
+        if lines:
+            report[spec["name"]] = lines
+    return changes, report
+
+def sync_templates(paths, dry_run=False):
+    """
+    Makes the database match the template files. With dry_run nothing is written.
+    Returns (report, change_count). Raises ValidationError.
+    """
+    changes, report = plan_sync(load_template_files(paths))
+    if not dry_run:
+        templates_repo.apply_template_changes(changes)
+    return report, len(changes)
+
+def export_templates(template_ids=None):
+    """Returns template declarations for the given templates (all when None), ready to json.dump."""
+    templates, exercise_ids, _ = templates_repo.get_sync_state()
+    names = {id: name for id, name in exercise_ids.values()}
+    exported = []
+    for t in templates:
+        if template_ids is not None and t["id"] not in template_ids:
+            continue
+        exercises = []
+        for row in t["exercises"]:
+            entry = {"exercise": names[row["exercise_id"]]}
+            if row["progression_policy"]:
+                entry["progression_policy"] = row["progression_policy"]
+            entry["sets"] = [{"reps": s["reps"], "weight": s["weight"]} for s in row["sets"]]
+            exercises.append(entry)
+        exported.append({
+            "name": t["name"],
+            "sync_policy": t["sync_policy"],
+            "progression_policy": t["progression_policy"],
+            "exercises": exercises
+        })
+    return exported
@@ -1,4 +1,5 @@
 from repos import templates_repo
+from core.types import SyncPolicy, ProgressionType
 
 class ValidationError(Exception):
     pass
@@ -21,6 +22,49 @@ def update_template(template_id, name):
     validate_template_name(name)
     templates_repo.update_template(template_id, name.strip())
 
+def update_sync_policy(template_id, sync_policy):
+    if sync_policy not in [p.value for p in SyncPolicy]:
+        raise ValidationError(f"Unknown sync policy: {sync_policy}")
+    templates_repo.update_sync_policy(template_id, sync_policy)
+
+def update_progression_policy(template_id, progression_policy):
+    if progression_policy not in [p.value for p in ProgressionType]:
+        raise ValidationError(f"Unknown progression policy: {progression_policy}")
+    templates_repo.update_progression_policy(template_id, progression_policy)
+
+def update_exercise_progression_policy(template_exercise_id, progression_policy):
+    if progression_policy is not None and progression_policy not in [p.value for p in ProgressionType]:
+        raise ValidationError(f"Unknown progression policy: {progression_policy}")
+    templates_repo.update_exercise_progression_policy(template_exercise_id, progression_policy)
+
+def clone_template(template_id, new_name):
+    """Copies a template with its exercises and sets in one batch. Returns the new id."""
+    validate_template_name(new_name)
+    if templates_repo.get_template_name(template_id) is None:
+        raise ValidationError("Template not found.")
+    return templates_repo.clone_templates(template_id, [(new_name.strip(), None)])[0]
+
+def clone_template_scaled(template_id, percents, name_format="{name} @ {percent}%"):
+    """
+    Creates one copy of a template per percentage, with every set weight scaled to it and
+    rounded to the plate increment, all in one batch (e.g. [60, 70, 80] for a deload ramp).
+    name_format may use {name} and {percent}. Returns the new ids in the given order.
+    """
+    from services.runner_service import WEIGHT_INCREMENT
+    name = templates_repo.get_template_name(template_id)
+    if name is None:
+        raise ValidationError("Template not found.")
+    clones = []
+    for percent in percents:
+        if percent is None or percent <= 0:
+            raise ValidationError("Percentages must be positive.")
+        clone_name = name_format.format(name=name, percent=f"{percent:g}")
+        validate_template_name(clone_name)
+        clones.append((clone_name.strip(), percent / 100.0))
+    if not clones:
+        return []
+    return templates_repo.clone_templates(template_id, clones, weight_step=WEIGHT_INCREMENT)
+
 def add_set(template_exercise_id, reps, weight):
     validate_set_data(reps, weight)
     templates_repo.add_set(template_exercise_id, reps, weight)
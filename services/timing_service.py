@@ -0,0 +1,125 @@
+import numpy as np
+from functools import lru_cache
+from repos import timing_repo, analytics_repo
+
+def _timestamps(values):
+    """ISO strings (either 'T' or ' ' separated, or None) to datetime64[ms]."""
+    return np.array([v if v else "NaT" for v in values], dtype="datetime64[ms]")
+
+def derive_timing(workout_ids, started, completed):
+    """
+    One pass over set timestamps sorted by workout, then execution order.
+    
+    Per set:
+    - duration: completed_at - started_at
+    - rest: started_at - the previous set's completed_at in the same workout
+    Per session (sorted workout ids):
+    - timed_sets, work (sum of durations), rest (sum of rests)
+    - active: first set start (or completion) to last completion
+    - density: work / active
+    - avg_rest
+    Unknown or negative intervals are NaN.
+    """
+    workout_ids = np.asarray(workout_ids, dtype=np.int64)
+    started = _timestamps(started)
+    completed = _timestamps(completed)
+    n = len(workout_ids)
+    
+    duration = np.full(n, np.nan)
+    has_start = ~np.isnat(started)
+    duration[has_start] = (completed[has_start] - started[has_start]).astype(np.float64) / 1000.0
+    
+    rest = np.full(n, np.nan)
+    same_workout = np.r_[False, workout_ids[1:] == workout_ids[:-1]]
+    measurable = same_workout & has_start
+    idx = np.nonzero(measurable)[0]
+    rest[idx] = (started[idx] - completed[idx - 1]).astype(np.float64) / 1000.0
+    duration[duration < 0] = np.nan
+    rest[rest < 0] = np.nan
+    
+    sessions, first, counts = np.unique(workout_ids, return_index=True, return_counts=True)
+    inv = np.repeat(np.arange(len(sessions)), counts)
+    m = len(sessions)
+    
+    timed = np.bincount(inv, weights=~np.isnan(duration), minlength=m).astype(np.int64)
+    work = np.bincount(inv, weights=np.nan_to_num(duration), minlength=m)
+    rest_count = np.bincount(inv, weights=~np.isnan(rest), minlength=m)
+    rest_total = np.bincount(inv, weights=np.nan_to_num(rest), minlength=m)
+    
+    begin = np.where(has_start, started, completed).astype(np.int64)
+    active = (np.maximum.reduceat(completed.astype(np.int64), first) - np.minimum.reduceat(begin, first)) / 1000.0
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        density = np.where((active > 0) & (timed > 0), work / active, np.nan)
+        avg_rest = np.where(rest_count > 0, rest_total / rest_count, np.nan)
+    
+    return {"duration": duration, "rest": rest}, {
+        "workout_id": sessions,
+        "timed_sets": timed,
+        "work": work,
+        "rest": rest_total,
+        "active": active,
+        "density": density,
+        "avg_rest": avg_rest,
+    }
+
+def _nullable(value):
+    return None if np.isnan(value) else float(value)
+
+def _rows(set_times):
+    """Derives timing for (workout_id, set_id, exercise_id, started_at, completed_at) rows."""
+    workout_ids, set_ids, exercise_ids, started, completed = zip(*set_times)
+    per_set, per_session = derive_timing(workout_ids, started, completed)
+    
+    set_rows = [
+        (set_ids[i], workout_ids[i], exercise_ids[i], _nullable(per_set["duration"][i]), _nullable(per_set["rest"][i]))
+        for i in range(len(set_ids))
+    ]
+    session_rows = [
+        (
+            int(per_session["workout_id"][i]), int(per_session["timed_sets"][i]),
+            float(per_session["work"][i]), float(per_session["rest"][i]), float(per_session["active"][i]),
+            _nullable(per_session["density"][i]), _nullable(per_session["avg_rest"][i])
+        )
+        for i in range(len(per_session["workout_id"]))
+    ]
+    return set_rows, session_rows
+
+def session_timing_statements(workout_id):
+    """Statements that materialize a session's timing; run in the complete_session batch."""
+    set_times = timing_repo.get_set_times(workout_id)
+    if not set_times:
+        return timing_repo.session_timing_statements(workout_id, [], [])
+    set_rows, session_rows = _rows(set_times)
+    return timing_repo.session_timing_statements(workout_id, set_rows, session_rows)
+
+def rebuild_timing():
+    """Backfills set_timing and session_timing from every completed set."""
+    set_times = timing_repo.get_set_times()
+    if not set_times:
+        timing_repo.replace_all([], [])
+        return 0
+    set_rows, session_rows = _rows(set_times)
+    timing_repo.replace_all(set_rows, session_rows)
+    return len(session_rows)
+
+def get_session_timing(workout_id):
+    return timing_repo.get_session_timing(workout_id)
+
+@lru_cache(maxsize=2)
+def _rest_medians(version):
+    exercise_ids, rests = timing_repo.get_rest_samples()
+    if not exercise_ids:
+        return None
+    ex = np.array(exercise_ids, dtype=np.int64)
+    rest = np.array(rests, dtype=np.float64)
+    
+    order = np.lexsort((rest, ex))
+    ex, rest = ex[order], rest[order]
+    ex_ids, first, counts = np.unique(ex, return_index=True, return_counts=True)
+    median = (rest[first + (counts - 1) // 2] + rest[first + counts // 2]) / 2.0
+    return {"exercise_id": ex_ids, "median_rest": median, "samples": counts}
+
+def get_exercise_rest_medians():
+    """Median rest before a set, per exercise, from the materialized set timing."""
+    return _rest_medians(analytics_repo.get_data_version())
@@ -0,0 +1,136 @@
+import numpy as np
+from functools import lru_cache
+from repos import analytics_repo
+from services.analytics_service import FORMULAS, estimate_1rm, load_set_history
+
+DEFAULT_WINDOW = 8
+MIN_SESSIONS = 4
+# Relative slopes are per session, as a fraction of the window's mean
+STALL_THRESHOLD = 0.0025
+REGRESS_THRESHOLD = -0.005
+
+IMPROVING = "IMPROVING"
+STALLED = "STALLED"
+REGRESSED = "REGRESSED"
+INSUFFICIENT = "INSUFFICIENT"
+
+def session_series(hist, formula):
+    """
+    Collapses set history to one row per (exercise, date) session, sorted by exercise then date.
+    Returns (exercise_ids, days, best_e1rm, top_set_reps) where the top set is the heaviest
+    set of the session (most reps on ties).
+    """
+    days = hist["date"].astype(np.int64)
+    ex = hist["exercise_id"]
+    reps = hist["reps"]
+    weight = hist["weight"]
+    
+    day_min = days.min()
+    span = days.max() - day_min + 1
+    keys, inv = np.unique(ex * span + (days - day_min), return_inverse=True)
+    
+    e1rm = estimate_1rm(weight, reps, formula)
+    order = np.lexsort((e1rm, inv))
+    last_of_group = np.r_[np.nonzero(np.diff(inv[order]))[0], len(order) - 1]
+    best_e1rm = e1rm[order][last_of_group]
+    
+    order = np.lexsort((reps, weight, inv))
+    top_reps = reps[order][last_of_group]
+    
+    return keys // span, keys % span + day_min, best_e1rm, top_reps
+
+def pad_recent(group_ex, values_list, window):
+    """
+    Right-aligns the last `window` sessions of each exercise into (exercises, window)
+    matrices padded with NaN. group_ex must be sorted.
+    Returns (exercise_ids, counts, [matrix, ...]).
+    """
+    ex_ids, first, counts = np.unique(group_ex, return_index=True, return_counts=True)
+    ex_rank = np.repeat(np.arange(len(ex_ids)), counts)
+    from_end = np.repeat(first + counts, counts) - 1 - np.arange(len(group_ex))
+    keep = from_end < window
+    
+    rows = ex_rank[keep]
+    cols = window - 1 - from_end[keep]
+    matrices = []
+    for values in values_list:
+        m = np.full((len(ex_ids), window), np.nan)
+        m[rows, cols] = values[keep]
+        matrices.append(m)
+    return ex_ids, np.minimum(counts, window), matrices
+
+def masked_slope(y):
+    """
+    Least-squares slope of each row of y against its column index, ignoring NaN padding.
+    Returns (slope, mean); rows with fewer than 2 points get NaN slope.
+    """
+    mask = ~np.isnan(y)
+    n = mask.sum(axis=1)
+    x = np.broadcast_to(np.arange(y.shape[1], dtype=np.float64), y.shape)
+    y0 = np.where(mask, y, 0.0)
+    x0 = np.where(mask, x, 0.0)
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = x0.sum(axis=1) / n
+        y_mean = y0.sum(axis=1) / n
+        dx = np.where(mask, x - x_mean[:, None], 0.0)
+        dy = np.where(mask, y0 - y_mean[:, None], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        slope = np.where(sxx > 0, (dx * dy).sum(axis=1) / sxx, np.nan)
+    return slope, y_mean
+
+def classify(sessions, e1rm_rel, reps_rel):
+    """Vectorized status flags from relative e1RM and top-set rep slopes."""
+    status = np.full(len(sessions), IMPROVING, dtype=object)
+    stalled = (np.abs(e1rm_rel) < STALL_THRESHOLD) & ~(reps_rel >= STALL_THRESHOLD)
+    status[stalled] = STALLED
+    status[e1rm_rel <= REGRESS_THRESHOLD] = REGRESSED
+    status[sessions < MIN_SESSIONS] = INSUFFICIENT
+    return status
+
+@lru_cache(maxsize=4)
+def _trends(version, formula, window):
+    hist = load_set_history(version)
+    if len(hist["reps"]) == 0:
+        return None
+    
+    group_ex, _, best_e1rm, top_reps = session_series(hist, formula)
+    ex_ids, sessions, (e1rm_m, reps_m) = pad_recent(group_ex, [best_e1rm, top_reps], window)
+    
+    e1rm_slope, e1rm_mean = masked_slope(e1rm_m)
+    reps_slope, reps_mean = masked_slope(reps_m)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        e1rm_rel = np.where(e1rm_mean > 0, e1rm_slope / e1rm_mean, 0.0)
+        reps_rel = np.where(reps_mean > 0, reps_slope / reps_mean, 0.0)
+    
+    return {
+        "exercise_id": ex_ids,
+        "sessions": sessions,
+        "e1rm_slope": e1rm_slope,
+        "e1rm_rel_slope": e1rm_rel,
+        "reps_slope": reps_slope,
+        "last_e1rm": e1rm_m[:, -1],
+        "status": classify(sessions, e1rm_rel, reps_rel),
+    }
+
+def get_trends(window=DEFAULT_WINDOW, formula="epley"):
+    """
+    Fits per-exercise trends over each exercise's last `window` sessions in one pass:
+    least-squares slopes of best e1RM and top-set reps (per session), and a status of
+    IMPROVING, STALLED, REGRESSED or INSUFFICIENT (fewer than MIN_SESSIONS sessions).
+    Recomputed only when the data version changes.
+    """
+    if formula not in FORMULAS:
+        raise ValueError(f"Unknown 1RM formula: {formula}")
+    if window < 2:
+        raise ValueError("Trend window must cover at least 2 sessions")
+    return _trends(analytics_repo.get_data_version(), formula, window)
+
+def get_flagged(window=DEFAULT_WINDOW, formula="epley"):
+    """Slices the trends down to stalled or regressed exercises, worst slope first."""
+    trends = get_trends(window, formula)
+    if trends is None:
+        return None
+    flagged = np.nonzero(np.isin(trends["status"], [STALLED, REGRESSED]))[0]
+    flagged = flagged[np.argsort(trends["e1rm_rel_slope"][flagged], kind="stable")]
+    return {k: v[flagged] for k, v in trends.items()}
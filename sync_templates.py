@@ -0,0 +1,50 @@
+import sys
+import json
+from services.template_sync_service import sync_templates, export_templates
+from services.templates_service import ValidationError
+import streamlit as st
+
+# Verify we can access secrets
+try:
+    _ = st.secrets["TURSO_DATABASE_URL"]
+except:
+    print("Secrets not loaded automatically. Attempting manual load for script context.")
+    import os, toml
+    secrets_path = os.path.join(".streamlit", "secrets.toml")
+    if os.path.exists(secrets_path):
+        with open(secrets_path, "r") as f:
+             st.secrets = toml.load(f)
+
+# Usage:
+#   python sync_templates.py PATH [PATH ...] [--dry-run]   apply template files/directories
+#   python sync_templates.py --export > templates.json     dump current templates as a starting point
+args = sys.argv[1:]
+if args == ["--export"]:
+    print(json.dumps({"templates": export_templates()}, indent=2))
+    import os
+    os._exit(0)
+
+paths = [a for a in args if not a.startswith("--")]
+dry_run = "--dry-run" in args
+if not paths:
+    print("Usage: python sync_templates.py PATH [PATH ...] [--dry-run] | --export")
+    import os
+    os._exit(1)
+
+try:
+    report, change_count = sync_templates(paths, dry_run=dry_run)
+except ValidationError as e:
+    print(f"Sync failed: {e}")
+    import os
+    os._exit(1)
+
+if not report:
+    print("Templates already match the files.")
+for name, lines in report.items():
+    print(name)
+    for line in lines:
+        print(line)
+verb = "Would apply" if dry_run else "Applied"
+print(f"\n{verb} {change_count} changes in one batch.")
+import os
+os._exit(0)
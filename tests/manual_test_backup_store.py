@@ -0,0 +1,76 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Snapshots taken here go to a scratch store, not backups/store
+os.environ["BACKUP_STORE_DIR"] = tempfile.mkdtemp(prefix="manual_test_backup_store_")
+
+from services import backup_store
+from repos import backup_repo
+from repos.exercises_repo import create_exercise, get_all_exercises
+import json
+import shutil
+
+def _write_foreign_snapshot(own, root):
+    """
+    Stores a manifest as another database sharing the store would: same layout, a later
+    change_seq, and an exercises chunk holding a row this database doesn't have.
+    """
+    foreign = json.loads(json.dumps(own))
+    foreign['id'] = "99999999_999999_foreign"
+    foreign['database_id'] = "another-database"
+    foreign['change_seq'] = backup_repo.get_change_seq()
+    columns = own['tables']['exercises']['columns']
+    row = [None] * len(columns)
+    row[columns.index("id")] = 1
+    row[columns.index("name")] = "Foreign-only exercise"
+    stats = {"read_chunks": 0, "new_chunks": 0, "reused_chunks": 0, "bytes_written": 0}
+    chunk = backup_store._chunk_entry("exercises", columns, 0, [row], root, True, {}, stats)
+    foreign['tables']['exercises']['chunks'] = [chunk]
+    with open(os.path.join(backup_store._manifest_dir(root), f"{foreign['id']}.json"), "w") as f:
+        json.dump(foreign, f)
+    return foreign
+
+def test_backup_store():
+    root = os.environ["BACKUP_STORE_DIR"]
+    print("--- Setting up Test Data ---")
+    if not get_all_exercises(): create_exercise("Test Row")
+    own = backup_store.create_snapshot()
+    print(f"Own snapshot: {own['id']} (database {own['database_id']})")
+
+    print("\n--- Store shared with another database ---")
+    foreign = _write_foreign_snapshot(own, root)
+    snapshot = backup_store.create_snapshot()
+    print(f"Base: {snapshot['base']}")
+    if snapshot['base'] == own['id']:
+        print("PASS: Built on this database's own snapshot.")
+    else:
+        print("FAIL: Built on another database's snapshot.")
+    if snapshot['tables']['exercises']['checksum'] == own['tables']['exercises']['checksum']:
+        print("PASS: No foreign rows in the snapshot.")
+    else:
+        print("FAIL: Snapshot holds another database's rows.")
+
+    diff = backup_store.diff_snapshots(foreign['id'])
+    print(f"Diff against live: { {t: len(d['changed']) for t, d in diff.items()} }")
+    if 'exercises' in diff:
+        print("PASS: Diff against a foreign snapshot scans the live tables.")
+    else:
+        print("FAIL: Diff reused the foreign chunks.")
+
+    print("\n--- Restoring from another store ---")
+    other_root = tempfile.mkdtemp(prefix="manual_test_backup_store_other_")
+    copied = backup_store.create_snapshot(root=other_root)
+    default_before = len(backup_store.list_snapshots())
+    backup_store.restore_snapshot(copied['id'], root=other_root)
+    if len(backup_store.list_snapshots(other_root)) == 2 and len(backup_store.list_snapshots()) == default_before:
+        print("PASS: Rollback snapshot went to the store being restored from.")
+    else:
+        print("FAIL: Rollback snapshot written to the default store.")
+
+    shutil.rmtree(root, ignore_errors=True)
+    shutil.rmtree(other_root, ignore_errors=True)
+
+if __name__ == "__main__":
+    test_backup_store()
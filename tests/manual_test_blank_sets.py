@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.runner_service import start_workout, complete_set, get_workout_progression
+from repos.runner_repo import get_workout_set
+from repos.templates_repo import create_template, add_exercise, add_set
+from repos.exercises_repo import create_exercise, get_all_exercises
+from db.conn import execute
+import datetime
+
+def test_blank_sets():
+    print("--- Setting up Test Data ---")
+    date_str = "2099-02-02"
+    execute("DELETE FROM workouts WHERE date = ?", (date_str,))
+
+    template_name = f"Blank Sets Test {datetime.datetime.now().strftime('%H%M%S')}"
+    tid = create_template(template_name)
+    if not get_all_exercises(): create_exercise("Test Plank")
+    eid = get_all_exercises()[0]['id']
+
+    # Two sets with no reps or weight yet (add_set defaults / "sets: 3" shorthand)
+    te = add_exercise(tid, eid)
+    add_set(te)
+    add_set(te)
+
+    print("\n--- Starting a session on the template ---")
+    wid = start_workout(date_str, tid)
+    progression = get_workout_progression(wid)
+    print(f"Exercises: {progression['total_exercises_count']}")
+    if progression['total_exercises_count'] == 1:
+        print("PASS: Exercise with only blank sets is in the session.")
+    else:
+        print("FAIL: Exercise missing from the session.")
+
+    planned = progression['active_exercise']['sets'] if progression['active_exercise'] else []
+    print(f"Planned: {[(s['planned_reps'], s['planned_weight']) for s in planned]}")
+    if len(planned) == 2 and all(s['planned_reps'] is None and s['planned_weight'] is None for s in planned):
+        print("PASS: Both blank sets planned.")
+    else:
+        print("FAIL: Blank sets missing.")
+
+    print("\n--- Performing a blank set ---")
+    complete_set(wid, 1, 1, 30, None)
+    s1 = get_workout_set(wid, 1, 1)
+    if s1['completed'] and s1['actual_reps'] == 30:
+        print("PASS: Blank set completed.")
+    else:
+        print("FAIL: Blank set not completed.")
+
+    execute("DELETE FROM workouts WHERE date = ?", (date_str,))
+
+if __name__ == "__main__":
+    test_blank_sets()
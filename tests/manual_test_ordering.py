@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.ordering import ORDER_GAP, plan_keys, key_writes
+import random
+
+def check(label, ok):
+    print(f"{'PASS' if ok else 'FAIL'}: {label}")
+    return ok
+
+def is_valid(keys):
+    """Keys are all set, increasing and therefore free of duplicates."""
+    return None not in keys and all(a < b for a, b in zip(keys, keys[1:]))
+
+def test_ordering():
+    spaced = [ORDER_GAP * (i + 1) for i in range(5)]
+    ids = [1, 2, 3, 4, 5]
+
+    print("--- Neighbour swap ---")
+    order = [1, 3, 2, 4, 5]
+    parks, updates, keys = key_writes(order, [spaced[i - 1] for i in order])
+    print(f"Updates: {updates} Parks: {parks}")
+    check("Swap writes one row", len(updates) == 1 and not parks)
+    check("Swap keys valid", is_valid(keys))
+
+    print("\n--- Move to the front ---")
+    order = [5, 1, 2, 3, 4]
+    parks, updates, keys = key_writes(order, [spaced[i - 1] for i in order])
+    print(f"Updates: {updates}")
+    check("Only the moved row is written", updates == [(5, keys[0])] and keys[0] < spaced[0])
+    check("Front keys valid", is_valid(keys))
+
+    print("\n--- New rows between kept keys ---")
+    keys, respaced = plan_keys([spaced[0], None, None, spaced[1], None])
+    print(f"Keys: {keys}")
+    check("Kept keys unchanged", keys[0] == spaced[0] and keys[3] == spaced[1] and not respaced)
+    check("Inserted keys valid", is_valid(keys))
+
+    print("\n--- Gap exhaustion ---")
+    keys, respaced = plan_keys([1, None, 2])
+    print(f"Keys: {keys} Respaced: {respaced}")
+    check("Narrow gap respaces every row", respaced and keys == [ORDER_GAP, ORDER_GAP * 2, ORDER_GAP * 3])
+
+    # Repeatedly inserting at the same spot halves the gap until it runs out
+    keys = list(spaced[:2])
+    for _ in range(20):
+        keys, respaced = plan_keys([keys[0], None] + keys[1:])
+        if respaced:
+            break
+    check("Repeated inserts eventually respace", respaced and is_valid(keys))
+
+    print("\n--- Random reorders and inserts ---")
+    rng = random.Random(7)
+    failures = 0
+    for _ in range(2000):
+        keys = sorted(rng.sample(range(1, 20000), rng.randint(1, 12)))
+        order = list(range(len(keys)))
+        rng.shuffle(order)
+        current = [keys[i] for i in order]
+        for _ in range(rng.randint(0, 3)):
+            current.insert(rng.randint(0, len(current)), None)
+        # Current keys double as row ids here
+        parks, updates, new_keys = key_writes(current, current)
+        if not is_valid(new_keys) or len(set(new_keys)) != len(new_keys):
+            failures += 1
+    check("No duplicate or out-of-order keys", failures == 0)
+
+if __name__ == "__main__":
+    test_ordering()
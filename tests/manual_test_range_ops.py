@@ -0,0 +1,103 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.planner_service import (
+    assign_workout, assign_rest, assign_off, add_weekly_rule, delete_rule, get_day_plan,
+    shift_range, copy_week, clear_range, PlannerError
+)
+from services.runner_service import start_workout, complete_session
+from repos.planner_repo import get_range
+from repos.templates_repo import create_template, add_exercise, add_set
+from repos.exercises_repo import create_exercise, get_all_exercises
+from db.conn import execute, query_all
+import datetime
+
+# 1990 predates any real schedule rule, so only this test's rule fires.
+# 1990-01-01 is a Monday.
+
+def _cleanup():
+    execute("DELETE FROM workouts WHERE date LIKE '1990-%' OR date LIKE '1989-12-%'")
+    execute("DELETE FROM schedule_skips WHERE date LIKE '1990-%' OR date LIKE '1989-12-%'")
+    execute("DELETE FROM weekly_summary WHERE week_start LIKE '1990-%' OR week_start LIKE '1989-12-%'")
+    execute("DELETE FROM workout_summaries WHERE date LIKE '1990-%'")
+
+def _names(start, end):
+    return [(p['date'], p['name'], p['status'], p['rule_id'] is not None) for p in get_range(start, end)]
+
+def test_range_ops():
+    print("--- Setting up Test Data ---")
+    _cleanup()
+    stamp = datetime.datetime.now().strftime('%H%M%S')
+    push = create_template(f"Range Push {stamp}")
+    pull = create_template(f"Range Pull {stamp}")
+    if not get_all_exercises(): create_exercise("Test Bench")
+    te = add_exercise(push, get_all_exercises()[0]['id'])
+    add_set(te, 5, 100)
+
+    rule_id = add_weekly_rule(0, push, "1990-01-01", "1990-02-25")  # Push every Monday
+    assign_workout("1990-01-02", pull)
+    assign_rest("1990-01-03")
+    wid = start_workout("1990-01-04", push)
+    complete_session(wid)
+
+    print("\n--- Rule overlay ---")
+    week = _names("1990-01-01", "1990-01-07")
+    print(f"Week: {week}")
+    mondays = [p for p in get_range("1990-01-01", "1990-01-14") if p['rule_id'] is not None]
+    if [p['date'] for p in mondays] == ["1990-01-01", "1990-01-08"] and all(p['id'] is None for p in mondays):
+        print("PASS: Rule fills Mondays without writing rows.")
+    else:
+        print("FAIL: Unexpected rule days.")
+
+    print("\n--- Shifting onto a completed session ---")
+    try:
+        shift_range("1990-01-02", "1990-01-03", 1)
+        print("FAIL: Shift onto 1990-01-04 was allowed.")
+    except PlannerError as e:
+        print(f"Refused: {e}")
+        if _names("1990-01-01", "1990-01-07") == week:
+            print("PASS: Conflict refused and nothing moved.")
+        else:
+            print("FAIL: Plans changed despite the refusal.")
+
+    print("\n--- Shifting a rule day ---")
+    moved = shift_range("1990-01-08", "1990-01-08", 1)
+    monday, tuesday = get_day_plan("1990-01-08"), get_day_plan("1990-01-09")
+    skips = query_all("SELECT date FROM schedule_skips WHERE date = '1990-01-08'")
+    print(f"Moved {moved}; 01-08: {monday}; 01-09: {tuesday and tuesday['name']}")
+    if moved == 1 and monday is None and skips and tuesday and tuesday['template_id'] == push and tuesday['id']:
+        print("PASS: Rule day moved as a row and left a skip behind.")
+    else:
+        print("FAIL: Rule day not moved cleanly.")
+
+    print("\n--- Copying a week ---")
+    # Source week 1990-01-14..20: rule Monday plus a rest day on Tuesday
+    assign_rest("1990-01-16")
+    # Target week 1990-01-28..02-03 has a plan on a day that is empty in the source
+    assign_workout("1990-01-31", pull)
+    written = copy_week("1990-01-14", "1990-01-28")
+    target = _names("1990-01-28", "1990-02-03")
+    print(f"Wrote {written}; target: {target}")
+    rest = get_day_plan("1990-01-30")
+    if rest and rest['plan_type'] == 'REST' and get_day_plan("1990-01-31") is None:
+        print("PASS: Target mirrors the source, including its empty days.")
+    else:
+        print("FAIL: Target week differs from the source.")
+
+    print("\n--- Clearing a range ---")
+    cleared = clear_range("1990-01-01", "1990-01-07")
+    remaining = _names("1990-01-01", "1990-01-07")
+    print(f"Cleared {cleared}; remaining: {remaining}")
+    if [(d, s) for d, _, s, _ in remaining] == [("1990-01-04", "COMPLETED")]:
+        print("PASS: Planned and rule days cleared, completed session kept.")
+    else:
+        print("FAIL: Unexpected plans after clearing.")
+
+    # Through the planner, so the session's records and daily load go with it
+    assign_off("1990-01-04")
+    delete_rule(rule_id)
+    _cleanup()
+
+if __name__ == "__main__":
+    test_range_ops()
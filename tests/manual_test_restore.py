@@ -0,0 +1,100 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Snapshots taken here go to a scratch store, not backups/store
+os.environ["BACKUP_STORE_DIR"] = tempfile.mkdtemp(prefix="manual_test_restore_")
+
+from services import backup_service, backup_store
+from services.backup_service import BackupError
+from repos import backup_repo
+from repos.templates_repo import create_template, add_exercise, add_set
+from repos.exercises_repo import create_exercise, get_all_exercises
+from services.runner_service import start_workout, complete_set, complete_session
+from db.conn import execute
+import datetime
+import shutil
+
+# Restores rewrite every backed-up table. Each one here restores the data as it was a
+# moment earlier, so the database ends where it started apart from the 2099 rows.
+
+def _checksums():
+    return {t: backup_repo.table_checksum(t, backup_repo.get_columns(t)) for t in backup_repo.BACKUP_TABLES}
+
+def _backup(create):
+    path, pending = create()
+    backup_service.record_backup(pending)
+    return path
+
+def test_restore():
+    print("--- Setting up Test Data ---")
+    execute("DELETE FROM workouts WHERE date LIKE '2099-03-%'")
+    if not get_all_exercises(): create_exercise("Test Press")
+    eid = get_all_exercises()[0]['id']
+    tid = create_template(f"Restore Test {datetime.datetime.now().strftime('%H%M%S')}")
+    te = add_exercise(tid, eid)
+    add_set(te, 5, 100)
+
+    full_path = _backup(backup_service.create_full_backup)
+
+    wid = start_workout("2099-03-02", tid)
+    complete_set(wid, 1, 1, 5, 105)
+    complete_session(wid)
+    inc_path = _backup(backup_service.create_incremental_backup)
+    expected = _checksums()
+
+    print("\n--- Full + incremental round trip ---")
+    execute("DELETE FROM workouts WHERE date LIKE '2099-03-%'")
+    report = backup_service.restore_backup([inc_path, full_path])
+    for entry in report:
+        print(f"{entry['kind']}: {sum(r['rows'] for r in entry['tables'].values())} rows")
+    if all(r['verified'] for e in report for r in e['tables'].values()) and _checksums() == expected:
+        print("PASS: Chain restored and verified.")
+    else:
+        print("FAIL: Restored tables differ.")
+
+    print("\n--- Snapshot store round trip ---")
+    first = backup_store.create_snapshot()
+    add_set(te, 8, 80)
+    second = backup_store.create_snapshot()
+    diff = backup_store.diff_snapshots(first['id'], second['id'])
+    print(f"Diff: { {t: len(d['added']) for t, d in diff.items()} }")
+    if len(diff.get('template_sets', {}).get('added', [])) == 1:
+        print("PASS: Diff shows the added set.")
+    else:
+        print("FAIL: Unexpected diff.")
+    backup_store.restore_snapshot(first['id'])
+    if _checksums() == expected:
+        print("PASS: Snapshot restored.")
+    else:
+        print("FAIL: Snapshot restore differs.")
+
+    print("\n--- Failed restore rolls back ---")
+    original = backup_repo.insert_statements
+    def failing_insert(*args, **kwargs):
+        raise ConnectionError("simulated network failure")
+    backup_repo.insert_statements = failing_insert
+    rollback_id = None
+    try:
+        backup_service.restore_backup([full_path])
+        print("FAIL: Restore did not fail.")
+    except BackupError as e:
+        print(f"Error: {e}")
+        rollback_id = next((s['id'] for s in backup_store.list_snapshots() if s['id'] in str(e)), None)
+    finally:
+        backup_repo.insert_statements = original
+    if rollback_id:
+        backup_store.restore_snapshot(rollback_id)
+    if rollback_id and _checksums() == expected:
+        print("PASS: Rolled back from the named snapshot.")
+    else:
+        print("FAIL: No usable rollback snapshot.")
+
+    execute("DELETE FROM workouts WHERE date LIKE '2099-03-%'")
+    for path in (full_path, inc_path):
+        os.remove(path)
+    shutil.rmtree(os.environ["BACKUP_STORE_DIR"], ignore_errors=True)
+
+if __name__ == "__main__":
+    test_restore()